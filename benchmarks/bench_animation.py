@@ -0,0 +1,97 @@
+"""CPU en régimen estable de PetScreen con la mascota animada.
+
+Abre PetScreen (Qt offscreen, almacenamiento en memoria) en varios
+escenarios y, tras un segundo de calentamiento (frames ya decodificados),
+mide durante --seconds el CPU del hilo de la interfaz, los frames mostrados
+por segundo y los saltados: imagen fija, animación sin límite, con el
+presupuesto por defecto, con carga artificial en el bucle de eventos y con
+la ventana oculta.
+
+Uso: python -m benchmarks.bench_animation [--seconds 5] [--load-ms 12]
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QEventLoop, QTimer
+from PyQt5.QtWidgets import QApplication
+
+from models.pet import Pet
+from models.storage import MemoryStorage
+from screens.animation import BUDGET_ENV, DEFAULT_BUDGET, frame_cache
+from screens.pet_screen import PetScreen
+
+
+def run_loop(seconds):
+    loop = QEventLoop()
+    QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec_()
+
+
+def busy(milliseconds):
+    # Trabajo ajeno a la animación en el hilo de la interfaz
+    end = time.perf_counter() + milliseconds / 1000
+    while time.perf_counter() < end:
+        pass
+
+
+def scenario(budget, seconds, load_ms=0, hidden=False):
+    os.environ[BUDGET_ENV] = str(budget)
+    screen = PetScreen(Pet(name="Tami", db=MemoryStorage()))
+    screen.show()
+    load = QTimer()
+    if load_ms:
+        load.timeout.connect(lambda: busy(load_ms))
+        load.start(50)
+    run_loop(1.0)
+    if hidden:
+        screen.hide()
+    player = screen.player
+    shown, dropped = player.shown, player.dropped
+    cpu, wall = time.thread_time(), time.perf_counter()
+    run_loop(seconds)
+    cpu, wall = time.thread_time() - cpu, time.perf_counter() - wall
+    load.stop()
+    result = {
+        'cpu': cpu / wall,
+        'fps': (player.shown - shown) / wall,
+        'dropped': (player.dropped - dropped) / wall,
+        'stride': player.stride,
+    }
+    screen.close()
+    screen.deleteLater()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--load-ms', type=float, default=12.0,
+                        help="ms de trabajo ajeno cada 50 ms en el escenario con carga")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    frames = frame_cache.load("giphy.gif", 200)
+    print(f"giphy.gif: {len(frames)} frames, ciclo de {frames.duration} ms "
+          f"({len(frames) * 1000 / frames.duration:.1f} fps nativos), decodificada {frame_cache.decodes} vez")
+
+    scenarios = (
+        ("Imagen fija", dict(budget=0)),
+        ("Animada, sin límite", dict(budget=1.0)),
+        (f"Animada, presupuesto {DEFAULT_BUDGET:.0%}", dict(budget=DEFAULT_BUDGET)),
+        ("Animada, con carga", dict(budget=DEFAULT_BUDGET, load_ms=args.load_ms)),
+        ("Animada, oculta", dict(budget=DEFAULT_BUDGET, hidden=True)),
+    )
+    for label, options in scenarios:
+        result = scenario(seconds=args.seconds, **options)
+        print(f"{label:28} CPU {result['cpu']:6.1%}  {result['fps']:5.1f} frames/s  "
+              f"{result['dropped']:5.1f} saltados/s  stride {result['stride']}")
+    print(f"Decodificaciones de la animación en total: {frame_cache.decodes}")
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
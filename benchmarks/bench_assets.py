@@ -0,0 +1,82 @@
+"""Decodificación en frío de los sprites: archivos sueltos frente al paquete.
+
+Cada medición corre en un proceso nuevo. "Sueltos" decodifica y escala cada
+imagen de SPRITES desde su PNG, como hacía la aplicación; "paquete" lee
+assets/bundle/sprites.bundle (construido antes con build_assets.py, en un
+directorio temporal) y corta los sprites de sus atlas. Informa la mediana de
+--runs arranques, los archivos abiertos y los bytes leídos.
+
+Uso: python -m benchmarks.bench_assets [--runs 7]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from utils.asset_bundle import SPRITES, build_bundle, load_bundle, source_for
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def decode_loose():
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QImage
+
+    started = time.perf_counter()
+    sources = set()
+    for path, sizes in SPRITES.items():
+        source = source_for(path)
+        sources.add(source)
+        image = QImage(source)
+        for size in sizes:
+            image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    elapsed = (time.perf_counter() - started) * 1000
+    return elapsed, len(sources), sum(os.path.getsize(source) for source in sources)
+
+
+def decode_bundle(path):
+    _, elapsed = load_bundle(path)
+    return elapsed, 1, os.path.getsize(path)
+
+
+def child(mode, path):
+    elapsed, files, size = decode_loose() if mode == 'loose' else decode_bundle(path)
+    print(json.dumps({'ms': elapsed, 'files': files, 'bytes': size}))
+
+
+def measure(mode, path, runs):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_assets', '--child', mode,
+                                 '--bundle', path], cwd=ROOT, capture_output=True, text=True, check=True)
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    return statistics.median(r['ms'] for r in results), results[0]['files'], results[0]['bytes']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--child', choices=('loose', 'bundle'), help=argparse.SUPPRESS)
+    parser.add_argument('--bundle', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.bundle)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sprites.bundle')
+        build_bundle(output=path)
+        loose = measure('loose', path, args.runs)
+        bundle = measure('bundle', path, args.runs)
+    for label, (elapsed, files, size) in (("Archivos sueltos", loose), ("Paquete de sprites", bundle)):
+        print(f"{label:20} mediana {elapsed:7.1f} ms  {files:2} archivos  {size / 1024:7.1f} KB leídos")
+    print(f"Aceleración del arranque en frío: {loose[0] / bundle[0]:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Despertares y CPU de la ventana visible frente a oculta en la bandeja.
+
+Primero simula con StatScheduler --hours horas de una mascota despierta y de
+siestas seguidas, contando los eventos del temporizador por minuto con la
+ventana visible y en segundo plano (solo umbrales, fin de la siesta y de la
+vida). Después abre TamagotchiWindow de verdad (Qt offscreen, almacenamiento
+en memoria, sin Mistral) con la mascota dormida y deja correr el bucle de
+eventos --seconds segundos en cada modo: informa despertares por minuto
+(WakeupStats), frames dibujados, despertares del hilo de flush de la base y
+CPU del proceso.
+
+Uso: python -m benchmarks.bench_background [--hours 6] [--seconds 10]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+os.environ['MISTRAL_API_KEY'] = ''
+
+from PyQt5.QtCore import QEventLoop, QTimer
+from PyQt5.QtWidgets import QApplication
+
+from models.database import WriteBehindDatabase
+from models.pet import Pet
+from models.scheduler import StatScheduler
+from models.storage import MemoryStorage
+
+
+def simulated_events(hours, visible, sleeping, seed):
+    # Sigue los eventos del temporizador como TamagotchiWindow, sin Qt
+    scheduler = StatScheduler()
+    now = datetime(2024, 1, 1)
+    pet = Pet(name="Tami", db=MemoryStorage(), last_update=now, life_start_time=now,
+              rng=random.Random(seed))
+    end = now + timedelta(hours=hours)
+    events = 0
+    while now < end and pet.is_alive:
+        if sleeping and not pet.is_sleeping:
+            pet.energy = min(pet.energy, 2000)
+            pet.hunger = 8000
+            pet.sleep(now)
+        delay, _reason = scheduler.next_event(pet, now, countdown=visible, percent=visible)
+        now += timedelta(seconds=max(0.001, delay))
+        pet.update_stats(now)
+        events += 1
+    return events / (hours * 60)
+
+
+def run_loop(app, seconds):
+    loop = QEventLoop()
+    QTimer.singleShot(int(seconds * 1000), loop.quit)
+    cpu = time.process_time()
+    loop.exec_()
+    return time.process_time() - cpu
+
+
+def window_run(app, seconds):
+    import main
+
+    db = WriteBehindDatabase(MemoryStorage(), flush_interval=1.0)
+    db.start()
+    pet = Pet(name="Tami", db=db)
+    pet.energy = 2000
+    pet.sleep()
+    window = main.TamagotchiWindow(pet)
+    window.show()
+    app.processEvents()
+
+    results = {}
+    for mode in ('foreground', 'background'):
+        if mode == 'background':
+            window.hide()
+            window.enter_background()
+        frames, paused = window.pet_screen.render_stats.frames, window.pet_screen.render_stats.paused_frames
+        flushes = db.wakeups
+        cpu = run_loop(app, seconds)
+        results[mode] = {
+            'cpu': cpu,
+            'frames': window.pet_screen.render_stats.frames - frames,
+            'paused': window.pet_screen.render_stats.paused_frames - paused,
+            'flushes': db.wakeups - flushes,
+        }
+    frames = window.pet_screen.render_stats.frames
+    window.restore_window()
+    results['restore_frames'] = window.pet_screen.render_stats.frames - frames
+    wakeups = window.wakeups.per_minute()
+    window.llm.shutdown()
+    db.close()
+    return results, wakeups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hours', type=float, default=6.0)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=22)
+    args = parser.parse_args()
+
+    print("Eventos del temporizador por minuto (simulados):")
+    for label, sleeping in (("despierta", False), ("durmiendo", True)):
+        visible = simulated_events(args.hours, True, sleeping, args.seed)
+        hidden = simulated_events(args.hours, False, sleeping, args.seed)
+        print(f"  {label:10} visible {visible:7.2f}/min   en la bandeja {hidden:6.2f}/min")
+
+    app = QApplication(sys.argv)
+    results, wakeups = window_run(app, args.seconds)
+    print(f"Ventana real con la mascota dormida, {args.seconds:.0f}s por modo:")
+    for mode in ('foreground', 'background'):
+        result = results[mode]
+        print(f"  {mode:10} {wakeups[mode]['per_minute']:6.1f} despertares/min  "
+              f"{result['frames']:3} frames dibujados ({result['paused']} omitidos)  "
+              f"{result['flushes']} flush de la base  CPU {result['cpu'] * 1000:6.1f} ms")
+    print(f"Al restaurar la ventana: {results['restore_frames']} frame")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Cola de LLMService bajo ráfagas: peticiones unidas, límite de ritmo y descartes.
+
+Simula a alguien que pulsa "Enviar" muchas veces seguidas (mensajes
+repetidos y distintos en el canal 'chat') mientras llegan alertas en otros
+canales, contra el stub de Mistral. Informa cuántas llamadas llegaron a la
+API, cuántas respuestas vio la interfaz, el ritmo real frente al límite y
+las métricas de la cola.
+
+Uso: python -m benchmarks.bench_backpressure [--clicks 40] [--rate 2] [--max-pending 4]
+"""
+import argparse
+import json
+import threading
+import time
+
+from benchmarks.stub_mistral import StubMistralServer
+from models.llm_service import LLMService, RequestDropped, create_client
+from utils.metrics import llm_metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clicks', type=int, default=40)
+    parser.add_argument('--alerts', type=int, default=12)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--rate', type=float, default=2.0)
+    parser.add_argument('--burst', type=int, default=2)
+    parser.add_argument('--max-pending', type=int, default=4)
+    args = parser.parse_args()
+
+    server = StubMistralServer(latency=args.latency).start()
+    service = LLMService(create_client('stub', server.url), rate=args.rate, burst=args.burst,
+                         max_pending=args.max_pending)
+    lock = threading.Lock()
+    shown = []
+    dropped = []
+
+    def show(label):
+        def callback(result, error):
+            with lock:
+                (dropped if isinstance(error, RequestDropped) else shown).append(label)
+        return callback
+
+    try:
+        start = time.perf_counter()
+        requests = []
+        for i in range(args.clicks):
+            # Cada tercer clic repite el mensaje anterior (doble clic)
+            text = f"mensaje {i - i % 3}" if i % 3 else f"mensaje {i}"
+            requests.append(service.submit([{"role": "user", "content": text}], show(f"chat {i}"),
+                                           channel='chat'))
+            if i < args.alerts:
+                requests.append(service.submit([{"role": "user", "content": f"alerta {i}"}],
+                                               show(f"alerta {i}"), channel=f'alert:{i}'))
+            time.sleep(0.01)
+        for request in requests:
+            request.done.wait(30)
+        elapsed = time.perf_counter() - start
+    finally:
+        service.shutdown()
+        server.stop()
+
+    submitted = args.clicks + args.alerts
+    chat_shown = [label for label in shown if label.startswith('chat')]
+    print(f"{submitted} peticiones en {elapsed:.2f}s: {server.requests} llamadas a la API "
+          f"({server.requests / elapsed:.2f}/s, límite {args.rate}/s con ráfagas de {args.burst})")
+    print(f"Respuestas de chat mostradas: {chat_shown} (última pedida: chat {args.clicks - 1})")
+    print(f"Alertas respondidas: {len(shown) - len(chat_shown)}, descartadas por cola llena: {len(dropped)}")
+    print(json.dumps({'calls': llm_metrics.snapshot(), 'gauges': llm_metrics.gauges()}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Registro de eventos: coste de registrar, reconstruir estados pasados y repetir.
+
+Graba una sesión simulada (un tick por minuto y acciones intercaladas, con
+almacenamiento en memoria), informa bytes por evento, el tiempo de
+reconstruir estados al azar desde la instantánea más cercana y la velocidad
+de repetir la sesión completa, y comprueba que la repetición es determinista.
+Con --retention-days menor que la sesión solo se conservan los últimos días.
+
+Uso: python -m benchmarks.bench_events [--ticks 7200] [--snapshot-every 500] [--retention-days 7]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from models.events import EventLog
+from models.pet import Pet
+from models.storage import MemoryStorage
+
+
+def record_session(log, ticks, seed):
+    rnd = random.Random(seed)
+    pet = Pet(name="Tami", db=MemoryStorage(), events=log, rng=random.Random(seed))
+    pet.life_start_time = pet.last_update = datetime(2024, 1, 1)
+    log.start(pet)
+    now = pet.last_update
+    for _ in range(ticks):
+        now += timedelta(minutes=1)
+        pet.update_stats(now)
+        roll = rnd.random()
+        if roll < 0.05:
+            rnd.choice((pet.feed, pet.play, pet.clean))()
+        elif roll < 0.06:
+            pet.sleep(now)
+        elif roll < 0.07:
+            pet.chat("me gusta la pizza")
+        elif roll < 0.075:
+            pet.add_memory("Gustos", "pizza con piña")
+        if not pet.is_alive:
+            break
+    return pet
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ticks', type=int, default=7200)
+    parser.add_argument('--snapshot-every', type=int, default=500)
+    parser.add_argument('--restores', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=21)
+    parser.add_argument('--retention-days', type=float, default=7.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.db')
+        retention = args.retention_days * 24 * 3600
+        log = EventLog(path, snapshot_every=args.snapshot_every, retention=retention)
+        start = time.perf_counter()
+        pet = record_session(log, args.ticks, args.seed)
+        log.flush()
+        elapsed = time.perf_counter() - start
+        events = log.last_seq(pet.pet_id)
+        commits = log.commits
+        kept, snapshots = log.stored(pet.pet_id)
+        log.close()
+        size = os.path.getsize(path)  # Al cerrar, SQLite vuelca el WAL al archivo
+        log = EventLog(path, snapshot_every=args.snapshot_every, retention=retention)
+        print(f"{events:,} eventos grabados en {elapsed:.2f}s con {commits} commits; "
+              f"{size / kept:.1f} bytes/evento guardado (con instantáneas)")
+        print(f"Retención de {args.retention_days:g} días: {kept:,} eventos y {snapshots} instantáneas guardados")
+        first = events - kept
+
+        rnd = random.Random(args.seed)
+        times = []
+        for _ in range(args.restores):
+            seq = rnd.randint(first + 1, events)
+            begin = time.perf_counter()
+            log.restore(pet.pet_id, seq)
+            times.append(time.perf_counter() - begin)
+        print(f"Reconstruir un estado pasado: mediana {statistics.median(times) * 1000:.1f} ms, "
+              f"máximo {max(times) * 1000:.1f} ms")
+
+        begin = time.perf_counter()
+        replayed, applied, mismatches = log.replay(pet.pet_id)
+        elapsed = time.perf_counter() - begin
+        same = log.pet_state(replayed) == log.pet_state(pet)
+        print(f"Repetición completa: {applied:,} eventos en {elapsed:.2f}s ({applied / elapsed:,.0f}/s), "
+              f"{mismatches} discrepancias con instantáneas, estado final "
+              f"{'idéntico' if same else 'DISTINTO'}")
+        log.close()
+
+
+if __name__ == '__main__':
+    main()
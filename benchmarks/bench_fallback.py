@@ -0,0 +1,110 @@
+"""Respuestas locales (models/local_responder.py) y peticiones con cobertura.
+
+Mide la latencia del LocalResponder y, contra el stub de Mistral, cuánto
+tarda en verse el primer texto con y sin HedgedReplies cuando la API va
+lenta, que la respuesta remota reemplaza a la local solo si llega antes de
+stale_after, y que sin cliente la respuesta local sale al momento.
+
+Uso: python -m benchmarks.bench_fallback [--latency 1.0] [--budget 0.2]
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from benchmarks.stub_mistral import StubMistralServer
+from models.llm_service import LLMService, create_client
+from models.local_responder import HedgedReplies, LocalResponder
+from models.pet import PetSnapshot
+
+MESSAGES = [{"role": "user", "content": "hola"}]
+USER_MESSAGES = ("hola", "Hoy comí pizza con mis amigos", "¿como estas?", "estoy triste",
+                 "¿qué hora es?", "me gusta jugar al fútbol")
+
+
+class Timeline:
+    """Registra qué texto se mostró y cuándo, como lo vería la interfaz"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.shown = []  # (segundos, origen, texto)
+        self.done = threading.Event()
+
+    def local(self, text):
+        self.shown.append((time.perf_counter() - self.start, 'local', text))
+
+    def final(self, text, error):
+        self.shown.append((time.perf_counter() - self.start, 'final', text if error is None else error))
+        self.done.set()
+
+    @property
+    def first_visible(self):
+        return self.shown[0][0]
+
+
+def run(replies, responder, snapshot, hedged=True):
+    timeline = Timeline()
+    if hedged:
+        replies.submit(MESSAGES, lambda: responder.reply(snapshot, "hola"), timeline.final,
+                       on_local=timeline.local)
+    else:
+        replies.llm.submit(MESSAGES, timeline.final)
+    if not timeline.done.wait(30):
+        raise AssertionError("Tiempo de espera agotado")
+    return timeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=1.0, help="latencia del stub (s)")
+    parser.add_argument('--budget', type=float, default=0.2, help="espera antes de la respuesta local (s)")
+    parser.add_argument('--replies', type=int, default=20_000)
+    args = parser.parse_args()
+
+    responder = LocalResponder(seed=1)
+    snapshot = PetSnapshot("Tami", 1, 6000, 7000, 5000, 4000, ("gustos: pizza con piña",))
+    times = []
+    for i in range(args.replies):
+        message = USER_MESSAGES[i % len(USER_MESSAGES)]
+        begin = time.perf_counter()
+        responder.reply(snapshot, message)
+        times.append(time.perf_counter() - begin)
+    times.sort()
+    print(f"LocalResponder: mediana {statistics.median(times) * 1e6:.1f} µs, "
+          f"p99 {times[int(len(times) * 0.99)] * 1e6:.1f} µs")
+
+    server = StubMistralServer(latency=args.latency).start()
+    llm = LLMService(create_client('stub', server.url))
+    try:
+        replies = HedgedReplies(llm, budget=args.budget, stale_after=args.latency * 2)
+        plain = run(replies, responder, snapshot, hedged=False)
+        hedged = run(replies, responder, snapshot)
+        print(f"API lenta ({args.latency:.1f}s): primer texto a los {plain.first_visible * 1000:.0f} ms sin "
+              f"cobertura y a los {hedged.first_visible * 1000:.0f} ms con ella; "
+              f"mostrado: {' -> '.join(source for _, source, _ in hedged.shown)}")
+
+        # La remota llega cuando ya no es relevante: se queda la local
+        replies.stale_after = args.latency / 2
+        late = run(replies, responder, snapshot)
+        kept = late.shown[-1][2] == late.shown[0][2]
+        print(f"Remota fuera de plazo: {'se queda la local' if kept else 'SE REEMPLAZÓ'} "
+              f"({late.shown[-1][0] * 1000:.0f} ms)")
+
+        # API rápida: no hace falta la local
+        server.latency = 0.0
+        fast = run(replies, responder, snapshot)
+        print(f"API rápida: mostrado {' -> '.join(source for _, source, _ in fast.shown)}")
+        counts = replies.counts
+    finally:
+        llm.shutdown()
+        server.shutdown()
+
+    offline = HedgedReplies(LLMService(None))
+    timeline = run(offline, responder, snapshot)
+    print(f"Sin cliente: respuesta local a los {timeline.first_visible * 1e6:.0f} µs "
+          f"({timeline.shown[0][2]!r})")
+    print(f"Casos: {counts}, sin conexión {offline.counts['offline']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Tamaño y velocidad de consulta del historial de stats (models/history.py).
+
+Simula la vida completa de varias mascotas con un tick cada --tick segundos,
+informa los bytes guardados por mascota frente a una fila SQLite por muestra,
+el tiempo de consulta de una hora, un día y la vida entera, y comprueba que
+los promedios por hora de los agregados coinciden con los de las muestras.
+
+Uso: python -m benchmarks.bench_history [--pets 3] [--days 5] [--tick 30]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from models.history import HOUR, STATS, StatsHistory
+
+
+def simulate(history, pet_id, start, samples, tick, rnd):
+    values = [8000] * len(STATS)
+    raw = []
+    for i in range(samples):
+        values = [min(10000, max(0, v + rnd.randint(-40, 30))) for v in values]
+        when = start + timedelta(seconds=i * tick)
+        history.record(pet_id, when, *values)
+        raw.append((when, *values))
+    return raw
+
+
+def row_per_sample_bytes(path, raw):
+    # Referencia: una fila por muestra con marca de tiempo en texto
+    conn = sqlite3.connect(path)
+    conn.execute(f'CREATE TABLE samples (ts TEXT, {", ".join(f"{s} INTEGER" for s in STATS)})')
+    conn.executemany('INSERT INTO samples VALUES (?, ?, ?, ?, ?)',
+                     [(when.isoformat(), *values) for when, *values in raw])
+    conn.commit()
+    conn.execute('VACUUM')
+    conn.close()
+    return os.path.getsize(path)
+
+
+def timed_query(history, pet_id, start, end):
+    begin = time.perf_counter()
+    points = history.query(pet_id, start, end)
+    return points, (time.perf_counter() - begin) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pets', type=int, default=3)
+    parser.add_argument('--days', type=int, default=5)
+    parser.add_argument('--tick', type=int, default=30, help="segundos entre muestras")
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    start = datetime(2024, 1, 1)
+    samples = args.days * 24 * 3600 // args.tick
+    end = start + timedelta(seconds=(samples - 1) * args.tick)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = StatsHistory(os.path.join(tmp, 'history.db'))
+        begin = time.perf_counter()
+        raws = [simulate(history, pet_id, start, samples, args.tick, rnd)
+                for pet_id in range(1, args.pets + 1)]
+        history.flush()
+        elapsed = time.perf_counter() - begin
+        print(f"{args.pets * samples:,} muestras en {elapsed:.2f}s "
+              f"({args.pets * samples / elapsed:,.0f}/s, {history.commits} commits)")
+
+        sample_bytes, rollups = history.storage_bytes(1)
+        naive = row_per_sample_bytes(os.path.join(tmp, 'naive.db'), raws[0])
+        print(f"Por mascota: {sample_bytes / 1024:.1f} KB de muestras (últimas "
+              f"{history.raw_retention // 3600} h) + {rollups:,} agregados; "
+              f"una fila por muestra: {naive / 1024:.1f} KB")
+
+        for label, span in (("1 hora", timedelta(hours=1)), ("1 día", timedelta(days=1)),
+                            ("vida completa", end - start)):
+            points, ms = timed_query(history, 1, end - span, end)
+            resolution = history.resolution_for(1, end - span, end)
+            name = {0: "muestras", 60: "minuto", 3600: "hora"}[resolution]
+            print(f"Consulta {label:14} {len(points):5,} puntos ({name:8}) en {ms:6.2f} ms")
+
+        # Los promedios por hora deben coincidir con los calculados desde las muestras
+        hourly = history.query(1, start, end, resolution=HOUR)
+        buckets = {}
+        for when, *values in raws[0]:
+            buckets.setdefault(when.replace(minute=0, second=0), []).append(values)
+        expected = [(hour, *(sum(column) / len(column) for column in zip(*rows)))
+                    for hour, rows in sorted(buckets.items())]
+        print(f"Agregados por hora correctos: {'sí' if hourly == expected else 'NO'}")
+        history.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Costo de la instrumentación (utils/instrument.py) apagada, encendida y con perfilador.
+
+Cada modo corre en un proceso nuevo porque TAMAGOTCHI_INSTRUMENT se lee al
+importar: llama --calls veces a update_stats, save_state y
+get_relevant_memories (almacenamiento en memoria) e informa el tiempo por
+llamada. Con la instrumentación encendida exporta a JSON y a Prometheus en
+un directorio temporal y comprueba que cada ruta tenga tantas muestras como
+llamadas.
+
+Uso: python -m benchmarks.bench_instrument [--calls 20000] [--profile-hz 100]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATHS = ('update_stats', 'save_stats', 'get_relevant_memories')
+
+
+def child(calls):
+    from models.pet import Pet
+    from models.storage import MemoryStorage
+    from utils.instrument import instrumentation
+
+    instrumentation.start_profiler()
+    db = MemoryStorage()
+    now = datetime(2024, 1, 1)
+    pet = Pet(name="Tami", db=db, last_update=now, life_start_time=now)
+    for i in range(20):
+        db.add_memory('gustos', f"le gusta la pelota número {i}")
+    timings = {}
+    for name, call in (
+            ('update_stats', lambda i: pet.update_stats(now + timedelta(seconds=30 * i))),
+            ('save_stats', lambda i: pet.save_state()),
+            ('get_relevant_memories', lambda i: pet.get_relevant_memories("quiero jugar a la pelota"))):
+        calls_for = calls if name != 'get_relevant_memories' else calls // 10
+        start = time.perf_counter()
+        for i in range(1, calls_for + 1):
+            call(i)
+        timings[name] = (time.perf_counter() - start) / calls_for * 1e6
+    exported = []
+    if instrumentation.enabled:
+        exported.append(instrumentation.export())
+        exported.append(instrumentation.export(instrumentation.path + '.prom'))
+    print(json.dumps({'enabled': instrumentation.enabled, 'us': timings, 'files': exported}))
+
+
+def run(calls, env, runs):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_instrument', '--child',
+                                 '--calls', str(calls)],
+                                cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    timings = {name: statistics.median(r['us'][name] for r in results) for name in PATHS}
+    return timings, results[-1]
+
+
+def check_exports(files, calls):
+    json_path, prom_path = files
+    with open(json_path, encoding='utf-8') as f:
+        report = json.load(f)
+    for name in PATHS:
+        expected = calls if name != 'get_relevant_memories' else calls // 10
+        # update_stats guarda estado y también cuenta en save_stats
+        if report['paths'][name]['count'] < expected:
+            raise AssertionError(f"{name}: {report['paths'][name]['count']} muestras, se esperaban {expected}")
+    with open(prom_path, encoding='utf-8') as f:
+        lines = [line for line in f if line.startswith('tamagotchi_call_duration_seconds_count')]
+    if len(lines) < len(PATHS):
+        raise AssertionError("Faltan series en la exportación de Prometheus")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20_000)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--profile-hz', type=float, default=100.0)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.calls)
+        return
+
+    base = {key: value for key, value in os.environ.items()
+            if key not in ('TAMAGOTCHI_INSTRUMENT', 'TAMAGOTCHI_PROFILE_HZ')}
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics = os.path.join(tmp, 'metrics.json')
+        modes = (
+            ("Apagada", base),
+            ("Encendida", dict(base, TAMAGOTCHI_INSTRUMENT=metrics)),
+            (f"Encendida + perfil {args.profile_hz:.0f} Hz",
+             dict(base, TAMAGOTCHI_INSTRUMENT=metrics, TAMAGOTCHI_PROFILE_HZ=str(args.profile_hz))),
+        )
+        results = [(label, *run(args.calls, env, args.runs)) for label, env in modes]
+        report = check_exports(results[1][2]['files'], args.calls)
+        profile = check_exports(results[2][2]['files'], args.calls).get('profile', {})
+
+    off = results[0][1]
+    print(f"{'µs por llamada':28} " + "  ".join(f"{name:>22}" for name in PATHS))
+    for label, timings, _ in results:
+        print(f"{label:28} " + "  ".join(f"{timings[name]:15.2f} ({timings[name] - off[name]:+5.2f})"
+                                        for name in PATHS))
+    for name in PATHS:
+        entry = report['paths'][name]
+        print(f"{name:22} {entry['count']:7} muestras  p50 ≤ {entry['p50_seconds'] * 1e6:7.1f} µs  "
+              f"p99 ≤ {entry['p99_seconds'] * 1e6:7.1f} µs")
+    print(f"Perfilador: {profile.get('samples', 0)} muestras de pilas; exportación JSON y Prometheus: OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""LLMService contra el stub local de Mistral.
+
+Comprueba que el pool está acotado, que se reutiliza la conexión HTTP, que las
+respuestas obsoletas se descartan y que el timeout corta peticiones lentas.
+
+Uso: python -m benchmarks.bench_llm [--latency 0.2] [--requests 12] [--workers 2]
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.stub_mistral import StubMistralServer
+from models.llm_service import LLMService, create_client
+
+MESSAGES = [{"role": "user", "content": "hola"}]
+
+
+class Collector:
+    def __init__(self, expected):
+        self.results = []
+        self.errors = []
+        self._lock = threading.Lock()
+        self._done = threading.Semaphore(0)
+        self.expected = expected
+
+    def __call__(self, result, error):
+        with self._lock:
+            (self.errors if error else self.results).append(error or result)
+        self._done.release()
+
+    def wait(self, count=None, timeout=30):
+        for _ in range(self.expected if count is None else count):
+            if not self._done.acquire(timeout=timeout):
+                raise AssertionError("Tiempo de espera agotado esperando respuestas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--requests', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    server = StubMistralServer(latency=args.latency).start()
+    # Sin límite de ritmo ni de cola: aquí se mide el pool (ver bench_backpressure)
+    service = LLMService(create_client('stub', server.url), max_workers=args.workers, rate=None,
+                         max_pending=args.requests)
+    try:
+        # Peticiones en canales distintos: todas se responden, como mucho 'workers' a la vez
+        collector = Collector(args.requests)
+        start = time.perf_counter()
+        for i in range(args.requests):
+            service.submit(MESSAGES, collector, channel=f"canal-{i}")
+        collector.wait()
+        elapsed = time.perf_counter() - start
+        print(f"{args.requests} peticiones en {elapsed:.2f}s "
+              f"(mínimo teórico {args.latency * -(-args.requests // args.workers):.2f}s), "
+              f"concurrencia máxima {server.max_active}, conexiones HTTP {server.connections}")
+        assert server.max_active <= args.workers
+        assert not collector.errors, collector.errors
+
+        # Mismo canal: solo la última respuesta llega a la interfaz
+        collector = Collector(1)
+        for _ in range(5):
+            service.submit(MESSAGES, collector, channel='chat')
+        collector.wait()
+        time.sleep(args.latency * 3)
+        print(f"5 mensajes seguidos en el canal 'chat': {len(collector.results)} respuesta(s) mostrada(s)")
+        assert len(collector.results) == 1
+
+        # Timeout: una respuesta más lenta que el límite termina en error
+        server.latency = 1.0
+        collector = Collector(1)
+        service.submit(MESSAGES, collector, channel='lento', timeout=0.2)
+        collector.wait()
+        print(f"Petición lenta con timeout 0.2s: {type(collector.errors[0]).__name__}")
+    finally:
+        service.shutdown()
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Latencia por mensaje de get_relevant_memories con muchas memorias.
+
+Compara el recorrido anterior (todas las filas, subcadenas anidadas) con la
+búsqueda FTS5 con top-k.
+
+Cada memoria tiene dos palabras temáticas (las que aparecen en los mensajes)
+y seis de relleno; con --filler-words 0 todas son temáticas, el peor caso
+para el ranking porque casi todas las memorias coinciden con cada mensaje.
+
+Uso: python -m benchmarks.bench_memories [--memories 100000] [--messages 200] [--top-k 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from models.database import PetDatabase
+from models.pet import Pet
+
+VOCABULARY = ("pizza helado fútbol perro gato playa montaña libro música guitarra "
+              "escuela trabajo hermana hermano padres abuela ciudad lluvia sol verano "
+              "invierno película videojuego bicicleta parque café chocolate tren viaje amigo").split()
+CATEGORIES = ("Nombre", "Gustos", "Familia", "Otros")
+MESSAGES = ("me gusta la pizza y el helado", "mi hermana tiene un perro", "cómo te llamas",
+            "ayer fui a la playa en bicicleta", "hola", "qué película prefieres", "vives con tus padres")
+
+
+def legacy_relevant_memories(memories, context):
+    # Algoritmo anterior de Pet.get_relevant_memories, como referencia
+    relevant_memories = []
+    context_words = context.lower().split()
+    keyword_mapping = {
+        'nombre': ['nombre', 'llamo', 'llamas'],
+        'gustos': ['gusta', 'gustos', 'prefieres', 'favorito'],
+        'familia': ['familia', 'padres', 'hermanos', 'vives'],
+    }
+    for memory in memories:
+        category = memory[1].lower()
+        content = memory[2].lower()
+        if any(word in content for word in context_words):
+            relevant_memories.append(f"{category}: {memory[2]}")
+            continue
+        for category_key, keywords in keyword_mapping.items():
+            if any(keyword in context.lower() for keyword in keywords) and category_key.lower() == category:
+                relevant_memories.append(f"{category}: {memory[2]}")
+                break
+    return relevant_memories
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (statistics.median(samples) * 1000,
+            samples[int(len(samples) * 0.95) - 1] * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--memories', type=int, default=100_000)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=Pet.MEMORY_TOP_K)
+    parser.add_argument('--filler-words', type=int, default=5000,
+                        help="tamaño del vocabulario de relleno")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    now = datetime.now().isoformat()
+    filler = [f"palabra{i}" for i in range(args.filler_words)]
+
+    def memory_text():
+        if not filler:
+            return " ".join(rnd.sample(VOCABULARY, 8))
+        words = rnd.sample(VOCABULARY, 2) + [rnd.choice(filler) for _ in range(6)]
+        rnd.shuffle(words)
+        return " ".join(words)
+
+    rows = [(1, rnd.choice(CATEGORIES), memory_text(), now) for _ in range(args.memories)]
+    messages = [rnd.choice(MESSAGES) for _ in range(args.messages)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PetDatabase(os.path.join(tmp, 'memories.db'))
+        start = time.perf_counter()
+        db.add_memories(rows, append=True)
+        print(f"{args.memories:,} memorias insertadas e indexadas en {time.perf_counter() - start:.2f}s "
+              f"(FTS5: {'sí' if db.has_fts else 'no'})")
+        pet = Pet(name="Tami", db=db)
+
+        legacy_times, legacy_sizes = [], []
+        for message in messages[:max(1, args.messages // 10)]:
+            start = time.perf_counter()
+            legacy_sizes.append(len(legacy_relevant_memories(db.get_memories(), message)))
+            legacy_times.append(time.perf_counter() - start)
+
+        indexed_times, indexed_sizes = [], []
+        for message in messages:
+            start = time.perf_counter()
+            indexed_sizes.append(len(pet.get_relevant_memories(message, args.top_k)))
+            indexed_times.append(time.perf_counter() - start)
+        db.close()
+
+    for label, times, sizes in (("Recorrido anterior", legacy_times, legacy_sizes),
+                                (f"FTS5 top-{args.top_k}", indexed_times, indexed_sizes)):
+        median, p95 = percentiles(times)
+        print(f"{label:20} mediana {median:8.2f} ms  p95 {p95:8.2f} ms  "
+              f"memorias al prompt: hasta {max(sizes):,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Filas por segundo al guardar y cargar muchas mascotas en un solo archivo.
+
+Uso: python -m benchmarks.bench_multipet [--pets 100000] [--memories-per-pet 2]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from models.database import PetDatabase
+
+
+def stats_rows(count, now):
+    last_update = now.isoformat()
+    return [(pet_id, 8000 - pet_id % 8000, 6000, 5000 + pet_id % 3000, 7000,
+             0, last_update, True, last_update, False, None, None)
+            for pet_id in range(1, count + 1)]
+
+
+def timed(label, rows, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:32} {rows:>9,} filas  {rows / elapsed:>12,.0f} filas/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pets', type=int, default=100_000)
+    parser.add_argument('--memories-per-pet', type=int, default=2)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    rows = stats_rows(args.pets, now)
+    memories = [(pet_id, category, f"recuerdo {pet_id}", now.isoformat())
+                for pet_id in range(1, args.pets + 1)
+                for category in ("Gustos", "Familia")[:args.memories_per_pet]]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = PetDatabase(os.path.join(tmp, 'pets.db'))
+
+        timed("save_many (insertar)", len(rows), lambda: db.save_many(rows))
+        timed("save_many (reemplazar)", len(rows), lambda: db.save_many(rows))
+        loaded = timed("load_many (todas)", len(rows), db.load_many)
+        assert len(loaded) == args.pets
+
+        wanted = list(range(1, args.pets + 1, 10))
+        subset = timed("load_many (10% por id)", len(wanted), lambda: db.load_many(wanted))
+        assert len(subset) == len(wanted)
+
+        timed("add_memories", len(memories), lambda: db.add_memories(memories))
+        sample = wanted[:1000]
+        timed("get_memories (1000 mascotas)", len(sample) * args.memories_per_pet,
+              lambda: [db.get_memories(pet_id=pet_id) for pet_id in sample])
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
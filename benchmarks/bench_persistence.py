@@ -0,0 +1,126 @@
+"""Commits por acción con PetDatabase directo y con WriteBehindDatabase.
+
+Incluye una prueba de recuperación ante caídas: un proceso hijo hace acciones,
+hace flush y luego muere sin cerrar la base de datos; el padre comprueba que
+el archivo está íntegro y conserva el último estado escrito.
+
+Uso: python -m benchmarks.bench_persistence [--actions 3000] [--actions-per-flush 50]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from models.database import PetDatabase, WriteBehindDatabase
+from models.pet import Pet
+
+
+def run_actions(pet, count, on_action=None):
+    actions = [
+        pet.feed,
+        pet.play,
+        pet.clean,
+        lambda: pet.chat("me gusta la pizza"),
+        lambda: pet.add_memory("Gustos", f"pizza {pet.hunger}"),
+        pet.wake_up,
+        pet.update_stats,
+    ]
+    for i in range(count):
+        # Stats intermedios para que ninguna acción se rechace
+        pet.hunger = pet.happiness = pet.energy = pet.hygiene = 5000
+        actions[i % len(actions)]()
+        if on_action:
+            on_action(i + 1)
+
+
+def bench(db, count, actions_per_flush=None):
+    pet = Pet(name="Tami", db=db)
+    inner = db.db if isinstance(db, WriteBehindDatabase) else db
+    inner.commits = 0
+
+    def maybe_flush(done):
+        # Simula el flush por intervalo de forma determinista
+        if actions_per_flush and done % actions_per_flush == 0:
+            db.flush()
+
+    start = time.perf_counter()
+    run_actions(pet, count, maybe_flush)
+    if isinstance(db, WriteBehindDatabase):
+        db.flush()
+    elapsed = time.perf_counter() - start
+    db.close()
+    return inner.commits / count, elapsed / count * 1e6
+
+
+def crash_child(path, count):
+    db = WriteBehindDatabase(PetDatabase(path))
+    pet = Pet(name="Tami", db=db)
+    run_actions(pet, count)
+    pet.save_state()
+    db.flush()
+    expected = PetDatabase.stats_row(pet)
+
+    # Cambios que nunca llegan a disco: se pierden, pero no corrompen nada
+    for _ in range(count):
+        pet.hunger = 5000
+        pet.feed()
+    print(json.dumps(expected))
+    sys.stdout.flush()
+    os._exit(1)
+
+
+def check_crash_recovery(tmp, count):
+    path = os.path.join(tmp, 'crash.db')
+    child = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_persistence', '--crash-child', path,
+         '--actions', str(count)],
+        capture_output=True, text=True, cwd=os.getcwd())
+    expected = json.loads(child.stdout.strip().splitlines()[-1])
+
+    conn = sqlite3.connect(path)
+    integrity = conn.execute('PRAGMA integrity_check').fetchone()[0]
+    conn.close()
+    if integrity != 'ok':
+        raise AssertionError(f"Base de datos corrupta tras la caída: {integrity}")
+
+    db = PetDatabase(path)
+    row = list(PetDatabase.stats_row(Pet(name="Tami", db=db)))
+    db.close()
+    if row != expected:
+        raise AssertionError(f"Estado recuperado {row} distinto del último flush {expected}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--actions', type=int, default=3000)
+    parser.add_argument('--actions-per-flush', type=int, default=50)
+    parser.add_argument('--crash-child', metavar='PATH', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.crash_child:
+        crash_child(args.crash_child, args.actions)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configs = [
+            ("PetDatabase (DELETE, FULL)",
+             PetDatabase(os.path.join(tmp, 'a.db'), journal_mode='DELETE', synchronous='FULL'), None),
+            ("PetDatabase (WAL, NORMAL)",
+             PetDatabase(os.path.join(tmp, 'b.db')), None),
+            ("WriteBehindDatabase (WAL, NORMAL)",
+             WriteBehindDatabase(PetDatabase(os.path.join(tmp, 'c.db'))), args.actions_per_flush),
+        ]
+        print(f"{args.actions} acciones, flush cada {args.actions_per_flush} en write-behind")
+        for label, db, per_flush in configs:
+            commits, micros = bench(db, args.actions, per_flush)
+            print(f"{label:36} {commits:6.3f} commits/acción  {micros:9.1f} µs/acción")
+
+        check_crash_recovery(tmp, min(args.actions, 200))
+        print("Recuperación tras caída: OK")
+
+
+if __name__ == '__main__':
+    main()
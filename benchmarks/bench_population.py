@@ -0,0 +1,102 @@
+"""Compara PetPopulation.step contra un bucle de Pet.update_stats.
+
+Uso: python -m benchmarks.bench_population [--pets 500000] [--scalar-pets 2000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from models.pet import Pet
+from models.population import PetPopulation, rng_from_random
+
+
+def random_pets(count, now, seed):
+    # Estados variados: stats bajos, mascotas durmiendo y algunas al final de su vida
+    rnd = random.Random(seed)
+    pets = []
+    for i in range(count):
+        pet = Pet(name=f"pet-{i}")
+        pet.hunger = rnd.randint(0, 8000)
+        pet.happiness = rnd.randint(0, 8000)
+        pet.energy = rnd.randint(0, 8000)
+        pet.hygiene = rnd.randint(0, 8000)
+        pet.last_update = now - timedelta(seconds=rnd.uniform(1, 600))
+        pet.life_start_time = now - timedelta(days=rnd.uniform(0, Pet.LIFESPAN_DAYS + 0.2))
+        if rnd.random() < 0.1:
+            pet.is_sleeping = True
+            pet.sleep_start_time = now - timedelta(seconds=rnd.uniform(0, Pet.SLEEP_DURATION * 1.1))
+            pet.current_state_image = "assets/estados/durmiendo.png"
+        pets.append(pet)
+    return pets
+
+
+def check_equivalence(count, seed):
+    now = datetime.now()
+    scalar = random_pets(count, now, seed)
+    vector = PetPopulation.from_pets(scalar)
+
+    random.seed(seed)
+    rng = rng_from_random(random)
+    for pet in scalar:
+        if pet.is_alive:
+            pet.update_stats(now)
+    vector.step(now, rng)
+
+    expected = PetPopulation.from_pets(scalar)
+    for field in ('hunger', 'happiness', 'energy', 'hygiene', 'is_alive', 'is_sleeping',
+                  'state', 'last_update', 'life_start', 'sleep_start', 'sleep_energy'):
+        if not (getattr(expected, field) == getattr(vector, field)).all():
+            raise AssertionError(f"PetPopulation difiere del camino escalar en '{field}'")
+
+
+def bench_scalar(count, seed):
+    now = datetime.now()
+    pets = random_pets(count, now, seed)
+    later = now + timedelta(minutes=1)
+    start = time.perf_counter()
+    for pet in pets:
+        if pet.is_alive:
+            pet.update_stats(later)
+    return count / (time.perf_counter() - start)
+
+
+def bench_vector(count, seed, steps):
+    now = datetime.now()
+    population = PetPopulation(count, now=now, seed=seed)
+    start = time.perf_counter()
+    for step in range(1, steps + 1):
+        population.step(now + timedelta(minutes=step))
+    return count * steps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pets', type=int, default=500_000)
+    parser.add_argument('--scalar-pets', type=int, default=2000)
+    parser.add_argument('--steps', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args()
+
+    # Pet abre pet_data.db en el directorio actual: trabajar en uno temporal
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            check_equivalence(args.scalar_pets, args.seed)
+            print(f"Equivalencia con Pet.update_stats: OK ({args.scalar_pets} mascotas)")
+            scalar_rate = bench_scalar(args.scalar_pets, args.seed)
+        finally:
+            os.chdir(cwd)
+
+    vector_rate = bench_vector(args.pets, args.seed, args.steps)
+    print(f"Pet.update_stats (bucle): {scalar_rate:,.0f} mascotas/s")
+    print(f"PetPopulation.step:       {vector_rate:,.0f} mascotas/s "
+          f"({args.pets:,} mascotas x {args.steps} pasos)")
+    print(f"Aceleración: {vector_rate / scalar_rate:,.1f}x")
+
+
+if __name__ == '__main__':
+    main()
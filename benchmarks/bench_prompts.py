@@ -0,0 +1,105 @@
+"""Prompts compactos (models/prompts.py): tamaño, presupuesto de tokens y métricas.
+
+Compara el prompt de chat original (f-string con sangría y líneas vacías)
+con el de PromptTemplate, comprueba que un mensaje con muchos recuerdos
+respeta el presupuesto y hace unas llamadas contra el stub de Mistral para
+mostrar las métricas por tipo de llamada que exporta utils/metrics.py.
+
+Uso: python -m benchmarks.bench_prompts [--memories 200] [--calls 10]
+"""
+import argparse
+import json
+
+from benchmarks.stub_mistral import StubMistralServer
+from models.llm_service import LLMService, create_client
+from models.pet import PetSnapshot, alert_messages
+from models.prompts import CHAT, count_tokens, message_tokens
+from utils.metrics import llm_metrics
+
+USER_MESSAGE = "Hoy comí pizza con mis amigos, ¿como estas?"
+
+
+def legacy_chat_messages(snapshot, user_message):
+    # Copia literal del prompt anterior a PromptTemplate, como referencia
+    memories_context = ""
+    if snapshot.relevant_memories:
+        memories_context = "\n\nRecuerdos relevantes:\n" + "\n".join(snapshot.relevant_memories)
+    stats_context = f"""
+            Mi estado actual es:
+            - Hambre: {int(snapshot.hunger/100)}%
+            - Felicidad: {int(snapshot.happiness/100)}%
+            - Energía: {int(snapshot.energy/100)}%
+            - Higiene: {int(snapshot.hygiene/100)}%
+            """
+    prompt = f"""
+        Contexto de la conversación:
+        - Mensaje del usuario: {user_message}
+        {memories_context}
+        {stats_context}
+
+        Instrucciones:
+        - Responde de manera natural y amigable, como un compañero
+        - No menciones tus estadísticas a menos que te pregunten específicamente por ellas
+        - Mantén un tono conversacional y empático
+        - Si el usuario comparte información sobre su día, muestra interés y haz preguntas relevantes
+        """
+    return [
+        {
+            "role": "system",
+            "content": """Eres un Tamagotchi amigable y empático.
+                Mantienes conversaciones naturales sin mencionar tus estadísticas
+                a menos que te pregunten específicamente por ellas.
+                Cuando el usuario comparte información sobre su día, muestras
+                verdadero interés y haces preguntas relevantes para mantener la conversación."""
+        },
+        {"role": "user", "content": prompt},
+    ]
+
+
+def describe(label, messages):
+    chars = sum(len(message["content"]) for message in messages)
+    tokens = message_tokens(messages)
+    print(f"{label:28} {chars:6,} caracteres  {tokens:5,} tokens estimados")
+    return tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--memories', type=int, default=200)
+    parser.add_argument('--calls', type=int, default=10)
+    args = parser.parse_args()
+
+    memories = tuple(f"Gustos: pizza con piña número {i}" for i in range(5))
+    snapshot = PetSnapshot("Tami", 1, 6000, 7000, 5000, 4000, memories)
+    before = describe("Chat original", legacy_chat_messages(snapshot, USER_MESSAGE))
+    after = describe("Chat con PromptTemplate", snapshot.user_interaction_messages(USER_MESSAGE))
+    print(f"Ahorro: {1 - after / before:.1%} de los tokens del prompt de chat")
+
+    # Muchos recuerdos: se descartan los menos relevantes hasta caber en el presupuesto
+    crowded = PetSnapshot("Tami", 1, 6000, 7000, 5000, 4000,
+                          tuple(f"Recuerdo {i}: me contaste que te gusta la pizza" for i in range(args.memories)))
+    messages, tokens, trimmed = CHAT.messages(
+        ["Contexto de la conversación:", f"- Mensaje del usuario: {USER_MESSAGE}"],
+        memories=crowded.relevant_memories)
+    print(f"{args.memories} recuerdos: {tokens} tokens (presupuesto {CHAT.budget}), "
+          f"{trimmed} recortados, {'dentro' if tokens <= CHAT.budget else 'FUERA'} del presupuesto")
+    huge = "bla " * 5000
+    _, tokens, _ = CHAT.messages(["Contexto de la conversación:", f"- Mensaje del usuario: {huge}"])
+    print(f"Mensaje de {count_tokens(huge):,} tokens: recortado a {tokens} "
+          f"({'dentro' if tokens <= CHAT.budget else 'FUERA'} del presupuesto)")
+
+    server = StubMistralServer(latency=0.01).start()
+    service = LLMService(create_client('stub', server.url))
+    try:
+        for _ in range(args.calls):
+            service.complete(snapshot.user_interaction_messages(USER_MESSAGE), call_type='chat')
+            service.complete(alert_messages(("tengo mucha hambre",)), call_type='alert')
+        service.complete(snapshot.initiate_messages(), call_type='initiate')
+    finally:
+        service.shutdown()
+        server.shutdown()
+    print(json.dumps(llm_metrics.snapshot(), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
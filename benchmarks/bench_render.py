@@ -0,0 +1,100 @@
+"""Coste de refrescar PetScreen en cada tick, con y sin el modelo de render.
+
+Simula --ticks ticks de un minuto (plataforma Qt offscreen, almacenamiento
+en memoria) y compara la versión anterior, que actualizaba los cuatro
+StatWidget y la imagen en cada tick, con PetScreen.update_stats, que solo
+toca los widgets cuyo valor cambió. Mide el tiempo de la actualización y
+cuenta los eventos de pintura que Qt entrega después.
+
+Uso: python -m benchmarks.bench_render [--ticks 2000]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtWidgets import QApplication, QWidget
+
+from models.pet import Pet
+from models.storage import MemoryStorage
+from screens.pet_screen import PetScreen
+from screens.render_model import stat_percent
+
+
+def legacy_update(screen):
+    # PetScreen.update_stats anterior: todos los widgets en cada tick
+    pet = screen.pet
+    for widget, value in ((screen.hygiene_stat, pet.hygiene), (screen.health_stat, pet.happiness),
+                          (screen.hunger_stat, pet.hunger), (screen.sleep_stat, pet.energy)):
+        percent = stat_percent(value)
+        widget.progress.setValue(percent)
+        widget.percent_label.setText(f"{percent}%")
+    screen.update_image(pet.current_state_image)
+
+
+class PaintCounter(QObject):
+    def __init__(self):
+        super().__init__()
+        self.paints = 0
+
+    def eventFilter(self, widget, event):
+        if event.type() == QEvent.Paint:
+            self.paints += 1
+        return False
+
+
+def run(update, ticks, seed, app):
+    random.seed(seed)
+    pet = Pet(name="Tami", db=MemoryStorage())
+    pet.life_start_time = pet.last_update = datetime(2024, 1, 1)
+    screen = PetScreen(pet)
+    screen.show()
+    app.processEvents()
+    counter = PaintCounter()
+    for widget in screen.findChildren(QWidget):
+        widget.installEventFilter(counter)
+    now = pet.last_update
+    elapsed = 0.0
+    for _ in range(ticks):
+        now += timedelta(minutes=1)
+        pet.update_stats(now)
+        if pet.hunger < Pet.LOW_THRESHOLD:
+            pet.hunger = pet.happiness = pet.energy = pet.hygiene = 8000
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # Avisos de imágenes que faltan
+            update(screen)
+        elapsed += time.perf_counter() - start
+        app.processEvents()
+    screen.close()
+    return elapsed, counter.paints, screen.render_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ticks', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    run(PetScreen.update_stats, args.ticks // 10, args.seed, app)  # Calentar cachés
+    legacy_time, legacy_paints, _ = run(legacy_update, args.ticks, args.seed, app)
+    model_time, model_paints, stats = run(PetScreen.update_stats, args.ticks, args.seed, app)
+
+    print(f"Anterior (todo en cada tick)  {legacy_time / args.ticks * 1e6:8.1f} µs/tick, "
+          f"{args.ticks * 5:,} actualizaciones, {legacy_paints:,} pinturas")
+    print(f"Modelo de render              {model_time / args.ticks * 1e6:8.1f} µs/tick, "
+          f"{stats.repaints:,} actualizaciones, {stats.skipped:,} omitidas, {model_paints:,} pinturas")
+    report = stats.as_dict()
+    print(f"Frames {report['frames']:,}: media {report['avg_frame_ms'] * 1000:.1f} µs, "
+          f"máximo {report['max_frame_ms'] * 1000:.1f} µs (sin contar el repintado de Qt)")
+
+
+if __name__ == '__main__':
+    main()
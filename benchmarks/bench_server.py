@@ -0,0 +1,178 @@
+"""Prueba de carga del servidor sin interfaz (server.py).
+
+Arranca el servidor en otro proceso con almacenamiento en memoria y sin
+Mistral, una vez sin mascotas (memoria base) y otra con --pets. Luego abre
+conexiones HTTP keep-alive que hacen acciones sobre mascotas al azar,
+mientras clientes WebSocket suscritos a varias mascotas reciben deltas y
+hacen sus propias acciones. Informa mascotas por proceso, memoria por
+mascota, latencias de las acciones (p50/p95/p99) y deltas recibidos.
+Cliente y servidor comparten la máquina: con pocos núcleos las latencias
+incluyen la espera por CPU del propio cliente.
+
+Uso: python -m benchmarks.bench_server [--pets 10000] [--clients 20] [--requests 200] [--listen 35]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from utils.metrics import percentile
+from utils.websocket import TEXT, encode_frame, read_message
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACTIONS = ('feed', 'play', 'clean')
+
+
+def start_server(pets, seed=0):
+    env = dict(os.environ, TAMAGOTCHI_STORAGE='memory', MISTRAL_API_KEY='')
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'server.py'), '--port', '0',
+                                '--pets', str(pets), '--seed', str(seed)],
+                               stdout=subprocess.PIPE, env=env, cwd=ROOT, text=True)
+    ready = json.loads(process.stdout.readline())
+    host, port = ready['listening'].rsplit(':', 1)
+    return process, host, int(port)
+
+
+async def http(reader, writer, method, path, body=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(data)}\r\n\r\n"
+                 .encode('latin-1') + data)
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line == b'\r\n':
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def http_client(host, port, pet_ids, requests, latencies, rnd, finished):
+    reader, writer = await asyncio.open_connection(host, port)
+    for _ in range(requests):
+        pet_id = rnd.choice(pet_ids)
+        start = time.perf_counter()
+        status, _ = await http(reader, writer, 'POST', f"/pets/{pet_id}/{rnd.choice(ACTIONS)}")
+        latencies.append(time.perf_counter() - start)
+        assert status == 200, status
+    finished.append(time.perf_counter())
+    writer.close()
+
+
+async def ws_client(host, port, pet_ids, actions, latencies, received, rnd, listen, finished):
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write(f"GET /ws HTTP/1.1\r\nHost: bench\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                 f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode('latin-1'))
+    while (await reader.readline()) != b'\r\n':
+        pass
+
+    async def send(payload):
+        writer.write(encode_frame(json.dumps(payload), mask=os.urandom(4)))
+        await writer.drain()
+
+    async def receive(op):
+        # Los deltas pueden llegar antes que la respuesta esperada
+        while True:
+            opcode, payload = await read_message(reader, writer)
+            if opcode != TEXT:
+                continue
+            message = json.loads(payload)
+            if message['op'] == 'delta':
+                received['deltas'] += 1
+                continue
+            assert message['op'] == op, message
+            return message
+
+    await send({'op': 'subscribe', 'ids': pet_ids})
+    await receive('state')
+    for ref in range(actions):
+        start = time.perf_counter()
+        await send({'op': 'action', 'id': rnd.choice(pet_ids), 'action': rnd.choice(ACTIONS), 'ref': ref})
+        await receive('result')
+        latencies.append(time.perf_counter() - start)
+    finished.append(time.perf_counter())
+    # Después solo escuchar: los ticks del servidor llegan como deltas, sin sondear
+    try:
+        await asyncio.wait_for(receive('none'), listen)
+    except asyncio.TimeoutError:
+        pass
+    writer.close()
+
+
+def describe(label, latencies, elapsed):
+    print(f"{label:22} {len(latencies):6} acciones  {len(latencies) / elapsed:8,.0f}/s  "
+          f"p50 {percentile(latencies, 0.5) * 1000:6.2f} ms  p95 {percentile(latencies, 0.95) * 1000:6.2f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:6.2f} ms")
+
+
+async def load(host, port, args):
+    rnd = random.Random(args.seed)
+    pet_ids = list(range(1, args.pets + 1))
+    http_latencies, ws_latencies = [], []
+    received = {'deltas': 0}
+    finished = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(http_client(host, port, pet_ids, args.requests, http_latencies, random.Random(rnd.random()),
+                      finished)
+          for _ in range(args.clients)),
+        *(ws_client(host, port, rnd.sample(pet_ids, args.subscriptions), args.requests, ws_latencies,
+                    received, random.Random(rnd.random()), args.listen, finished)
+          for _ in range(args.websockets)))
+    elapsed = max(finished) - start
+    describe("HTTP keep-alive", http_latencies, elapsed)
+    describe("WebSocket", ws_latencies, elapsed)
+    print(f"Deltas recibidos por los suscriptores: {received['deltas']:,} "
+          f"({args.websockets * args.subscriptions:,} suscripciones, {args.listen:.0f}s escuchando)")
+    return await load_stats(host, port)
+
+
+async def load_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    _, stats = await http(reader, writer, 'GET', '/stats')
+    writer.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pets', type=int, default=10_000)
+    parser.add_argument('--clients', type=int, default=20, help="conexiones HTTP")
+    parser.add_argument('--websockets', type=int, default=20)
+    parser.add_argument('--subscriptions', type=int, default=50, help="mascotas por WebSocket")
+    parser.add_argument('--requests', type=int, default=200, help="acciones por conexión")
+    parser.add_argument('--listen', type=float, default=35.0,
+                        help="segundos escuchando deltas al final (los ticks despiertos van cada 30 s)")
+    parser.add_argument('--seed', type=int, default=20)
+    args = parser.parse_args()
+
+    process, host, port = start_server(0)
+    baseline = asyncio.run(load_stats(host, port))
+    process.terminate()
+    process.wait()
+
+    start = time.perf_counter()
+    process, host, port = start_server(args.pets, args.seed)
+    startup = time.perf_counter() - start
+    try:
+        stats = asyncio.run(load(host, port, args))
+    finally:
+        process.terminate()
+        process.wait()
+    per_pet_kb = (stats['max_rss_mb'] - baseline['max_rss_mb']) * 1024 / args.pets
+    print(f"{stats['pets']:,} mascotas en un proceso (arranque {startup:.1f}s): "
+          f"{stats['max_rss_mb']:.0f} MB, ~{per_pet_kb:.1f} KB por mascota; "
+          f"{stats['ticks']:,} ticks, {stats['deltas']:,} deltas enviados, "
+          f"acción dentro del servidor p50 {stats['action_ms_p50']:.3f} ms / p99 {stats['action_ms_p99']:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Escalado del simulador Monte Carlo (models/simulation.py) con el número de procesos.
+
+Ejecuta la misma simulación con 1, 2, 4... procesos hasta --max-workers,
+informa vidas por segundo y eficiencia respecto a la escala lineal, y
+comprueba que el resultado no depende del número de procesos. Antes
+comprueba que las acciones vectorizadas de PetPopulation coinciden con
+Pet.feed/play/clean/sleep.
+
+Uso: python -m benchmarks.bench_simulation [--lifetimes 40000] [--max-workers N]
+"""
+import argparse
+import os
+import random
+from datetime import datetime
+
+import numpy as np
+
+from models.pet import Pet
+from models.population import PetPopulation
+from models.simulation import simulate
+from models.storage import MemoryStorage
+
+ACTIONS = ('feed', 'play', 'clean', 'sleep')
+
+
+def check_actions(count, seed):
+    # Mascotas con stats al azar: cada acción debe dar lo mismo en ambos caminos
+    rnd = random.Random(seed)
+    now = datetime(2024, 1, 1)
+    pets = []
+    for _ in range(count):
+        pet = Pet(name="Tami", db=MemoryStorage())
+        pet.hunger, pet.happiness, pet.energy, pet.hygiene = (rnd.randint(0, 8000) for _ in range(4))
+        pet.is_sleeping = rnd.random() < 0.1
+        pet.sleep_start_time = now if pet.is_sleeping else None
+        pet.last_update = pet.life_start_time = now
+        pets.append(pet)
+    population = PetPopulation.from_pets(pets)
+    mask = np.ones(count, dtype=bool)
+    for action in ACTIONS:
+        for pet in pets:
+            getattr(pet, action)(now) if action == 'sleep' else getattr(pet, action)()
+        getattr(population, action)(mask, now) if action == 'sleep' else getattr(population, action)(mask)
+    expected = PetPopulation.from_pets(pets)
+    return all(np.array_equal(getattr(population, name), getattr(expected, name))
+               for name in ('hunger', 'happiness', 'energy', 'hygiene', 'is_sleeping', 'sleep_start', 'sleep_energy'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lifetimes', type=int, default=40_000)
+    parser.add_argument('--batch-size', type=int, default=5_000)
+    parser.add_argument('--policy', default='umbral')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Acciones vectorizadas iguales a las de Pet: {'sí' if check_actions(2000, args.seed) else 'NO'}")
+
+    workers = 1
+    counts = []
+    while workers <= args.max_workers:
+        counts.append(workers)
+        workers *= 2
+    if counts[-1] != args.max_workers:
+        counts.append(args.max_workers)
+
+    baseline = None
+    reference = None
+    for workers in counts:
+        report = simulate(args.policy, args.lifetimes, workers, args.batch_size, args.seed)
+        rate = report.lifetimes / report.elapsed
+        baseline = baseline or rate
+        result = report.as_dict()
+        same = reference is None or all(result[key] == reference[key] for key in
+                                        ('survival_rate', 'critical_fraction', 'lifespan_hours'))
+        reference = reference or result
+        print(f"{workers:3} procesos  {rate:10,.0f} vidas/s  aceleración {rate / baseline:5.2f}x  "
+              f"eficiencia {rate / baseline / workers:6.1%}  resultado {'igual' if same else 'DISTINTO'}")
+    print(f"Supervivencia con '{args.policy}': {reference['survival_rate']:.2%}, "
+          f"tiempo crítico {reference['critical_fraction']:.1%} "
+          f"({os.cpu_count()} núcleos disponibles)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Siesta en forma cerrada: energía en O(1), menos ticks y reanudación tras reiniciar.
+
+Comprueba que la energía al final de la siesta no depende de cada cuánto se
+llame a update_stats (el modelo acumulativo anterior sumaba la ganancia total
+en cada tick), cuenta cuántos eventos programa StatScheduler durante una
+siesta con y sin cuenta regresiva frente al antiguo tick por segundo, y
+guarda una mascota dormida en SQLite para reabrirla a mitad de la siesta.
+
+Uso: python -m benchmarks.bench_sleep [--energy 2000] [--evaluations 200000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from models.database import PetDatabase
+from models.pet import Pet
+from models.scheduler import StatScheduler
+from models.storage import MemoryStorage
+from screens.render_model import stat_percent
+
+
+def sleeping_pet(energy, now, db=None):
+    pet = Pet(name="Tami", db=db or MemoryStorage(), last_update=now, life_start_time=now)
+    pet.energy = energy
+    pet.sleep(now)
+    return pet
+
+
+def nap_energy(energy, now, interval):
+    # Ticks cada `interval` segundos hasta que despierta
+    pet = sleeping_pet(energy, now)
+    ticks = 0
+    elapsed = 0.0
+    while pet.is_sleeping:
+        elapsed += interval
+        pet.update_stats(now + timedelta(seconds=elapsed))
+        ticks += 1
+    return pet.energy, ticks
+
+
+def count_events(energy, now, countdown):
+    # Sigue los eventos de StatScheduler como la ventana (o el hub) durante una siesta
+    scheduler = StatScheduler()
+    pet = sleeping_pet(energy, now)
+    events = ticks = 0
+    current = now
+    while pet.is_sleeping:
+        delay, _reason = scheduler.next_event(pet, current, countdown=countdown)
+        current += timedelta(seconds=max(0.001, delay))
+        events += 1
+        remaining = pet.sleep_remaining(current)
+        # Igual que TamagotchiWindow.update_sleep_status
+        if remaining <= 0 or stat_percent(pet.energy_at(current)) != stat_percent(pet.energy):
+            pet.update_stats(current)
+            ticks += 1
+    return events, ticks
+
+
+def check_restart(tmp, energy, now):
+    path = os.path.join(tmp, 'sleep.db')
+    db = PetDatabase(path)
+    sleeping_pet(energy, now, db)
+    db.close()
+
+    # Otro proceso (aquí, otra conexión) abre la base a mitad de la siesta
+    db = PetDatabase(path)
+    pet = Pet(name="Tami", db=db)
+    middle = now + timedelta(seconds=Pet.SLEEP_DURATION / 2)
+    restored = pet.is_sleeping, pet.sleep_start_time == now, pet.energy_at(middle)
+    db.close()
+    return restored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--energy', type=int, default=2000, help="energía al acostarse (0-7899)")
+    parser.add_argument('--evaluations', type=int, default=200_000)
+    args = parser.parse_args()
+    now = datetime(2024, 1, 1)
+
+    results = {interval: nap_energy(args.energy, now, interval) for interval in (0.25, 1, 7, 60, 301)}
+    for interval, (energy, ticks) in results.items():
+        print(f"Ticks cada {interval:>6}s: {ticks:5} ticks, energía al despertar {energy}")
+    if len({energy for energy, _ in results.values()}) != 1:
+        raise AssertionError("La energía final depende de la frecuencia de los ticks")
+    print("Energía final independiente de la frecuencia de ticks: sí")
+
+    print(f"Antes: {Pet.SLEEP_DURATION} update_stats por siesta (uno por segundo)")
+    for label, countdown in (("Ventana (cuenta regresiva)", True), ("Servidor (sin cuenta)", False)):
+        events, ticks = count_events(args.energy, now, countdown)
+        print(f"{label:27} {events:4} eventos, {ticks:4} update_stats")
+
+    pet = sleeping_pet(args.energy, now)
+    moments = [now + timedelta(seconds=i % Pet.SLEEP_DURATION) for i in range(args.evaluations)]
+    start = time.perf_counter()
+    for moment in moments:
+        pet.energy_at(moment)
+    elapsed = time.perf_counter() - start
+    print(f"energy_at: {elapsed / args.evaluations * 1e9:,.0f} ns por evaluación")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sleeping, same_start, energy = check_restart(tmp, args.energy, now)
+    print(f"Tras reiniciar a mitad de la siesta: durmiendo={sleeping}, "
+          f"mismo inicio={same_start}, energía {energy} ({stat_percent(energy)}%)")
+    if not (sleeping and same_start):
+        raise AssertionError("La siesta no sobrevivió al reinicio")
+
+
+if __name__ == '__main__':
+    main()
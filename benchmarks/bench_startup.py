@@ -0,0 +1,62 @@
+"""Tiempo de arranque de la aplicación hasta la primera pintura.
+
+Lanza main.py varias veces con TAMAGOTCHI_TRACE_STARTUP=exit (plataforma Qt
+offscreen y bases de datos temporales), informa la mediana de cada fase y falla
+si el total supera el límite o si la pila del LLM se importó al arrancar.
+
+Uso: python -m benchmarks.bench_startup [--runs 5] [--max-total-ms 1500]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_once(tmp):
+    # Todos los archivos que crea la aplicación van al directorio temporal
+    env = dict(os.environ, TAMAGOTCHI_TRACE_STARTUP='exit',
+               TAMAGOTCHI_DB=os.path.join(tmp, 'pet_data.db'),
+               TAMAGOTCHI_HISTORY_DB=os.path.join(tmp, 'pet_history.db'),
+               TAMAGOTCHI_EVENTS_DB=os.path.join(tmp, 'pet_events.db'),
+               TAMAGOTCHI_LOG=os.path.join(tmp, 'pet_data.log'),
+               QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    result = subprocess.run([sys.executable, 'main.py'], cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=60)
+    for line in result.stderr.splitlines():
+        if line.startswith('startup-trace '):
+            return json.loads(line[len('startup-trace '):])
+    raise RuntimeError(f"main.py no produjo traza de arranque:\n{result.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-total-ms', type=float, default=1500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        traces = [run_once(tmp) for _ in range(args.runs)]
+
+    phases = [key for key in traces[0] if key.endswith('_ms')]
+    for phase in phases:
+        print(f"{phase:18} mediana {statistics.median(t[phase] for t in traces):8.1f} ms")
+
+    failures = []
+    total = statistics.median(t['total_ms'] for t in traces)
+    if total > args.max_total_ms:
+        failures.append(f"arranque de {total:.0f} ms, límite {args.max_total_ms:.0f} ms")
+    if any(t['llm_imported'] for t in traces):
+        failures.append("mistralai se importó antes de la primera pintura")
+
+    for failure in failures:
+        print(f"REGRESIÓN: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
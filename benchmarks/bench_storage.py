@@ -0,0 +1,126 @@
+"""Rendimiento de escritura y lectura de cada almacenamiento de models.storage.
+
+Para cada uno mide save_stats con un commit por llamada, write_batch en
+lotes, add_memory, load_stats y el tiempo de reabrir (el registro de solo
+anexado se reconstruye releyendo el archivo). También comprueba que no
+queden conexiones abiertas de hilos que ya terminaron.
+
+Uso: python -m benchmarks.bench_storage [--writes 5000] [--pets 1000] [--threads 20]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from models.database import PetDatabase
+from models.pet import Pet
+from models.storage import BACKENDS, LogStorage, MemoryStorage, open_storage
+
+
+def timed(func, count):
+    start = time.perf_counter()
+    func()
+    return count / (time.perf_counter() - start)
+
+
+def bench_backend(backend, path, args):
+    db = open_storage(backend, path)
+    pet = Pet(name="Tami", db=db)
+    now = datetime(2024, 1, 1).isoformat()
+    results = {}
+
+    def save_each():
+        for i in range(args.writes):
+            pet.hunger = i % 10000
+            db.save_stats(pet)
+
+    def save_batches():
+        for start in range(0, args.pets * 10, args.pets):
+            db.write_batch([(pet_id, start % 10000, 8000, 8000, 8000, 0, now, True, now, False, None, None)
+                            for pet_id in range(1, args.pets + 1)])
+
+    def add_memories():
+        for i in range(args.writes):
+            db.add_memory(f"Categoría {i % 50}", f"memoria número {i}")
+
+    def load_each():
+        for pet_id in range(1, args.writes + 1):
+            db.load_stats(pet_id % args.pets + 1)
+
+    results['save_stats'] = timed(save_each, args.writes)
+    results['write_batch'] = timed(save_batches, args.pets * 10)
+    results['add_memory'] = timed(add_memories, args.writes)
+    results['load_stats'] = timed(load_each, args.writes)
+    db.close()
+
+    if backend != 'memory':
+        start = time.perf_counter()
+        open_storage(backend, path).close()
+        results['reopen_ms'] = (time.perf_counter() - start) * 1000
+    return results
+
+
+def check_thread_connections(path, threads):
+    # Cada hilo lee una vez y termina sin cerrar su conexión
+    db = PetDatabase(path)
+    for _ in range(threads):
+        worker = threading.Thread(target=db.load_stats)
+        worker.start()
+        worker.join()
+    db.load_stats()  # Al reutilizar la conexión propia no se abre ninguna nueva
+    leaked = db.open_connections
+    db.release()
+    worker = threading.Thread(target=db.load_stats)
+    worker.start()
+    worker.join()
+    db.load_stats()  # Abrir una conexión nueva cierra las de hilos terminados
+    remaining = db.open_connections
+    db.close()
+    return leaked, remaining, db.open_connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writes', type=int, default=5000)
+    parser.add_argument('--pets', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {'sqlite': os.path.join(tmp, 'pets.db'), 'memory': None,
+                 'log': os.path.join(tmp, 'pets.log')}
+        print(f"{'':8} {'save_stats/s':>14} {'write_batch filas/s':>20} "
+              f"{'add_memory/s':>14} {'load_stats/s':>14} {'reabrir':>10}")
+        for backend in BACKENDS:
+            r = bench_backend(backend, paths[backend], args)
+            reopen = f"{r['reopen_ms']:8.1f}ms" if 'reopen_ms' in r else f"{'-':>10}"
+            print(f"{backend:8} {r['save_stats']:>14,.0f} {r['write_batch']:>20,.0f} "
+                  f"{r['add_memory']:>14,.0f} {r['load_stats']:>14,.0f} {reopen}")
+
+        leaked, remaining, closed = check_thread_connections(
+            os.path.join(tmp, 'threads.db'), args.threads)
+        print(f"Conexiones tras {args.threads} hilos cortos: {leaked} antes de abrir una nueva, "
+              f"{remaining} después, {closed} tras close()")
+
+        # El registro de solo anexado debe reconstruir el mismo estado
+        log = LogStorage(os.path.join(tmp, 'check.log'), min_compact_records=100)
+        reference = MemoryStorage()
+        for storage in (log, reference):
+            pet = Pet(name="Tami", db=storage)
+            for i in range(500):
+                pet.hunger = i
+                pet.save_state()
+                storage.add_memory(f"Categoría {i % 7}", f"memoria {i}")
+        log.close()
+        reopened = LogStorage(log.path)
+        same = (reopened.load_many() == reference.load_many()
+                and [m[1:3] for m in reopened.get_memories()] == [m[1:3] for m in reference.get_memories()])
+        print(f"Registro reconstruido igual que en memoria: {'sí' if same else 'NO'} "
+              f"({log.compactions} compactaciones)")
+        reopened.close()
+
+
+if __name__ == '__main__':
+    main()
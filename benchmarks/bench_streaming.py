@@ -0,0 +1,70 @@
+"""Respuestas en streaming contra el stub local de Mistral.
+
+Mide el tiempo hasta el primer token y la latencia total, y cuántos
+redibujados hace StreamingLabel frente a los tokens recibidos.
+
+Uso: python -m benchmarks.bench_streaming [--latency 0.3] [--token-delay 0.005] [--words 200]
+"""
+import argparse
+import os
+import sys
+import time
+from functools import partial
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication, QLabel
+
+from benchmarks.stub_mistral import StubMistralServer
+from models.llm_service import LLMService, create_client
+from screens.streaming_label import StreamingLabel
+
+MESSAGES = [{"role": "user", "content": "cuéntame algo"}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--token-delay', type=float, default=0.005)
+    parser.add_argument('--words', type=int, default=200)
+    parser.add_argument('--interval', type=int, default=50, help="ms entre redibujados")
+    args = parser.parse_args()
+
+    reply = " ".join(f"palabra{i}" for i in range(args.words))
+    server = StubMistralServer(latency=args.latency, token_delay=args.token_delay, reply=reply).start()
+    service = LLMService(create_client('stub', server.url))
+    app = QApplication(sys.argv)
+    label = QLabel()
+    stream = StreamingLabel(label, interval=args.interval)
+
+    # Sin streaming: nada se ve hasta que llega la respuesta completa
+    start = time.perf_counter()
+    service.complete(MESSAGES)
+    blocking = time.perf_counter() - start
+
+    generation = stream.begin()
+    request = service.submit(MESSAGES, lambda result, error: stream.finish(generation, result or str(error)),
+                             on_chunk=partial(stream.append, generation))
+
+    def wait_done():
+        if request.done.is_set() and not stream._timer.isActive():
+            app.quit()
+    poll = QTimer()
+    poll.timeout.connect(wait_done)
+    poll.start(10)
+    app.exec_()
+
+    assert label.text() == reply, "El texto final no coincide con la respuesta"
+    print(f"Sin streaming: primer texto visible a los {blocking * 1000:.0f} ms")
+    print(f"Con streaming: primer token a los {request.first_token_latency * 1000:.0f} ms, "
+          f"total {request.total_latency * 1000:.0f} ms")
+    print(f"{stream.chunks} tokens, {stream.redraws} redibujados "
+          f"(máximo uno cada {args.interval} ms)")
+
+    service.shutdown()
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Servidor HTTP local que imita el endpoint de chat de Mistral.
+
+Responde POST /v1/chat/completions con el mismo formato que la API real,
+después de una latencia configurable. Con "stream": true envía la respuesta
+como eventos SSE, un token cada token_delay segundos. Sirve para probar
+LLMService sin red.
+
+Uso: python -m benchmarks.stub_mistral [--port 8765] [--latency 0.5] [--token-delay 0.02]
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubMistralServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0.0, reply="¡Hola! Soy una respuesta de prueba.",
+                 token_delay=0.0):
+        super().__init__(address, StubMistralHandler)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.reply = reply
+        self.requests = 0
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name='stub-mistral', daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StubMistralHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Mantener la conexión abierta como la API real
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.endswith('/chat/completions'):
+            self.send_error(404)
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        with self.server._lock:
+            self.server.requests += 1
+            self.server.active += 1
+            self.server.max_active = max(self.server.max_active, self.server.active)
+        try:
+            time.sleep(self.server.latency)
+            if body.get('stream'):
+                self.send_stream(body)
+            else:
+                self.send_completion(body)
+        finally:
+            with self.server._lock:
+                self.server.active -= 1
+
+    def send_completion(self, body):
+        content = self.server.reply
+        # La API real genera todos los tokens antes de responder
+        time.sleep(self.server.token_delay * (len(content.split(' ')) - 1))
+        payload = json.dumps({
+            'id': f"stub-{self.server.requests}",
+            'object': 'chat.completion',
+            'model': body.get('model', 'stub'),
+            'created': int(time.time()),
+            'usage': {'prompt_tokens': 0, 'completion_tokens': len(content.split()), 'total_tokens': 0},
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_stream(self, body):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        # Tokens como palabras con su espacio, igual que los deltas de la API
+        words = self.server.reply.split(' ')
+        tokens = [word + ' ' for word in words[:-1]] + words[-1:]
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(self.server.token_delay)
+            chunk = {
+                'id': f"stub-{self.server.requests}",
+                'object': 'chat.completion.chunk',
+                'model': body.get('model', 'stub'),
+                'created': int(time.time()),
+                'choices': [{
+                    'index': 0,
+                    'delta': {'role': 'assistant', 'content': token},
+                    'finish_reason': 'stop' if i == len(tokens) - 1 else None,
+                }],
+            }
+            self.write_chunk(f"data: {json.dumps(chunk)}\n\n")
+        self.write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--token-delay', type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = StubMistralServer(('127.0.0.1', args.port), latency=args.latency, token_delay=args.token_delay)
+    print(f"Stub de Mistral en {server.url} (latencia {args.latency}s, {args.token_delay}s por token)")
+    print(f"Usar con: MISTRAL_SERVER_URL={server.url} MISTRAL_API_KEY=stub python main.py")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""Suite de benchmarks sin interfaz para el modelo Pet y la base de datos.
+
+Cada caso usa semillas fijas y una base de datos temporal, a escala realista
+(una mascota en uso normal) o extrema (muchas acciones, tablas enormes). El
+resultado es JSON; con --baseline falla si algún caso pierde más de
+--tolerance de rendimiento respecto a la referencia.
+
+Uso:
+    python -m benchmarks.suite --scale realistic --output resultados.json
+    python -m benchmarks.suite --baseline resultados.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.bench_memories import CATEGORIES, MESSAGES, VOCABULARY
+from models.database import PetDatabase
+from models.pet import Pet
+from models.population import PetPopulation
+
+SCALES = {
+    'realistic': {
+        'update_stats': 5_000,
+        'actions': 3_000,
+        'db_ops': 3_000,
+        'memories': 1_000,
+        'messages': 200,
+        'population': 10_000,
+    },
+    'extreme': {
+        'update_stats': 50_000,
+        'actions': 60_000,
+        'db_ops': 50_000,
+        'memories': 100_000,
+        'messages': 100,
+        'population': 500_000,
+    },
+}
+
+
+def fresh_pet(tmp, name):
+    path = os.path.join(tmp, f'{name}.db')
+    if os.path.exists(path):
+        os.remove(path)  # Cada repetición empieza con la base de datos vacía
+    pet = Pet(name="Tami", db=PetDatabase(path))
+    pet.life_start_time = pet.last_update = datetime(2024, 1, 1)
+    return pet
+
+
+def bench_update_stats(tmp, size, seed):
+    pet = fresh_pet(tmp, 'update_stats')
+    random.seed(seed)
+    now = pet.last_update
+    for _ in range(size):
+        now += timedelta(minutes=1)
+        pet.update_stats(now)
+        if pet.hunger < Pet.LOW_THRESHOLD:
+            pet.hunger = pet.happiness = pet.energy = pet.hygiene = 8000
+    return size
+
+
+def bench_actions(tmp, size, seed):
+    pet = fresh_pet(tmp, 'actions')
+    actions = (pet.feed, pet.play, pet.clean)
+    for i in range(size):
+        pet.hunger = pet.happiness = pet.energy = pet.hygiene = 5000
+        actions[i % len(actions)]()
+    return size
+
+
+def bench_save_stats(tmp, size, seed):
+    pet = fresh_pet(tmp, 'save_stats')
+    for i in range(size):
+        pet.hunger = i % 8000
+        pet.db.save_stats(pet)
+    return size
+
+
+def bench_load_stats(tmp, size, seed):
+    pet = fresh_pet(tmp, 'load_stats')
+    pet.save_state()
+    for _ in range(size):
+        pet.db.load_stats(pet.pet_id)
+    return size
+
+
+def memories_pet(tmp, count, seed):
+    rnd = random.Random(seed)
+    pet = fresh_pet(tmp, f'memories_{count}')
+    created_at = pet.last_update.isoformat()
+    pet.db.add_memories([(pet.pet_id, rnd.choice(CATEGORIES), " ".join(rnd.sample(VOCABULARY, 6)), created_at)
+                         for _ in range(count)], append=True)
+    return pet, rnd
+
+
+def bench_population(tmp, size, seed):
+    start = datetime(2024, 1, 1)
+    population = PetPopulation(size, now=start, seed=seed)
+    for step in range(1, 11):
+        population.step(start + timedelta(minutes=step))
+    return size * 10
+
+
+def run_case(func, tmp, size, seed):
+    start = time.perf_counter()
+    ops = func(tmp, size, seed)
+    return ops, time.perf_counter() - start
+
+
+def run_memories(tmp, scale, seed):
+    # La preparación (insertar las memorias) no entra en la medición
+    pet, rnd = memories_pet(tmp, scale['memories'], seed)
+    messages = [rnd.choice(MESSAGES) for _ in range(scale['messages'])]
+    start = time.perf_counter()
+    for message in messages:
+        pet.get_relevant_memories(message)
+    return len(messages), time.perf_counter() - start
+
+
+def run_suite(scale_name, seed, repeat):
+    scale = SCALES[scale_name]
+    cases = {
+        'update_stats': (bench_update_stats, scale['update_stats']),
+        'feed_play_clean': (bench_actions, scale['actions']),
+        'save_stats': (bench_save_stats, scale['db_ops']),
+        'load_stats': (bench_load_stats, scale['db_ops']),
+        'population_step': (bench_population, scale['population']),
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Mejor de `repeat` ejecuciones para reducir el ruido
+        for name, (func, size) in cases.items():
+            ops, seconds = min((run_case(func, tmp, size, seed) for _ in range(repeat)),
+                               key=lambda run: run[1])
+            results[name] = {'ops': ops, 'seconds': seconds, 'ops_per_sec': ops / seconds}
+        ops, seconds = min((run_memories(tmp, scale, seed) for _ in range(repeat)),
+                           key=lambda run: run[1])
+        results['get_relevant_memories'] = {
+            'ops': ops, 'seconds': seconds, 'ops_per_sec': ops / seconds,
+            'memories': scale['memories'],
+        }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for scale_name, cases in results.items():
+        for name, result in cases.items():
+            reference = baseline.get('results', {}).get(scale_name, {}).get(name)
+            if reference is None:
+                continue
+            ratio = result['ops_per_sec'] / reference['ops_per_sec']
+            if ratio < 1 - tolerance:
+                regressions.append(f"{scale_name}/{name}: {ratio:.0%} del rendimiento de referencia")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=[*SCALES, 'all'], default='realistic')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="ejecuciones por caso; se guarda la más rápida")
+    parser.add_argument('--output', help="archivo JSON de resultados (por defecto stdout)")
+    parser.add_argument('--baseline', help="JSON de una ejecución anterior para comparar")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="pérdida de rendimiento permitida (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    scales = list(SCALES) if args.scale == 'all' else [args.scale]
+    results = {}
+    for scale_name in scales:
+        results[scale_name] = run_suite(scale_name, args.seed, args.repeat)
+        for name, result in results[scale_name].items():
+            print(f"{scale_name:9} {name:22} {result['ops_per_sec']:>14,.0f} ops/s", file=sys.stderr)
+
+    report = {
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESIÓN: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
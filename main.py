@@ -1,56 +1,88 @@
+import time
+_startup = time.perf_counter()  # Antes de los imports, para la traza de arranque
+
 import sys
-import threading
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel, QPushButton, QLineEdit, QProgressBar, QHBoxLayout, QFrame, QComboBox, QSystemTrayIcon, QMenu
 from PyQt5.QtGui import QFont, QIcon, QPalette, QBrush, QColor, QPixmap
 from PyQt5.QtCore import QTimer, Qt, QMetaObject, Q_ARG
-from models.pet import Pet
+from models.pet import Pet, forbidden_topic_reply
+from models.llm_service import get_llm_service
+from utils.instrument import instrumentation
+from utils.metrics import WakeupStats, llm_metrics
+from models.alerts import AlertPrefetcher
+from models.local_responder import HedgedReplies, local_responder
+from models.database import WriteBehindDatabase
+from models.storage import open_storage
+from models.history import StatsHistory
+from models.events import EventLog
+from models.scheduler import StatScheduler
+import math
 import random
-import os
+from functools import partial
 from datetime import datetime
 from screens.pet_screen import PetScreen
+from screens.pixmap_cache import pixmap_cache
+from screens.render_model import stat_percent
+from screens.streaming_label import StreamingLabel
 from utils.setup import ensure_directories, verify_assets
-from dotenv import load_dotenv
-from mistralai import Mistral
-
-# Asegurarse de que las dependencias estén instaladas
-try:
-    load_dotenv()
-except ImportError:
-    print("Instalando dependencias necesarias...")
-    import subprocess
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "python-dotenv"])
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "mistralai"])
-    from dotenv import load_dotenv
-    from mistralai import Mistral
-
-# Configurar Mistral solo si está disponible la API key
-api_key = os.getenv("MISTRAL_API_KEY")
-client = None
-if api_key:
-    client = Mistral(api_key=api_key)
-    model = "mistral-large-latest"
+from utils.startup_trace import StartupTrace
 
 class TamagotchiWindow(QWidget):
     def __init__(self, pet: Pet):
         super().__init__()
         self.pet = pet
+        self.llm = get_llm_service()
+        # Respuesta local si Mistral no está o tarda más de HedgedReplies.BUDGET
+        self.replies = HedgedReplies(self.llm)
         self.init_ui()
         self.setup_system_tray()
 
-        # Timer para actualizar stats cada 30 segundos
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.update_pet_status)
-        self.update_timer.start(30000)  # 30 segundos
+        # Un solo timer que se programa para el próximo evento visible
+        # (cambio de porcentaje, umbral, fin de la siesta o fin de la vida)
+        self.scheduler = StatScheduler()
+        # En la bandeja no se dibuja nada y el timer solo despierta para las alertas
+        self.background = False
+        self.wakeups = WakeupStats()
+        self.alerts = AlertPrefetcher(self.llm, self.scheduler)
+        self.event_timer = QTimer()
+        self.event_timer.setSingleShot(True)
+        # Un timer grueso puede adelantarse y despertar dos veces por segundo de la cuenta
+        self.event_timer.setTimerType(Qt.PreciseTimer)
+        self.event_timer.timeout.connect(self.on_scheduled_event)
+        if self.pet.is_sleeping:
+            # La siesta se guardó antes de cerrar: retomarla
+            self.disable_buttons()
+            self.update_sleep_status()
+        self.schedule_next_event()
+
+    def schedule_next_event(self):
+        visible = not self.background
+        next_event = self.scheduler.next_event(self.pet, countdown=visible, percent=visible)
+        if next_event is None:
+            self.event_timer.stop()
+            return
+        delay, _reason = next_event
+        # Redondear hacia arriba: despertar antes de tiempo obliga a reprogramar
+        self.event_timer.start(max(1, math.ceil(delay * 1000)))
+
+    def on_scheduled_event(self):
+        self.wakeups.wake()
+        if self.background:
+            self.background_tick()
+        elif self.pet.is_sleeping:
+            self.update_sleep_status()
+        else:
+            self.update_pet_status()
 
-        # Timer para actualizar stats durante el sueño
-        self.sleep_timer = QTimer()
-        self.sleep_timer.timeout.connect(self.update_sleep_status)
-        self.sleep_timer.setInterval(1000)
+        if self.pet.is_alive:
+            self.schedule_next_event()
 
     def setup_system_tray(self):
         # Crear icono de sistema
         self.tray_icon = QSystemTrayIcon(self)
-        icon = QIcon("assets/icons/pet.png")
+        icon = QIcon()
+        for size in (32, 64):
+            icon.addPixmap(pixmap_cache.get("assets/icons/pet.png", size, size))
         self.tray_icon.setIcon(icon)
         self.setWindowIcon(icon)  # Agregar icono a la ventana principal
 
@@ -79,7 +111,40 @@ class TamagotchiWindow(QWidget):
         # Conectar el doble clic en el icono para restaurar
         self.tray_icon.activated.connect(self.tray_icon_activated)
 
+    def enter_background(self):
+        self.background = True
+        self.wakeups.set_mode('background')
+        self.pet_screen.pause()
+        self.schedule_next_event()
+
+    def leave_background(self):
+        self.background = False
+        self.wakeups.set_mode('foreground')
+        # Poner el estado al día y redibujar una sola vez
+        if self.pet.is_sleeping:
+            self.update_sleep_status()
+        elif (self.pet.is_alive and (datetime.now() - self.pet.last_update).total_seconds()
+              >= self.scheduler.MIN_AWAKE_DELAY):
+            self.pet.update_stats()
+        self.pet_screen.resume()
+        if self.pet.is_alive:
+            self.schedule_next_event()
+
+    def background_tick(self):
+        # Ventana oculta: solo lo necesario para las alertas de la bandeja
+        was_sleeping = self.pet.is_sleeping
+        self.pet.update_stats()
+        if not self.pet.is_alive:
+            self.handle_pet_death()
+        elif was_sleeping and not self.pet.is_sleeping:
+            self.enable_buttons()
+            self.ai_message_label.setText("¡Me acabo de despertar! Me siento con energía")
+        else:
+            self.notify_critical()
+
     def restore_window(self):
+        if self.background:
+            self.leave_background()
         self.showNormal()
         self.activateWindow()
 
@@ -90,6 +155,7 @@ class TamagotchiWindow(QWidget):
     def closeEvent(self, event):
         if self.tray_icon.isVisible():
             self.hide()
+            self.enter_background()
             self.tray_icon.showMessage(
                 "Tamagotchi",
                 "Tu mascota sigue viva en segundo plano! Haz doble clic en el icono para restaurar.",
@@ -102,6 +168,16 @@ class TamagotchiWindow(QWidget):
 
     def close_application(self):
         self.pet.save_state()
+        self.pet.db.close()  # Escribe los cambios pendientes antes de salir
+        if self.pet.history is not None:
+            self.pet.history.close()
+        if self.pet.events is not None:
+            self.pet.events.close()
+        self.llm.shutdown()
+        for mode, wakeups in self.wakeups.per_minute().items():
+            llm_metrics.gauge(f'timer_wakeups_per_minute_{mode}', wakeups['per_minute'])
+        llm_metrics.export()  # Solo si TAMAGOTCHI_METRICS_FILE está definido
+        instrumentation.export()  # Solo si TAMAGOTCHI_INSTRUMENT está definido
         self.tray_icon.hide()
         QApplication.quit()
 
@@ -177,8 +253,9 @@ class TamagotchiWindow(QWidget):
 
         for text, callback, icon_path in buttons:
             btn = QPushButton(text)
-            if os.path.exists(icon_path):
-                btn.setIcon(QIcon(icon_path))
+            pixmap = pixmap_cache.get(icon_path, 16, 16)
+            if not pixmap.isNull():
+                btn.setIcon(QIcon(pixmap))
             btn.clicked.connect(callback)
             button_layout.addWidget(btn)
 
@@ -201,6 +278,7 @@ class TamagotchiWindow(QWidget):
         self.ai_message_label.setFont(QFont("Arial", 14))
         self.ai_message_label.setWordWrap(True)
         main_layout.addWidget(self.ai_message_label)
+        self.reply_stream = StreamingLabel(self.ai_message_label)
 
         chat_container = QFrame()
         chat_container.setObjectName("chat-container")
@@ -224,7 +302,14 @@ class TamagotchiWindow(QWidget):
     def update_pet_status(self):
         self.pet.update_stats()
         self.pet_screen.update_stats()
+        self.notify_critical()
 
+        if not self.pet.is_alive:
+            self.handle_pet_death()
+        else:
+            self.check_critical_stats()
+
+    def notify_critical(self):
         # Mostrar notificación si alguna estadística está crítica
         if (self.pet.hunger < self.pet.CRITICAL_THRESHOLD or
             self.pet.energy < self.pet.CRITICAL_THRESHOLD or
@@ -236,11 +321,6 @@ class TamagotchiWindow(QWidget):
                 2000
             )
 
-        if not self.pet.is_alive:
-            self.handle_pet_death()
-        else:
-            self.check_critical_stats()
-
     def handle_pet_death(self):
         # Mostrar mensaje de muerte y deshabilitar interacciones
         self.ai_message_label.setText("Tu Tamagotchi ha fallecido... 😢")
@@ -248,21 +328,22 @@ class TamagotchiWindow(QWidget):
             button.setEnabled(False)
         self.user_input.setEnabled(False)
 
-        # Detener los timers
-        self.update_timer.stop()
-        self.sleep_timer.stop()
+        # Detener el timer de eventos
+        self.event_timer.stop()
 
     def feed(self):
         result = self.pet.feed()
         if result:
             self.ai_message_label.setText(result)
         self.pet_screen.update_stats()
+        self.schedule_next_event()
 
     def play(self):
         result = self.pet.play()
         if result:
             self.ai_message_label.setText(result)
         self.pet_screen.update_stats()
+        self.schedule_next_event()
 
     def sleep(self):
         result = self.pet.sleep()
@@ -270,12 +351,10 @@ class TamagotchiWindow(QWidget):
             self.ai_message_label.setText(result)
             if "Me voy a dormir" in result:
                 self.disable_buttons()
-                self.sleep_timer.start()
             elif "despertar" in result:
                 self.enable_buttons()
-                self.sleep_timer.stop()
-        self.pet_screen.update_stats()
-        self.pet_screen.update_image(self.pet.current_state_image)
+        self.pet_screen.update_stats()  # También cambia la imagen si hace falta
+        self.schedule_next_event()
 
     def disable_buttons(self):
         for button in self.findChildren(QPushButton):
@@ -291,63 +370,55 @@ class TamagotchiWindow(QWidget):
         if result:
             self.ai_message_label.setText(result)
         self.pet_screen.update_stats()
+        self.schedule_next_event()
 
     def update_ai_message(self):
-        ai_message = self.pet.get_ai_decision()
-        self.ai_message_label.setText(ai_message)
+        low_stats = self.pet.get_low_stats()
+        if not low_stats:
+            self.ai_message_label.setText("")
+        else:
+            self.check_critical_stats()
 
     def interact(self):
         user_message = self.user_input.text()
         if user_message.strip():  # Solo procesar si hay mensaje
             self.pet.chat(user_message)  # Actualizar felicidad por interacción
-            interaction_thread = threading.Thread(target=self.get_interaction_response, args=(user_message,))
-            interaction_thread.start()
+            reply = forbidden_topic_reply(user_message)
+            if reply:
+                # Descartar la respuesta pendiente del mensaje anterior para que no tape esta
+                self.replies.cancel('chat')
+                self.reply_stream.finish(self.reply_stream.begin(), reply)
+            else:
+                # El worker solo recibe una copia inmutable del estado; un mensaje
+                # nuevo cancela la respuesta pendiente del anterior
+                snapshot = self.pet.snapshot(user_message)
+                generation = self.reply_stream.begin()
+                self.replies.submit(snapshot.user_interaction_messages(user_message),
+                                    partial(local_responder.reply, snapshot, user_message),
+                                    partial(self.finish_streamed_reply, generation), channel='chat',
+                                    on_chunk=partial(self.reply_stream.append, generation),
+                                    on_local=partial(self.reply_stream.provisional, generation))
             self.user_input.clear()
             self.pet_screen.update_stats()  # Actualizar stats después de la interacción
+            self.schedule_next_event()
 
-    def get_interaction_response(self, user_message):
-        try:
-            # Crear una nueva instancia de Pet para este hilo
-            thread_pet = Pet(name=self.pet.name)
-            response = thread_pet.get_user_interaction_response(user_message)
-            QMetaObject.invokeMethod(self.ai_message_label, "setText",
-                Qt.QueuedConnection, Q_ARG(str, response))
-        except Exception as e:
-            QMetaObject.invokeMethod(self.ai_message_label, "setText",
-                Qt.QueuedConnection, Q_ARG(str, f"Error: {str(e)}"))
+    def finish_streamed_reply(self, generation, response, error):
+        # Se llama desde un hilo del pool al terminar el stream
+        text = response if error is None else f"Error: {str(error)}"
+        self.reply_stream.finish(generation, text)
+
+    def show_llm_reply(self, response, error):
+        # Se llama desde un hilo del pool: pasar el texto al hilo de la interfaz
+        text = response if error is None else f"Error: {str(error)}"
+        QMetaObject.invokeMethod(self.ai_message_label, "setText",
+            Qt.QueuedConnection, Q_ARG(str, text))
 
     def initiate_interaction(self):
         if random.random() < 0.5:  # 50% de probabilidad de iniciar interacción
-            prompt = f"""
-            Tu estado actual es:
-            - Hambre: {self.pet.hunger}
-            - Felicidad: {self.pet.happiness}
-            - Energía: {self.pet.energy}
-            - Higiene: {self.pet.hygiene}
-            """
-            interaction_thread = threading.Thread(target=self.get_initiate_interaction_response, args=(prompt,))
-            interaction_thread.start()
-
-    def get_initiate_interaction_response(self, prompt):
-        try:
-            chat_response = client.chat.complete(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Eres un Tamagotchi. Tu personalidad es divertida y un poco sarcástica, pero siempre amigable. Genera un mensaje de 1-2 oraciones para iniciar una conversación."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            QMetaObject.invokeMethod(self.ai_message_label, "setText",
-                Qt.QueuedConnection, Q_ARG(str, chat_response.choices[0].message.content))
-        except Exception as e:
-            QMetaObject.invokeMethod(self.ai_message_label, "setText",
-                Qt.QueuedConnection, Q_ARG(str, f"Error: {str(e)}"))
+            low_stats = self.pet.get_low_stats()
+            self.replies.submit(self.pet.snapshot().initiate_messages(),
+                                partial(local_responder.initiate, low_stats), self.show_llm_reply,
+                                channel='chat', call_type='initiate')
 
     def add_memory(self):
         category = self.memory_category.currentText()
@@ -356,36 +427,84 @@ class TamagotchiWindow(QWidget):
             self.pet.add_memory(category, content)
             self.memory_input.clear()
             self.pet_screen.update_stats()
+            self.schedule_next_event()
 
     def check_critical_stats(self):
-        ai_message = self.pet.get_ai_decision()
-        if ai_message:  # Solo actualizar si hay un mensaje
-            self.ai_message_label.setText(ai_message)
+        # Nunca se espera a la red aquí: el mensaje sale de la caché o llega después
+        low_stats = self.pet.get_low_stats()
+        if low_stats:
+            ai_message = self.alerts.cached(low_stats)
+            if ai_message:
+                self.ai_message_label.setText(ai_message)
+            else:
+                # La alerta local se ve ya; la de Mistral la reemplaza si sigue vigente
+                self.ai_message_label.setText(local_responder.alert(low_stats))
+                self.alerts.fetch(low_stats, self.show_alert)
+
+        # Pedir por adelantado el mensaje para los stats que van hacia el 20%
+        self.alerts.prefetch(self.pet)
+
+    def show_alert(self, low_stats, message):
+        # Se llama desde el pool; solo mostrar si la alerta sigue vigente
+        if self.pet.get_low_stats() == low_stats:
+            QMetaObject.invokeMethod(self.ai_message_label, "setText",
+                Qt.QueuedConnection, Q_ARG(str, message))
 
     def update_sleep_status(self):
-        if self.pet.is_sleeping:
-            self.pet.update_stats()
+        now = datetime.now()
+        remaining = self.pet.sleep_remaining(now)
+        # La energía se calcula en O(1): solo hace falta un tick (y redibujar)
+        # cuando cambia el porcentaje mostrado o termina la siesta
+        if remaining <= 0 or stat_percent(self.pet.energy_at(now)) != stat_percent(self.pet.energy):
+            self.pet.update_stats(now)
             self.pet_screen.update_stats()
 
-            # Actualizar mensaje con tiempo restante
-            time_slept = (datetime.now() - self.pet.sleep_start_time).total_seconds()
-            remaining = self.pet.SLEEP_DURATION - time_slept
-            if remaining > 0:
-                self.ai_message_label.setText(f"Estoy durmiendo... Me faltan {int(remaining)} segundos para despertar")
+        if self.pet.is_sleeping:
+            # Actualizar mensaje con tiempo restante, solo si cambió el segundo
+            text = f"Estoy durmiendo... Me faltan {int(remaining)} segundos para despertar"
+            if self.ai_message_label.text() != text:
+                self.ai_message_label.setText(text)
         else:
-            self.sleep_timer.stop()
             self.enable_buttons()
             self.ai_message_label.setText("¡Me acabo de despertar! Me siento con energía")
 
-def main():
+def check_assets():
     ensure_directories()
     verify_assets()
 
-    pet = Pet(name="Tami")
+def main():
+    # TAMAGOTCHI_TRACE_STARTUP=1 informa los tiempos de arranque (ver utils/startup_trace.py)
+    trace = StartupTrace(_startup)
+    trace.mark('imports_ms')
+    # Con TAMAGOTCHI_INSTRUMENT y TAMAGOTCHI_PROFILE_HZ (ver utils/instrument.py)
+    instrumentation.start_profiler()
+
     app = QApplication(sys.argv)
+    trace.mark('qapplication_ms')
+
+    # Sprites ya escalados de build_assets.py, en una sola lectura; sin paquete, archivos sueltos
+    pixmap_cache.load_bundle()
+    trace.mark('assets_ms')
+
+    # Las acciones solo marcan el estado como sucio; se escribe en lote cada pocos segundos
+    # TAMAGOTCHI_STORAGE elige el almacenamiento: sqlite (por defecto), memory o log
+    db = WriteBehindDatabase(open_storage())
+    db.start()
+    # Generador propio de la mascota: el registro de eventos guarda su estado
+    # para poder repetir la sesión de forma determinista
+    events = EventLog()
+    pet = Pet(name="Tami", db=db, history=StatsHistory(), events=events, rng=random.Random())
+    events.start(pet)
+    trace.mark('db_open_ms')
+
     window = TamagotchiWindow(pet)
+    trace.mark('window_ms')
+    trace.watch_first_paint(window, app)
     window.show()
 
+    # Las comprobaciones de archivos no retrasan la primera pintura
+    QTimer.singleShot(0, check_assets)
+
     # Eliminar o comentar el timer original de update_ai_message
     # timer = QTimer()
     # timer.timeout.connect(window.update_ai_message)
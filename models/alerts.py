@@ -0,0 +1,81 @@
+from dataclasses import replace
+import threading
+import time
+
+from models.pet import alert_messages, low_stats_for
+from models.scheduler import ALERT_LINE, StatScheduler
+
+
+class AlertPrefetcher:
+    """Genera los mensajes de alerta en segundo plano y los guarda con TTL.
+
+    La clave es la tupla de low_stats que arma get_ai_decision. Cuando algún
+    stat va camino de la línea del 20%, el mensaje para el conjunto que habrá
+    entonces se pide por adelantado, así mostrarlo no cuesta nada en el hilo
+    de la interfaz.
+    """
+
+    TTL = 10 * 60        # segundos que un mensaje sigue siendo válido
+    HORIZON = 5 * 60     # segundos hacia adelante para prever cruces
+
+    def __init__(self, llm, scheduler=None, ttl=TTL, horizon=HORIZON):
+        self.llm = llm
+        self.scheduler = scheduler or StatScheduler()
+        self.ttl = ttl
+        self.horizon = horizon
+        self._lock = threading.Lock()
+        self._cache = {}        # low_stats -> (mensaje, expira)
+        self._in_flight = {}    # low_stats -> callbacks esperando el mensaje
+
+    def cached(self, low_stats, now=None):
+        now = now or time.monotonic()
+        with self._lock:
+            entry = self._cache.get(low_stats)
+            if entry is None:
+                return None
+            message, expires = entry
+            if expires <= now:
+                del self._cache[low_stats]
+                return None
+            return message
+
+    def predicted_low_stats(self, pet):
+        # Estado con el deterioro máximo durante HORIZON: qué stats estarán bajo la línea
+        if pet.is_sleeping or not pet.is_alive:
+            return low_stats_for(pet)
+        rates = self.scheduler.max_decay_rates(pet)
+        minutes = self.horizon / 60
+        future = {
+            stat: max(0, getattr(pet, stat) - int(rate * minutes))
+            if getattr(pet, stat) >= ALERT_LINE else getattr(pet, stat)
+            for stat, rate in rates.items()
+        }
+        return low_stats_for(replace(pet.snapshot(), **future))
+
+    def fetch(self, low_stats, on_ready=None):
+        """Pide el mensaje si no está en caché ni en camino; on_ready(low_stats, mensaje) desde el pool"""
+        if not low_stats or not self.llm.available:
+            return
+        with self._lock:
+            waiters = self._in_flight.get(low_stats)
+            if waiters is not None:
+                if on_ready:
+                    waiters.append(on_ready)
+                return
+            self._in_flight[low_stats] = [on_ready] if on_ready else []
+
+        def store(message, error):
+            with self._lock:
+                waiters = self._in_flight.pop(low_stats, [])
+                if error is None and message:
+                    self._cache[low_stats] = (message, time.monotonic() + self.ttl)
+            if error is None and message:
+                for callback in waiters:
+                    callback(low_stats, message)
+
+        self.llm.submit(alert_messages(low_stats), store, channel='alert:' + '|'.join(low_stats))
+
+    def prefetch(self, pet):
+        for low_stats in {low_stats_for(pet), self.predicted_low_stats(pet)}:
+            if low_stats and self.cached(low_stats) is None:
+                self.fetch(low_stats)
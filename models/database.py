@@ -1,18 +1,105 @@
+import os
 import sqlite3
 from datetime import datetime
 import threading
 
+from utils.instrument import timed
+
+STATS_COLUMNS = ('id, hunger, happiness, energy, hygiene, age, last_update, is_alive, life_start_time, '
+                 'is_sleeping, sleep_start_time, sleep_start_energy')
+MEMORY_COLUMNS = 'id, category, content, created_at'
+DEFAULT_PATH = 'pet_data.db'
+# Ajustes por conexión: caché de páginas de 8 MB y tablas temporales en memoria
+TUNING_PRAGMAS = ('cache_size=-8192', 'temp_store=MEMORY')
+
+
+def stats_row(pet):
+    return (pet.pet_id, pet.hunger, pet.happiness, pet.energy, pet.hygiene,
+            pet.age, pet.last_update.isoformat(), pet.is_alive,
+            pet.life_start_time.isoformat() if pet.life_start_time else None,
+            pet.is_sleeping, pet.sleep_start_time.isoformat() if pet.sleep_start_time else None,
+            pet.sleep_start_energy)
+
+
+def stats_from_row(row):
+    # Las filas de antes de guardar la siesta tienen 9 columnas
+    sleeping = len(row) > 9 and bool(row[9]) and row[10] is not None
+    return {
+        'hunger': row[1],
+        'happiness': row[2],
+        'energy': row[3],
+        'hygiene': row[4],
+        'age': row[5],
+        'last_update': datetime.fromisoformat(row[6]),
+        'is_alive': bool(row[7]),
+        'life_start_time': datetime.fromisoformat(row[8]) if row[8] else datetime.now(),
+        'is_sleeping': sleeping,
+        'sleep_start_time': datetime.fromisoformat(row[10]) if sleeping else None,
+        'sleep_start_energy': row[11] if sleeping else None,
+    }
+
+
+def rank_memories(memories, words, categories, limit):
+    # Búsqueda sin índice: puntuar cada memoria y quedarse con las mejores
+    categories = {category.lower() for category in categories}
+    scored = []
+    for memory in memories:
+        content = memory[2].lower()
+        score = sum(word in content for word in words) + (memory[1].lower() in categories)
+        if score:
+            scored.append((-score, memory[0], memory))
+    scored.sort()
+    return [memory for _, _, memory in scored[:limit]]
+
+
 class PetDatabase:
-    _local = threading.local()
+    """Almacenamiento en SQLite (WAL por defecto) con una conexión por hilo.
 
-    def __init__(self):
+    Las conexiones de hilos que ya terminaron se cierran al abrir una nueva;
+    release() cierra la del hilo actual y close() todas.
+    """
+
+    stats_row = staticmethod(stats_row)
+
+    def __init__(self, path=None, journal_mode='WAL', synchronous='NORMAL'):
+        # TAMAGOTCHI_DB permite usar otro archivo (benchmarks, pruebas, varias instancias)
+        self.path = path or os.getenv('TAMAGOTCHI_DB', DEFAULT_PATH)
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.commits = 0  # Número de commits, útil para medir escrituras por acción
+        self._conns = {}  # hilo -> conexión
+        self._conns_lock = threading.Lock()
         self._get_conn()
         self.create_tables()
 
+    @property
+    def open_connections(self):
+        return len(self._conns)
+
+    def _connect(self):
+        # check_same_thread=False solo para poder cerrarla desde otro hilo;
+        # cada conexión la usa únicamente el hilo que la abrió
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute(f'PRAGMA journal_mode={self.journal_mode}')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        for pragma in TUNING_PRAGMAS:
+            conn.execute(f'PRAGMA {pragma}')
+        return conn
+
     def _get_conn(self):
-        if not hasattr(self._local, 'conn'):
-            self._local.conn = sqlite3.connect('pet_data.db')
-        return self._local.conn
+        thread = threading.current_thread()
+        conn = self._conns.get(thread)
+        if conn is None:
+            conn = self._connect()
+            with self._conns_lock:
+                for dead in [t for t in self._conns if not t.is_alive()]:
+                    self._conns.pop(dead).close()
+                self._conns[thread] = conn
+        return conn
+
+    def _commit(self):
+        self._get_conn().commit()
+        self.commits += 1
 
     def create_tables(self):
         cursor = self._get_conn().cursor()
@@ -21,8 +108,8 @@ class PetDatabase:
         cursor.execute("PRAGMA table_info(pet_stats)")
         columns = [column[1] for column in cursor.fetchall()]
 
-        if 'pet_stats' not in columns:
-            # Crear tabla si no existe
+        if not columns:
+            # Crear tabla si no existe; id es el identificador de cada mascota
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS pet_stats (
                 id INTEGER PRIMARY KEY,
@@ -33,58 +120,130 @@ class PetDatabase:
                 age INTEGER,
                 last_update TEXT,
                 is_alive BOOLEAN,
-                life_start_time TEXT DEFAULT NULL
+                life_start_time TEXT DEFAULT NULL,
+                is_sleeping BOOLEAN DEFAULT 0,
+                sleep_start_time TEXT DEFAULT NULL,
+                sleep_start_energy INTEGER DEFAULT NULL
             )
             ''')
-        elif 'life_start_time' not in columns:
-            # Agregar columna life_start_time si no existe
-            cursor.execute('ALTER TABLE pet_stats ADD COLUMN life_start_time TEXT DEFAULT NULL')
+        else:
+            if 'life_start_time' not in columns:
+                # Agregar columna life_start_time si no existe
+                cursor.execute('ALTER TABLE pet_stats ADD COLUMN life_start_time TEXT DEFAULT NULL')
+            if 'is_sleeping' not in columns:
+                # Estado de la siesta, para que sobreviva a un reinicio
+                cursor.execute('ALTER TABLE pet_stats ADD COLUMN is_sleeping BOOLEAN DEFAULT 0')
+                cursor.execute('ALTER TABLE pet_stats ADD COLUMN sleep_start_time TEXT DEFAULT NULL')
+                cursor.execute('ALTER TABLE pet_stats ADD COLUMN sleep_start_energy INTEGER DEFAULT NULL')
 
-        # Tabla para las memorias del pet
+        # Tabla para las memorias, cada una ligada a su mascota
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS pet_memories (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             category TEXT,
             content TEXT,
-            created_at TEXT
+            created_at TEXT,
+            pet_id INTEGER NOT NULL DEFAULT 1
         )
         ''')
 
-        self._get_conn().commit()
+        cursor.execute("PRAGMA table_info(pet_memories)")
+        if 'pet_id' not in [column[1] for column in cursor.fetchall()]:
+            # Bases de datos antiguas: todas las memorias eran de la mascota 1
+            cursor.execute('ALTER TABLE pet_memories ADD COLUMN pet_id INTEGER NOT NULL DEFAULT 1')
 
-    def save_stats(self, pet):
-        cursor = self._get_conn().cursor()
         cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_pet_memories_pet_category
+        ON pet_memories (pet_id, category)
+        ''')
+
+        self.has_fts = self._create_fts(cursor)
+
+        self._commit()
+
+    def _create_fts(self, cursor):
+        # Índice de texto completo sobre pet_memories, sincronizado con triggers
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'pet_memories_fts'")
+        exists = cursor.fetchone() is not None
+        try:
+            cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS pet_memories_fts USING fts5(
+                category, content, pet_id,
+                content='pet_memories', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            ''')
+        except sqlite3.OperationalError:
+            return False  # SQLite sin FTS5: get_relevant_memories usa el recorrido simple
+
+        cursor.executescript('''
+        CREATE TRIGGER IF NOT EXISTS pet_memories_fts_insert AFTER INSERT ON pet_memories BEGIN
+            INSERT INTO pet_memories_fts (rowid, category, content, pet_id)
+            VALUES (new.id, new.category, new.content, new.pet_id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS pet_memories_fts_delete AFTER DELETE ON pet_memories BEGIN
+            INSERT INTO pet_memories_fts (pet_memories_fts, rowid, category, content, pet_id)
+            VALUES ('delete', old.id, old.category, old.content, old.pet_id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS pet_memories_fts_update AFTER UPDATE ON pet_memories BEGIN
+            INSERT INTO pet_memories_fts (pet_memories_fts, rowid, category, content, pet_id)
+            VALUES ('delete', old.id, old.category, old.content, old.pet_id);
+            INSERT INTO pet_memories_fts (rowid, category, content, pet_id)
+            VALUES (new.id, new.category, new.content, new.pet_id);
+        END;
+        ''')
+        if not exists:
+            # Indexar las memorias que ya existían
+            cursor.execute("INSERT INTO pet_memories_fts (pet_memories_fts) VALUES ('rebuild')")
+        return True
+
+    def _write_stats(self, cursor, rows):
+        cursor.executemany(f'''
         INSERT OR REPLACE INTO pet_stats
-        (id, hunger, happiness, energy, hygiene, age, last_update, is_alive, life_start_time)
-        VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (pet.hunger, pet.happiness, pet.energy, pet.hygiene,
-              pet.age, pet.last_update.isoformat(), pet.is_alive,
-              pet.life_start_time.isoformat() if pet.life_start_time else None))
-        self._get_conn().commit()
+        ({STATS_COLUMNS})
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+    def save_stats(self, pet):
+        self._write_stats(self._get_conn().cursor(), [self.stats_row(pet)])
+        self._commit()
+
+    def save_many(self, rows):
+        """Guarda muchas mascotas (filas de stats_row) en una sola transacción"""
+        self.write_batch(rows)
 
-    def load_stats(self):
+    def load_stats(self, pet_id=1):
         cursor = self._get_conn().cursor()
-        cursor.execute('SELECT * FROM pet_stats WHERE id = 1')
+        cursor.execute(f'SELECT {STATS_COLUMNS} FROM pet_stats WHERE id = ?', (pet_id,))
         row = cursor.fetchone()
         if row:
-            return {
-                'hunger': row[1],
-                'happiness': row[2],
-                'energy': row[3],
-                'hygiene': row[4],
-                'age': row[5],
-                'last_update': datetime.fromisoformat(row[6]),
-                'is_alive': bool(row[7]),
-                'life_start_time': datetime.fromisoformat(row[8]) if row[8] else datetime.now()
-            }
+            return stats_from_row(row)
         return None
 
-    def add_memory(self, category, content):
+    def load_many(self, pet_ids=None):
+        """Devuelve {pet_id: stats} para las mascotas indicadas, o para todas"""
         cursor = self._get_conn().cursor()
+        if pet_ids is None:
+            cursor.execute(f'SELECT {STATS_COLUMNS} FROM pet_stats')
+            rows = cursor.fetchall()
+        else:
+            # Tabla temporal para no exceder el límite de parámetros de SQLite
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS wanted_pets (id INTEGER PRIMARY KEY)')
+            cursor.execute('DELETE FROM wanted_pets')
+            cursor.executemany('INSERT OR IGNORE INTO wanted_pets VALUES (?)',
+                               ((pet_id,) for pet_id in pet_ids))
+            cursor.execute(f'''
+            SELECT {STATS_COLUMNS} FROM pet_stats
+            WHERE id IN (SELECT id FROM wanted_pets)
+            ''')
+            rows = cursor.fetchall()
+            cursor.execute('DELETE FROM wanted_pets')
+        return {row[0]: stats_from_row(row) for row in rows}
+
+    def _write_memory(self, cursor, pet_id, category, content, created_at):
         cursor.execute('''
-        SELECT id FROM pet_memories WHERE category = ?
-        ''', (category,))
+        SELECT id FROM pet_memories WHERE pet_id = ? AND category = ?
+        ''', (pet_id, category))
 
         existing_memory = cursor.fetchone()
 
@@ -92,25 +251,214 @@ class PetDatabase:
             cursor.execute('''
             UPDATE pet_memories
             SET content = ?, created_at = ?
-            WHERE category = ?
-            ''', (content, datetime.now().isoformat(), category))
+            WHERE id = ?
+            ''', (content, created_at, existing_memory[0]))
         else:
             cursor.execute('''
-            INSERT INTO pet_memories (category, content, created_at)
-            VALUES (?, ?, ?)
-            ''', (category, content, datetime.now().isoformat()))
+            INSERT INTO pet_memories (pet_id, category, content, created_at)
+            VALUES (?, ?, ?, ?)
+            ''', (pet_id, category, content, created_at))
 
-        self._get_conn().commit()
+    def add_memory(self, category, content, pet_id=1):
+        self._write_memory(self._get_conn().cursor(), pet_id, category, content,
+                           datetime.now().isoformat())
+        self._commit()
+
+    def add_memories(self, rows, append=False):
+        """Escribe en bloque filas (pet_id, category, content, created_at) en una transacción.
+
+        Como add_memory, una memoria por categoría: la existente se reemplaza.
+        Con append=True se insertan todas sin buscar (sembrar historiales grandes).
+        """
+        cursor = self._get_conn().cursor()
+        try:
+            if append:
+                cursor.executemany('''
+                INSERT INTO pet_memories (pet_id, category, content, created_at)
+                VALUES (?, ?, ?, ?)
+                ''', rows)
+            else:
+                for pet_id, category, content, created_at in rows:
+                    self._write_memory(cursor, pet_id, category, content, created_at)
+        except sqlite3.Error:
+            self._get_conn().rollback()
+            raise
+        self._commit()
+
+    def write_batch(self, stats_rows=(), memories=()):
+        # Escribe varios cambios en una sola transacción con un único commit
+        cursor = self._get_conn().cursor()
+        try:
+            if stats_rows:
+                self._write_stats(cursor, stats_rows)
+            for pet_id, category, content, created_at in memories:
+                self._write_memory(cursor, pet_id, category, content, created_at)
+        except sqlite3.Error:
+            self._get_conn().rollback()
+            raise
+        self._commit()
 
-    def get_memories(self, category=None):
+    def get_memories(self, category=None, pet_id=1):
         cursor = self._get_conn().cursor()
         if category:
-            cursor.execute('SELECT * FROM pet_memories WHERE category = ?', (category,))
+            cursor.execute(f'''
+            SELECT {MEMORY_COLUMNS} FROM pet_memories WHERE pet_id = ? AND category = ?
+            ''', (pet_id, category))
         else:
-            cursor.execute('SELECT * FROM pet_memories')
+            cursor.execute(f'SELECT {MEMORY_COLUMNS} FROM pet_memories WHERE pet_id = ?', (pet_id,))
         return cursor.fetchall()
 
+    def search_memories(self, words, categories=(), pet_id=1, limit=5):
+        """Memorias de la mascota que contienen alguna palabra (como prefijo) o son de
+        alguna de las categorías, ordenadas por relevancia (bm25) y limitadas a `limit`"""
+        terms = ['"' + word.replace('"', '""') + '"*' for word in words]
+        terms += ['category:"' + category.replace('"', '""') + '"' for category in categories]
+        if not terms:
+            return []
+
+        if not self.has_fts:
+            return rank_memories(self.get_memories(pet_id=pet_id), words, categories, limit)
+
+        cursor = self._get_conn().cursor()
+        # Ordenar y limitar dentro de FTS5 antes de leer las filas de pet_memories
+        cursor.execute(f'''
+        SELECT m.id, m.category, m.content, m.created_at
+        FROM (
+            SELECT rowid, rank FROM pet_memories_fts
+            WHERE pet_memories_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        ) AS hits
+        JOIN pet_memories m ON m.id = hits.rowid
+        ORDER BY hits.rank
+        ''', (f'pet_id:"{int(pet_id)}" AND ({" OR ".join(terms)})', limit))
+        return cursor.fetchall()
+
+    def release(self):
+        """Cierra la conexión del hilo actual (para hilos que van a terminar)"""
+        with self._conns_lock:
+            conn = self._conns.pop(threading.current_thread(), None)
+        if conn is not None:
+            conn.close()
+
+    def close(self):
+        with self._conns_lock:
+            conns, self._conns = list(self._conns.values()), {}
+        for conn in conns:
+            conn.close()
+
+
+class WriteBehindDatabase:
+    """Envuelve un almacenamiento (PetDatabase u otro de models.storage) y agrupa las escrituras en un solo commit.
+
+    save_stats y add_memory solo marcan el estado como sucio; flush() lo
+    escribe todo en una transacción. Una lectura hace flush antes si hay
+    cambios pendientes de ese tipo, para ver siempre los últimos datos.
+    Con start() se hace flush periódico desde un hilo en segundo plano,
+    fuera del hilo de la interfaz; el hilo solo despierta si hay algo
+    pendiente, flush_interval segundos después del primer cambio.
+    """
+
+    def __init__(self, db=None, flush_interval=5.0):
+        self.db = db or PetDatabase()
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending_stats = {}  # pet_id -> última fila, los cambios se fusionan
+        self._pending_memories = []
+        self._stop = threading.Event()
+        self._pending = threading.Event()  # Hay cambios sin escribir
+        self._thread = None
+        self.wakeups = 0  # Veces que despertó el hilo de flush
+
+    @property
+    def dirty(self):
+        return bool(self._pending_stats) or bool(self._pending_memories)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='pet-db-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Sin cambios pendientes el hilo duerme hasta el próximo save_stats
+            self._pending.wait()
+            if self._stop.wait(self.flush_interval):
+                break
+            self.wakeups += 1
+            try:
+                self.flush()
+            except Exception as e:
+                # flush() ya devolvió los cambios a la cola: se reintenta en el próximo intervalo
+                print(f"Error guardando en la base de datos: {e}")
+        self.db.release()  # Cerrar la conexión propia de este hilo
+
+    def save_stats(self, pet):
+        row = self.db.stats_row(pet)
+        with self._lock:
+            self._pending_stats[pet.pet_id] = row
+            self._pending.set()
+
+    def save_many(self, rows):
+        with self._lock:
+            for row in rows:
+                self._pending_stats[row[0]] = row
+            self._pending.set()
+
+    def add_memory(self, category, content, pet_id=1):
+        with self._lock:
+            self._pending_memories.append((pet_id, category, content, datetime.now().isoformat()))
+            self._pending.set()
+
+    @timed('db_flush')
+    def flush(self):
+        # _flush_lock serializa los flush; _lock solo protege lo pendiente, así
+        # save_stats no espera a que termine la escritura en disco
+        with self._flush_lock:
+            with self._lock:
+                if not self.dirty:
+                    return False
+                stats, self._pending_stats = self._pending_stats, {}
+                memories, self._pending_memories = self._pending_memories, []
+                self._pending.clear()
+            try:
+                self.db.write_batch(list(stats.values()), memories)
+            except (sqlite3.Error, OSError):
+                # Devolver los cambios a la cola para el próximo intento
+                with self._lock:
+                    for pet_id, row in stats.items():
+                        self._pending_stats.setdefault(pet_id, row)
+                    self._pending_memories[:0] = memories
+                    self._pending.set()
+                raise
+        return True
+
+    def load_stats(self, pet_id=1):
+        if pet_id in self._pending_stats:
+            self.flush()
+        return self.db.load_stats(pet_id)
+
+    def load_many(self, pet_ids=None):
+        if self._pending_stats:
+            self.flush()
+        return self.db.load_many(pet_ids)
+
+    def get_memories(self, category=None, pet_id=1):
+        if self._pending_memories:
+            self.flush()
+        return self.db.get_memories(category, pet_id)
+
+    def search_memories(self, words, categories=(), pet_id=1, limit=5):
+        if self._pending_memories:
+            self.flush()
+        return self.db.search_memories(words, categories, pet_id, limit)
+
     def close(self):
-        if hasattr(self._local, 'conn'):
-            self._local.conn.close()
-            del self._local.conn
+        if self._thread is not None:
+            self._stop.set()
+            self._pending.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        self.db.close()
@@ -0,0 +1,290 @@
+from array import array
+import json
+import os
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+DEFAULT_PATH = 'pet_events.db'
+
+# El orden define el código que se guarda: solo se pueden añadir al final
+EVENT_KINDS = ('tick', 'feed', 'play', 'clean', 'sleep', 'wake_up', 'chat', 'add_memory')
+KIND_CODES = {kind: code for code, kind in enumerate(EVENT_KINDS)}
+TIMED_KINDS = ('tick', 'sleep')  # Acciones que reciben el momento como argumento
+
+EPOCH = datetime(1970, 1, 1)
+
+# Campos de Pet que forman una instantánea (las memorias viven en el almacenamiento)
+SNAPSHOT_FIELDS = ('name', 'hunger', 'happiness', 'energy', 'hygiene', 'age', 'is_alive',
+                   'is_sleeping', 'current_state_image', 'sleep_start_energy')
+SNAPSHOT_TIMES = ('last_update', 'life_start_time', 'sleep_start_time')
+
+
+def to_micros(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(value):
+    return EPOCH + timedelta(microseconds=value)
+
+
+def pack_rng(rng):
+    version, internal, gauss = rng.getstate()
+    return json.dumps([version, gauss]), array('I', internal).tobytes()
+
+
+def unpack_rng(header, internal):
+    version, gauss = json.loads(header)
+    state = array('I')
+    state.frombytes(internal)
+    rng = random.Random()
+    rng.setstate((version, tuple(state), gauss))
+    return rng
+
+
+def apply_event(pet, kind, at, payload):
+    """Repite sobre pet una acción registrada, con el mismo momento y argumentos"""
+    if kind == 'tick':
+        pet.update_stats(at)
+    elif kind == 'sleep':
+        pet.sleep(at)
+    else:
+        getattr(pet, kind)(*payload)
+
+
+class EventLog:
+    """Registro de las acciones de cada mascota con instantáneas periódicas.
+
+    Cada evento es (mascota, número de secuencia, momento en microsegundos,
+    código de acción, argumentos en JSON o NULL). Cada snapshot_every eventos
+    se guarda una instantánea del Pet, incluido el estado de su generador
+    aleatorio: cualquier estado pasado se reconstruye desde la instantánea
+    anterior más unos pocos eventos, y una sesión entera se puede repetir de
+    forma determinista sin esperar el tiempo real. Al abrir la aplicación se
+    guarda una instantánea de sesión (el estado cargado puede no coincidir
+    con el final de la sesión anterior, y el generador es nuevo).
+
+    Los eventos se acumulan en memoria y se escriben en una transacción cada
+    flush_events eventos, con cada instantánea y al cerrar. Al guardar una
+    instantánea se borra lo anterior a la última instantánea con más de
+    retention segundos: lo que queda se sigue pudiendo reconstruir y el
+    tamaño por mascota no crece con su edad.
+    """
+
+    def __init__(self, path=None, snapshot_every=500, flush_events=100, retention=7 * 24 * 3600):
+        self.path = path or os.getenv('TAMAGOTCHI_EVENTS_DB', DEFAULT_PATH)
+        self.snapshot_every = snapshot_every
+        self.flush_events = flush_events
+        self.retention = retention
+        self.commits = 0
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._pending_events = []
+        self._pending_snapshots = []
+        self._seq = {}  # pet_id -> último número de secuencia
+        self._last_at = {}  # pet_id -> momento del último evento, en microsegundos
+        self.create_tables()
+
+    def create_tables(self):
+        self._conn.executescript('''
+        CREATE TABLE IF NOT EXISTS pet_events (
+            pet_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            at INTEGER NOT NULL,
+            kind INTEGER NOT NULL,
+            payload TEXT,
+            PRIMARY KEY (pet_id, seq)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS pet_snapshots (
+            pet_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            session INTEGER NOT NULL,
+            state TEXT NOT NULL,
+            rng_header TEXT NOT NULL,
+            rng_state BLOB NOT NULL,
+            PRIMARY KEY (pet_id, seq)
+        ) WITHOUT ROWID;
+        ''')
+        self._conn.commit()
+
+    def last_seq(self, pet_id):
+        if pet_id not in self._seq:
+            row = self._conn.execute('SELECT MAX(seq) FROM pet_events WHERE pet_id = ?',
+                                     (pet_id,)).fetchone()
+            self._seq[pet_id] = row[0] or 0
+        return self._seq[pet_id]
+
+    def start(self, pet):
+        """Instantánea de inicio de sesión; el Pet debe tener su propio rng"""
+        self._snapshot(pet, self.last_seq(pet.pet_id), session=True)
+        self.flush()
+
+    def append(self, pet, kind, at, payload=()):
+        seq = self.last_seq(pet.pet_id) + 1
+        self._seq[pet.pet_id] = seq
+        self._last_at[pet.pet_id] = to_micros(at)
+        self._pending_events.append((pet.pet_id, seq, self._last_at[pet.pet_id], KIND_CODES[kind],
+                                     json.dumps(payload, ensure_ascii=False) if payload else None))
+        if seq % self.snapshot_every == 0:
+            self._snapshot(pet, seq)
+            self.flush()
+        elif len(self._pending_events) >= self.flush_events:
+            self.flush()
+        return seq
+
+    @staticmethod
+    def pet_state(pet):
+        state = {name: getattr(pet, name) for name in SNAPSHOT_FIELDS}
+        for name in SNAPSHOT_TIMES:
+            value = getattr(pet, name)
+            state[name] = to_micros(value) if value else None
+        return state
+
+    def _snapshot(self, pet, seq, session=False):
+        self._pending_snapshots.append((pet.pet_id, seq, int(session),
+                                        json.dumps(self.pet_state(pet)), *pack_rng(pet.rng)))
+
+    def flush(self):
+        if not self._pending_events and not self._pending_snapshots:
+            return False
+        with self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO pet_events VALUES (?, ?, ?, ?, ?)',
+                                   self._pending_events)
+            self._conn.executemany('INSERT OR REPLACE INTO pet_snapshots VALUES (?, ?, ?, ?, ?, ?)',
+                                   self._pending_snapshots)
+            for pet_id in {snapshot[0] for snapshot in self._pending_snapshots}:
+                self._prune(pet_id)
+        self.commits += 1
+        self._pending_events.clear()
+        self._pending_snapshots.clear()
+        return True
+
+    def _prune(self, pet_id):
+        # Corte: la última instantánea tomada antes de last_at - retention
+        if pet_id not in self._last_at:
+            return
+        row = self._conn.execute('''
+        SELECT MAX(seq) FROM pet_snapshots WHERE pet_id = ? AND seq <= (
+            SELECT MAX(seq) FROM pet_events WHERE pet_id = ? AND at < ?)
+        ''', (pet_id, pet_id, self._last_at[pet_id] - self.retention * 1_000_000)).fetchone()
+        if row[0]:
+            self._conn.execute('DELETE FROM pet_events WHERE pet_id = ? AND seq <= ?', (pet_id, row[0]))
+            self._conn.execute('DELETE FROM pet_snapshots WHERE pet_id = ? AND seq < ?', (pet_id, row[0]))
+
+    def events(self, pet_id, after=0, until=None):
+        """Eventos (seq, momento, tipo, argumentos) con after < seq <= until"""
+        self.flush()
+        rows = self._conn.execute('''
+        SELECT seq, at, kind, payload FROM pet_events
+        WHERE pet_id = ? AND seq > ? AND seq <= ?
+        ORDER BY seq
+        ''', (pet_id, after, until if until is not None else self.last_seq(pet_id)))
+        for seq, at, kind, payload in rows:
+            yield seq, from_micros(at), EVENT_KINDS[kind], json.loads(payload) if payload else ()
+
+    def seq_at(self, pet_id, when):
+        """Último evento ocurrido hasta `when` (0 si ninguno)"""
+        self.flush()
+        row = self._conn.execute('SELECT MAX(seq) FROM pet_events WHERE pet_id = ? AND at <= ?',
+                                 (pet_id, to_micros(when))).fetchone()
+        return row[0] or 0
+
+    def stored(self, pet_id):
+        """(eventos, instantáneas) que quedan guardados de la mascota"""
+        self.flush()
+        return tuple(self._conn.execute(f'SELECT COUNT(*) FROM {table} WHERE pet_id = ?', (pet_id,)).fetchone()[0]
+                     for table in ('pet_events', 'pet_snapshots'))
+
+    def _snapshots(self, pet_id, after, until):
+        return self._conn.execute('''
+        SELECT seq, session, state, rng_header, rng_state FROM pet_snapshots
+        WHERE pet_id = ? AND seq > ? AND seq <= ?
+        ORDER BY seq
+        ''', (pet_id, after, until)).fetchall()
+
+    def _nearest_snapshot(self, pet_id, seq):
+        return self._conn.execute('''
+        SELECT seq, session, state, rng_header, rng_state FROM pet_snapshots
+        WHERE pet_id = ? AND seq <= ?
+        ORDER BY seq DESC LIMIT 1
+        ''', (pet_id, seq)).fetchone()
+
+    def _oldest_snapshot(self, pet_id):
+        return self._conn.execute('''
+        SELECT seq, session, state, rng_header, rng_state FROM pet_snapshots
+        WHERE pet_id = ? ORDER BY seq LIMIT 1
+        ''', (pet_id,)).fetchone()
+
+    @staticmethod
+    def _load_snapshot(pet, snapshot):
+        _, _, state, rng_header, rng_state = snapshot
+        state = json.loads(state)
+        for name in SNAPSHOT_TIMES:
+            state[name] = from_micros(state[name]) if state[name] is not None else None
+        for name, value in state.items():
+            setattr(pet, name, value)
+        pet.rng = unpack_rng(rng_header, rng_state)
+
+    def _new_pet(self, pet_id, snapshot, db):
+        from models.pet import Pet
+        from models.storage import MemoryStorage
+
+        # Los valores del almacenamiento se sustituyen por los de la instantánea
+        pet = Pet(name="", db=db or MemoryStorage(), pet_id=pet_id)
+        self._load_snapshot(pet, snapshot)
+        return pet
+
+    def restore(self, pet_id, seq=None, db=None):
+        """Pet tal como estaba tras el evento seq (el último si es None).
+
+        Parte de la instantánea más cercana anterior y aplica solo los eventos
+        siguientes. db es el almacenamiento del Pet reconstruido (en memoria por
+        defecto, así la reconstrucción no toca los datos reales).
+        """
+        self.flush()
+        if seq is None:
+            seq = self.last_seq(pet_id)
+        snapshot = self._nearest_snapshot(pet_id, seq)
+        if snapshot is None:
+            raise LookupError(f"No hay instantánea de la mascota {pet_id} anterior al evento {seq}")
+        pet = self._new_pet(pet_id, snapshot, db)
+        for _, at, kind, payload in self.events(pet_id, snapshot[0], seq):
+            apply_event(pet, kind, at, payload)
+        return pet
+
+    def replay(self, pet_id, start=0, until=None, db=None, on_event=None):
+        """Repite todos los eventos desde la instantánea en o antes de start.
+
+        Comprueba el estado contra cada instantánea periódica y se resincroniza
+        en las de sesión. Devuelve (pet, eventos aplicados, discrepancias).
+        on_event(pet, seq, kind) se llama tras cada evento.
+        """
+        self.flush()
+        if until is None:
+            until = self.last_seq(pet_id)
+        # Si start cae antes de la retención, desde la instantánea más antigua que quede
+        first = self._nearest_snapshot(pet_id, start) or self._oldest_snapshot(pet_id)
+        if first is None:
+            raise LookupError(f"No hay instantánea de la mascota {pet_id} anterior al evento {start}")
+        pet = self._new_pet(pet_id, first, db)
+        snapshots = {snapshot[0]: snapshot for snapshot in self._snapshots(pet_id, first[0], until)}
+        applied = mismatches = 0
+        for seq, at, kind, payload in self.events(pet_id, first[0], until):
+            apply_event(pet, kind, at, payload)
+            applied += 1
+            if on_event is not None:
+                on_event(pet, seq, kind)
+            snapshot = snapshots.get(seq)
+            if snapshot is None:
+                continue
+            if snapshot[1]:
+                self._load_snapshot(pet, snapshot)
+            elif (json.loads(snapshot[2]) != self.pet_state(pet)
+                  or pack_rng(pet.rng) != (snapshot[3], snapshot[4])):
+                mismatches += 1
+        return pet, applied, mismatches
+
+    def close(self):
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,213 @@
+from array import array
+import os
+import sqlite3
+from datetime import datetime
+
+STATS = ('hunger', 'happiness', 'energy', 'hygiene')
+DEFAULT_PATH = 'pet_history.db'
+
+BLOCK_SECONDS = 3600  # Cada bloque de muestras cubre una hora
+MINUTE = 60
+HOUR = 3600
+RESOLUTIONS = (MINUTE, HOUR)
+RAW_INTERVAL = 30  # Separación mínima entre ticks (StatScheduler.MIN_AWAKE_DELAY)
+
+# count, mínimos, máximos y sumas de cada stat
+ROLLUP_COLUMNS = ['count'] + [f'{stat}_{agg}' for agg in ('min', 'max', 'sum') for stat in STATS]
+
+
+def new_rollup(values):
+    return [1, *values, *values, *values]
+
+
+def add_to_rollup(rollup, values):
+    rollup[0] += 1
+    for i, value in enumerate(values):
+        rollup[1 + i] = min(rollup[1 + i], value)
+        rollup[5 + i] = max(rollup[5 + i], value)
+        rollup[9 + i] += value
+
+
+class StatsHistory:
+    """Historial de stats de cada mascota, de solo anexado y con tamaño acotado.
+
+    Las muestras se guardan por bloques de una hora como arrays int16
+    empaquetados (segundo dentro del bloque y los cuatro stats: 10 bytes por
+    muestra). Al llegar cada muestra se actualizan sus agregados por minuto y
+    por hora (count, min, max, suma). Los bloques se conservan raw_retention
+    segundos, los agregados por minuto minute_retention y los de hora siempre.
+
+    Las escrituras se acumulan en memoria y se guardan en una transacción cada
+    flush_samples muestras, al consultar o al cerrar.
+    """
+
+    def __init__(self, path=None, raw_retention=24 * 3600, minute_retention=7 * 24 * 3600,
+                 flush_samples=120):
+        self.path = path or os.getenv('TAMAGOTCHI_HISTORY_DB', DEFAULT_PATH)
+        self.raw_retention = raw_retention
+        self.minute_retention = minute_retention
+        self.flush_samples = flush_samples
+        self.commits = 0
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._blocks = {}   # (pet_id, block_start) -> array('h') pendiente de guardar
+        self._rollups = {}  # (pet_id, resolution, bucket_start) -> lista de ROLLUP_COLUMNS
+        self._last = {}     # pet_id -> segundo de la última muestra
+        self._pending = 0
+        self.create_tables()
+
+    def create_tables(self):
+        self._conn.executescript(f'''
+        CREATE TABLE IF NOT EXISTS stats_history_blocks (
+            pet_id INTEGER NOT NULL,
+            block_start INTEGER NOT NULL,
+            samples BLOB NOT NULL,
+            PRIMARY KEY (pet_id, block_start)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS stats_rollups (
+            pet_id INTEGER NOT NULL,
+            resolution INTEGER NOT NULL,
+            bucket_start INTEGER NOT NULL,
+            {', '.join(f'{column} INTEGER NOT NULL' for column in ROLLUP_COLUMNS)},
+            PRIMARY KEY (pet_id, resolution, bucket_start)
+        ) WITHOUT ROWID;
+        ''')
+        self._conn.commit()
+
+    def _block(self, pet_id, block_start):
+        key = (pet_id, block_start)
+        block = self._blocks.get(key)
+        if block is None:
+            block = array('h')
+            row = self._conn.execute('''
+            SELECT samples FROM stats_history_blocks WHERE pet_id = ? AND block_start = ?
+            ''', key).fetchone()
+            if row:
+                # Continuar un bloque ya guardado (por ejemplo tras reiniciar)
+                block.frombytes(row[0])
+                self._last[pet_id] = max(self._last.get(pet_id, -1), block_start + block[-5])
+            self._blocks[key] = block
+        return block
+
+    def _rollup(self, pet_id, resolution, bucket_start, values):
+        key = (pet_id, resolution, bucket_start)
+        rollup = self._rollups.get(key)
+        if rollup is None:
+            row = self._conn.execute(f'''
+            SELECT {', '.join(ROLLUP_COLUMNS)} FROM stats_rollups
+            WHERE pet_id = ? AND resolution = ? AND bucket_start = ?
+            ''', key).fetchone()
+            if row is None:
+                self._rollups[key] = new_rollup(values)
+                return
+            rollup = self._rollups[key] = list(row)
+        add_to_rollup(rollup, values)
+
+    def record(self, pet_id, when, hunger, happiness, energy, hygiene):
+        """Añade una muestra; las anteriores a la última de la mascota se ignoran"""
+        second = int(when.timestamp())
+        block_start = second - second % BLOCK_SECONDS
+        block = self._block(pet_id, block_start)
+        if second <= self._last.get(pet_id, -1):
+            return False
+        values = (hunger, happiness, energy, hygiene)
+        block.extend((second - block_start, *values))
+        for resolution in RESOLUTIONS:
+            self._rollup(pet_id, resolution, second - second % resolution, values)
+        self._last[pet_id] = second
+        self._pending += 1
+        if self._pending >= self.flush_samples:
+            self.flush()
+        return True
+
+    def record_pet(self, pet, when):
+        return self.record(pet.pet_id, when, pet.hunger, pet.happiness, pet.energy, pet.hygiene)
+
+    def flush(self):
+        if not self._blocks and not self._rollups:
+            return False
+        with self._conn:
+            self._conn.executemany('''
+            INSERT OR REPLACE INTO stats_history_blocks (pet_id, block_start, samples)
+            VALUES (?, ?, ?)
+            ''', [(pet_id, block_start, block.tobytes())
+                  for (pet_id, block_start), block in self._blocks.items() if block])
+            self._conn.executemany(f'''
+            INSERT OR REPLACE INTO stats_rollups (pet_id, resolution, bucket_start, {', '.join(ROLLUP_COLUMNS)})
+            VALUES ({', '.join('?' * (3 + len(ROLLUP_COLUMNS)))})
+            ''', [(*key, *rollup) for key, rollup in self._rollups.items()])
+            # Retención: el tamaño por mascota no crece con su edad
+            self._conn.executemany('''
+            DELETE FROM stats_history_blocks WHERE pet_id = ? AND block_start < ?
+            ''', [(pet_id, last - self.raw_retention) for pet_id, last in self._last.items()])
+            self._conn.executemany('''
+            DELETE FROM stats_rollups WHERE pet_id = ? AND resolution = ? AND bucket_start < ?
+            ''', [(pet_id, MINUTE, last - self.minute_retention) for pet_id, last in self._last.items()])
+        self.commits += 1
+        # Lo abierto se vuelve a leer de la base de datos si llegan más muestras
+        self._blocks.clear()
+        self._rollups.clear()
+        self._pending = 0
+        return True
+
+    def resolution_for(self, pet_id, start, end, max_points=500):
+        """Resolución más fina que da como mucho max_points puntos: 0 (muestras), MINUTE u HOUR"""
+        span = (end - start).total_seconds()
+        last = self._last.get(pet_id)
+        raw_available = last is None or start.timestamp() >= last - self.raw_retention
+        if raw_available and span / RAW_INTERVAL <= max_points:
+            return 0
+        if span / MINUTE <= max_points:
+            return MINUTE
+        return HOUR
+
+    def query(self, pet_id, start, end, resolution=None, max_points=500):
+        """Serie [(datetime, hunger, happiness, energy, hygiene)] entre start y end.
+
+        Con resolución MINUTE u HOUR cada punto es el promedio del intervalo y se
+        lee de los agregados, sin tocar las muestras.
+        """
+        if self._blocks or self._rollups:
+            self.flush()
+        if resolution is None:
+            resolution = self.resolution_for(pet_id, start, end, max_points)
+        first, last = int(start.timestamp()), int(end.timestamp())
+
+        if resolution == 0:
+            rows = self._conn.execute('''
+            SELECT block_start, samples FROM stats_history_blocks
+            WHERE pet_id = ? AND block_start BETWEEN ? AND ?
+            ORDER BY block_start
+            ''', (pet_id, first - first % BLOCK_SECONDS, last)).fetchall()
+            points = []
+            for block_start, samples in rows:
+                block = array('h')
+                block.frombytes(samples)
+                for i in range(0, len(block), 5):
+                    second = block_start + block[i]
+                    if first <= second <= last:
+                        points.append((datetime.fromtimestamp(second), *block[i + 1:i + 5]))
+            return points
+
+        rows = self._conn.execute(f'''
+        SELECT bucket_start, count, {', '.join(f'{stat}_sum' for stat in STATS)} FROM stats_rollups
+        WHERE pet_id = ? AND resolution = ? AND bucket_start BETWEEN ? AND ?
+        ORDER BY bucket_start
+        ''', (pet_id, resolution, first - first % resolution, last)).fetchall()
+        return [(datetime.fromtimestamp(bucket_start), *(total / count for total in sums))
+                for bucket_start, count, *sums in rows]
+
+    def storage_bytes(self, pet_id):
+        """Bytes de muestras y número de agregados guardados de la mascota"""
+        samples = self._conn.execute('''
+        SELECT COALESCE(SUM(LENGTH(samples)), 0) FROM stats_history_blocks WHERE pet_id = ?
+        ''', (pet_id,)).fetchone()[0]
+        rollups = self._conn.execute('''
+        SELECT COUNT(*) FROM stats_rollups WHERE pet_id = ?
+        ''', (pet_id,)).fetchone()[0]
+        return samples, rollups
+
+    def close(self):
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,204 @@
+import asyncio
+from collections import deque
+from datetime import datetime
+import time
+
+from models.pet import Pet, forbidden_topic_reply
+from models.local_responder import HedgedReplies, local_responder
+from models.scheduler import StatScheduler
+from screens.render_model import stat_percent
+from utils.metrics import percentile
+
+# wake_up no es una acción: la siesta termina sola en update_stats con su energía
+ACTIONS = ('feed', 'play', 'clean', 'sleep')
+# Lo que ve un cliente de cada mascota; los deltas solo llevan lo que cambió
+STATE_FIELDS = ('hunger', 'happiness', 'energy', 'hygiene', 'sleeping', 'alive')
+
+
+def pet_state(pet):
+    return (stat_percent(pet.hunger), stat_percent(pet.happiness), stat_percent(pet.energy),
+            stat_percent(pet.hygiene), pet.is_sleeping, pet.is_alive)
+
+
+def state_changes(state, previous):
+    if previous is None:
+        return dict(zip(STATE_FIELDS, state))
+    return {name: value for name, value, old in zip(STATE_FIELDS, state, previous) if value != old}
+
+
+class PetHub:
+    """Muchas mascotas en un proceso, sin interfaz, sobre un bucle de asyncio.
+
+    Cada mascota tiene un solo temporizador del bucle programado con
+    StatScheduler para su próximo cambio visible, como la ventana, en lugar de
+    sondear. Tras cada tick o acción se compara el estado compacto
+    (pet_state) con el último publicado y, si cambió, se envía solo la
+    diferencia a los suscriptores de esa mascota. Todo se llama desde el hilo
+    del bucle; el chat espera al LLM sin bloquearlo.
+    """
+
+    MIN_DELAY = 1.0  # segundos entre ticks de una mascota como mínimo
+
+    def __init__(self, db, llm=None, scheduler=None, clock=datetime.now, min_delay=MIN_DELAY):
+        self.db = db
+        self.replies = HedgedReplies(llm) if llm is not None else None
+        self.scheduler = scheduler or StatScheduler()
+        self.clock = clock
+        self.min_delay = min_delay
+        self.pets = {}
+        self._states = {}       # pet_id -> último estado publicado
+        self._subscribers = {}  # pet_id -> {send}
+        self._timers = {}       # pet_id -> asyncio.TimerHandle
+        self._next_id = 1
+        self._chats = 0         # Numera los canales de chat: uno por petición
+        self.ticks = 0
+        self.deltas = 0
+        self.actions = 0
+        self.action_latencies = deque(maxlen=10_000)  # segundos dentro del bucle por acción
+
+    @property
+    def loop(self):
+        return asyncio.get_running_loop()
+
+    def add(self, pet):
+        self.pets[pet.pet_id] = pet
+        self._next_id = max(self._next_id, pet.pet_id + 1)
+        self._states[pet.pet_id] = pet_state(pet)
+        self._schedule(pet)
+        return pet
+
+    def create(self, name="Tamagotchi", pet_id=None):
+        pet_id = pet_id or self._next_id
+        now = self.clock()
+        pet = Pet(name=name, db=self.db, pet_id=pet_id, life_start_time=now, last_update=now)
+        pet.save_state()
+        return self.add(pet)
+
+    def load_all(self):
+        """Aloja todas las mascotas guardadas y vivas"""
+        for pet_id, stats in self.db.load_many().items():
+            if stats['is_alive'] and pet_id not in self.pets:
+                self.add(Pet(name=f"Tamagotchi {pet_id}", db=self.db, pet_id=pet_id))
+        return len(self.pets)
+
+    def get(self, pet_id):
+        pet = self.pets.get(pet_id)
+        if pet is None:
+            raise KeyError(pet_id)
+        return pet
+
+    def state(self, pet_id):
+        return dict(zip(STATE_FIELDS, self._states[pet_id]), id=pet_id, name=self.pets[pet_id].name)
+
+    def subscribe(self, pet_id, send):
+        """send(delta) recibe dicts {'id', campo: valor...}; se llama desde el bucle"""
+        self.get(pet_id)
+        self._subscribers.setdefault(pet_id, set()).add(send)
+        return self.state(pet_id)
+
+    def unsubscribe(self, pet_id, send):
+        subscribers = self._subscribers.get(pet_id)
+        if subscribers is not None:
+            subscribers.discard(send)
+            if not subscribers:
+                del self._subscribers[pet_id]
+
+    @property
+    def subscriptions(self):
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, pet):
+        state = pet_state(pet)
+        changes = state_changes(state, self._states.get(pet.pet_id))
+        if not changes:
+            return {}
+        self._states[pet.pet_id] = state
+        changes['id'] = pet.pet_id
+        for send in tuple(self._subscribers.get(pet.pet_id, ())):
+            send(changes)
+            self.deltas += 1
+        return changes
+
+    def _schedule(self, pet):
+        timer = self._timers.pop(pet.pet_id, None)
+        if timer is not None:
+            timer.cancel()
+        # Sin interfaz no hay cuenta regresiva que mostrar: solo cambios de energía
+        next_event = self.scheduler.next_event(pet, self.clock(), countdown=False)
+        if next_event is None:
+            return
+        delay = max(self.min_delay, next_event[0])
+        self._timers[pet.pet_id] = self.loop.call_later(delay, self.tick, pet.pet_id)
+
+    def tick(self, pet_id):
+        self._timers.pop(pet_id, None)
+        pet = self.pets.get(pet_id)
+        if pet is None:
+            return
+        pet.update_stats(self.clock())
+        self.ticks += 1
+        self.publish(pet)
+        self._schedule(pet)
+
+    def act(self, pet_id, action):
+        """Aplica una acción; devuelve (mensaje de la mascota o None, delta)"""
+        if action not in ACTIONS:
+            raise ValueError(f"Acción desconocida: {action!r} (opciones: {', '.join(ACTIONS)})")
+        start = time.perf_counter()
+        pet = self.get(pet_id)
+        if not pet.is_alive:
+            return "...", {}
+        method = getattr(pet, action)
+        message = method(self.clock()) if action == 'sleep' else method()
+        delta = self.publish(pet)
+        self._schedule(pet)
+        self.actions += 1
+        self.action_latencies.append(time.perf_counter() - start)
+        return message, delta
+
+    async def chat(self, pet_id, message):
+        pet = self.get(pet_id)
+        pet.chat(message)
+        self.publish(pet)
+        reply = forbidden_topic_reply(message)
+        if reply:
+            return reply
+        snapshot = pet.snapshot(message)
+        if self.replies is None:
+            return local_responder.reply(snapshot, message)
+        loop = self.loop
+        future = loop.create_future()
+
+        def done(result, error):
+            # Desde un hilo del pool del LLM
+            loop.call_soon_threadsafe(
+                lambda: future.done() or future.set_result(result if error is None else f"Error: {error}"))
+
+        # Cada petición espera su propia respuesta: con un canal por mascota,
+        # un segundo mensaje cancelaría o absorbería al primero y su cliente
+        # no recibiría nunca nada
+        self._chats += 1
+        self.replies.submit(snapshot.user_interaction_messages(message),
+                            lambda: local_responder.reply(snapshot, message), done,
+                            channel=f'chat:{pet_id}:{self._chats}')
+        return await future
+
+    def stats(self):
+        latencies = list(self.action_latencies)
+        return {
+            'pets': len(self.pets),
+            'alive': sum(pet.is_alive for pet in self.pets.values()),
+            'timers': len(self._timers),
+            'subscriptions': self.subscriptions,
+            'ticks': self.ticks,
+            'deltas': self.deltas,
+            'actions': self.actions,
+            'action_ms_p50': (percentile(latencies, 0.5) or 0) * 1000,
+            'action_ms_p99': (percentile(latencies, 0.99) or 0) * 1000,
+        }
+
+    def close(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._subscribers.clear()
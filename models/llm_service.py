@@ -0,0 +1,378 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
+
+from models.prompts import count_tokens, message_tokens
+from utils.instrument import span
+from utils.metrics import llm_metrics
+from utils.rate_limit import TokenBucket
+
+MODEL = "mistral-large-latest"
+DEFAULT_TIMEOUT = 20.0  # segundos por petición
+DEFAULT_WORKERS = 2
+DEFAULT_RATE = 1.0      # peticiones por segundo a la API (ráfagas de DEFAULT_BURST)
+DEFAULT_BURST = 4
+DEFAULT_MAX_PENDING = 8  # peticiones esperando turno como máximo
+
+_env_loaded = False
+
+
+def load_env():
+    # python-dotenv y mistralai se importan solo cuando hacen falta: importarlos
+    # al arrancar retrasa la primera pintura de la ventana
+    global _env_loaded
+    if not _env_loaded:
+        _env_loaded = True
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except ImportError:
+            pass
+
+
+def api_key_configured():
+    load_env()
+    return bool(os.getenv("MISTRAL_API_KEY"))
+
+
+def create_client(api_key=None, server_url=None):
+    # MISTRAL_SERVER_URL permite apuntar a un servidor local (por ejemplo el stub de benchmarks)
+    load_env()
+    api_key = api_key or os.getenv("MISTRAL_API_KEY")
+    server_url = server_url or os.getenv("MISTRAL_SERVER_URL") or None
+    if not api_key:
+        return None
+    try:
+        from mistralai import Mistral
+    except ImportError:
+        return None
+    return Mistral(api_key=api_key, server_url=server_url)
+
+
+class RequestDropped(Exception):
+    """La cola estaba llena y esta petición, la más antigua, se descartó"""
+
+
+def request_key(messages, streaming):
+    # Dos peticiones con la misma clave piden exactamente lo mismo
+    return streaming, tuple((message["role"], message["content"]) for message in messages)
+
+
+class LLMRequest:
+    """Petición en curso; si se cancela, su respuesta se descarta"""
+
+    def __init__(self, channel, key=None, call_type='chat', messages=(), callback=None,
+                 on_chunk=None, timeout=None):
+        self.channel = channel
+        self.key = key
+        self.call_type = call_type
+        self.messages = messages
+        self.timeout = timeout
+        self.cancelled = threading.Event()
+        self.done = threading.Event()  # Respondida, descartada o cancelada
+        self.merged = 0                # Peticiones iguales que se unieron a esta
+        # Solo en streaming: segundos hasta el primer token y hasta el final
+        self.first_token_latency = None
+        self.total_latency = None
+        self._lock = threading.Lock()
+        self._callback = callback
+        self._on_chunk = on_chunk
+        self._parts = []
+        self._sent = 0          # Partes ya entregadas al on_chunk actual
+        self._pumping = False   # Un hilo está llamando a on_chunk
+        self._delivered = False
+
+    def cancel(self):
+        self.cancelled.set()
+        self.done.set()
+
+    def redirect(self, callback, on_chunk=None):
+        """Una petición igual y más nueva toma el relevo: lo ya recibido se le repite con pump().
+
+        Devuelve False si la respuesta ya se entregó y hay que pedirla de nuevo.
+        """
+        with self._lock:
+            if self._delivered or self.cancelled.is_set():
+                return False
+            self._callback = callback
+            self._on_chunk = on_chunk
+            self._sent = 0
+            self.merged += 1
+        return True
+
+    def chunk(self, content):
+        with self._lock:
+            self._parts.append(content)
+        self.pump()
+
+    def pump(self):
+        """Entrega a on_chunk las partes que aún no vio, en orden y sin ningún lock tomado.
+
+        Así on_chunk puede volver a llamar al servicio (submit, cancel...). Si
+        otro hilo ya está entregando, él se encarga también de las nuevas.
+        """
+        with self._lock:
+            if self._pumping:
+                return
+            self._pumping = True
+        try:
+            while True:
+                with self._lock:
+                    on_chunk = self._on_chunk
+                    if self.cancelled.is_set() or on_chunk is None or self._sent == len(self._parts):
+                        self._pumping = False
+                        return
+                    parts = self._parts[self._sent:]
+                    self._sent = len(self._parts)
+                for part in parts:
+                    on_chunk(part)
+        except BaseException:
+            with self._lock:
+                self._pumping = False
+            raise
+
+    def deliver(self, result, error):
+        with self._lock:
+            self._delivered = True
+            callback = None if self.cancelled.is_set() else self._callback
+        if callback is not None:
+            callback(result, error)
+        self.done.set()
+
+
+class LLMService:
+    """Servicio único para hablar con Mistral.
+
+    Reutiliza un solo cliente (y su conexión HTTP) y un pool acotado de hilos.
+    Cada petición pertenece a un canal ('chat', 'alert', ...): una petición
+    nueva cancela la anterior del mismo canal, porque su respuesta ya no se
+    mostraría, y si es idéntica a la que está en vuelo se une a ella en lugar
+    de repetirla. Las peticiones esperan en una cola de como mucho
+    `max_pending` (al llenarse se descarta la más antigua con RequestDropped)
+    y salen hacia la API a `rate` por segundo como máximo. Con client_factory
+    el cliente se crea en el primer uso.
+    """
+
+    def __init__(self, client=None, model=MODEL, max_workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT,
+                 client_factory=None, metrics=None, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 max_pending=DEFAULT_MAX_PENDING):
+        self._client = client
+        self._client_factory = client_factory
+        self._client_lock = threading.Lock()
+        self.model = model
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        self._lock = threading.Lock()
+        self._latest = {}        # canal -> última petición
+        self._pending = deque()  # peticiones esperando un hilo libre y una ficha
+        self._drainers = 0       # hilos del pool atendiendo la cola
+        self._closed = False
+        self.stream_latencies = deque(maxlen=100)  # (primer token, total) de los últimos streams
+        self.metrics = metrics or llm_metrics
+
+    @property
+    def client(self):
+        if self._client is None and self._client_factory is not None:
+            with self._client_lock:
+                if self._client_factory is not None:
+                    self._client = self._client_factory()
+                    self._client_factory = None  # Un solo intento
+        return self._client
+
+    @property
+    def available(self):
+        # Sin construir el cliente: basta con saber que hay una API key
+        if self._client_factory is not None:
+            return api_key_configured()
+        return self._client is not None
+
+    def _measured(self, call_type, messages, call):
+        # Tokens estimados, latencia y errores por tipo de llamada (utils/metrics.py)
+        prompt_tokens = message_tokens(messages)
+        start = time.perf_counter()
+        try:
+            result = call()
+        except Exception as e:
+            self.metrics.record(call_type, prompt_tokens, latency=time.perf_counter() - start, error=e)
+            raise
+        self.metrics.record(call_type, prompt_tokens, count_tokens(result or ""),
+                            time.perf_counter() - start)
+        return result
+
+    def complete(self, messages, timeout=None, call_type='chat'):
+        # Llamada bloqueante; usar submit() desde el hilo de la interfaz
+        if self.client is None:
+            raise RuntimeError("No hay cliente de Mistral configurado")
+
+        def call():
+            with span('llm_complete'):
+                chat_response = self.client.chat.complete(
+                    model=self.model,
+                    messages=list(messages),
+                    timeout_ms=int((timeout or self.timeout) * 1000),
+                )
+            return chat_response.choices[0].message.content
+
+        return self._measured(call_type, messages, call)
+
+    def stream(self, messages, on_chunk, timeout=None, request=None, call_type='chat'):
+        """Llamada bloqueante en modo streaming: on_chunk(texto) por cada delta recibido"""
+        if self.client is None:
+            raise RuntimeError("No hay cliente de Mistral configurado")
+
+        def call():
+            start = time.perf_counter()
+            parts = []
+            response = self.client.chat.stream(
+                model=self.model,
+                messages=list(messages),
+                timeout_ms=int((timeout or self.timeout) * 1000),
+            )
+            with span('llm_stream'), response as events:
+                for event in events:
+                    if request is not None and request.cancelled.is_set():
+                        break  # Nadie verá el resto: cerrar la conexión
+                    content = event.data.choices[0].delta.content if event.data.choices else None
+                    if not content:
+                        continue
+                    if not parts and request is not None:
+                        request.first_token_latency = time.perf_counter() - start
+                    parts.append(content)
+                    on_chunk(content)
+            if request is not None:
+                request.total_latency = time.perf_counter() - start
+                if request.first_token_latency is not None:
+                    self.stream_latencies.append((request.first_token_latency, request.total_latency))
+            return "".join(parts)
+
+        return self._measured(call_type, messages, call)
+
+    def submit(self, messages, callback, channel='chat', timeout=None, on_chunk=None, call_type=None):
+        """Encola la petición y llama callback(respuesta, error) desde el pool si sigue vigente.
+
+        Con on_chunk se usa streaming y cada delta se entrega a on_chunk(texto)
+        a medida que llega. call_type agrupa las métricas; por defecto es el
+        canal sin sufijo ('alert:...' -> 'alert').
+        """
+        call_type = call_type or channel.split(':')[0]
+        key = request_key(messages, on_chunk is not None)
+        dropped = []
+        with self._lock:
+            previous = self._latest.get(channel)
+            merged = previous is not None and previous.key == key and previous.redirect(callback, on_chunk)
+            if merged:
+                # Doble clic o mensaje repetido: la misma llamada sirve para los dos
+                self.metrics.count(call_type, 'merged')
+        if merged:
+            # Fuera de self._lock: on_chunk puede volver a llamar a submit o cancel
+            previous.pump()
+            return previous
+        with self._lock:
+            previous = self._latest.get(channel)
+            if previous is not None:
+                previous.cancel()
+                self.metrics.count(previous.call_type, 'superseded')
+                if previous in self._pending:
+                    self._pending.remove(previous)
+            request = LLMRequest(channel, key, call_type, messages, callback, on_chunk, timeout)
+            self._latest[channel] = request
+            self._pending.append(request)
+            while len(self._pending) > self.max_pending:
+                oldest = self._pending.popleft()
+                if self._latest.get(oldest.channel) is oldest:
+                    del self._latest[oldest.channel]
+                dropped.append(oldest)
+            self._track_queue()
+            if self._drainers < self.max_workers and not self._closed:
+                self._drainers += 1
+                self._executor.submit(self._drain)
+        for oldest in dropped:
+            self.metrics.count(oldest.call_type, 'dropped')
+            oldest.deliver(None, RequestDropped(f"Cola llena ({self.max_pending} peticiones)"))
+        return request
+
+    def _track_queue(self):
+        # Llamar con self._lock tomado
+        self.metrics.gauge('llm_queue_depth', len(self._pending))
+
+    def _drain(self):
+        # Cada hilo del pool atiende la cola hasta vaciarla, respetando el límite de ritmo
+        while True:
+            if self._bucket is not None and not self._bucket.acquire():
+                with self._lock:
+                    self._drainers -= 1
+                return
+            if self._bucket is not None:
+                self.metrics.gauge('llm_rate_limit_wait_seconds', round(self._bucket.waited, 3))
+            with self._lock:
+                if not self._pending or self._closed:
+                    self._drainers -= 1
+                    if self._bucket is not None:
+                        self._bucket.refund()
+                    return
+                request = self._pending.popleft()
+                self._track_queue()
+            self._run(request)
+
+    def _run(self, request):
+        try:
+            if request.cancelled.is_set():
+                return
+            try:
+                if request._on_chunk is None:
+                    result = self.complete(request.messages, request.timeout, request.call_type)
+                else:
+                    result = self.stream(request.messages, request.chunk, request.timeout, request,
+                                         request.call_type)
+                error = None
+            except Exception as e:
+                result, error = None, e
+            request.deliver(result, error)
+        finally:
+            request.done.set()
+            with self._lock:
+                if self._latest.get(request.channel) is request:
+                    del self._latest[request.channel]
+
+    @property
+    def queue_depth(self):
+        with self._lock:
+            return len(self._pending)
+
+    def cancel(self, channel):
+        with self._lock:
+            request = self._latest.pop(channel, None)
+            if request in self._pending:
+                self._pending.remove(request)
+                self._track_queue()
+        if request is not None:
+            request.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            pending = list(self._latest.values())
+            self._latest.clear()
+            self._pending.clear()
+        for request in pending:
+            request.cancel()
+        if self._bucket is not None:
+            self._bucket.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_llm_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = LLMService(client_factory=create_client)
+        return _service
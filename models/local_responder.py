@@ -0,0 +1,240 @@
+import random
+import re
+import threading
+import time
+
+from models.prompts import count_tokens
+from utils.metrics import llm_metrics
+
+# Intenciones del mensaje del usuario, en orden de prioridad: palabra clave -> intención
+INTENTS = (
+    ('estado', ('estado', 'como estas', 'cómo estás', 'como estás', 'stats', 'estadísticas', 'estadisticas')),
+    ('saludo', ('hola', 'buenas', 'buenos días', 'buenos dias', 'hey')),
+    ('comida', ('comer', 'comí', 'comida', 'hambre', 'pizza', 'cena', 'almuerzo', 'desayuno')),
+    ('juego', ('jugar', 'juego', 'jugamos', 'divertido', 'aburrido')),
+    ('sueño', ('dormir', 'sueño', 'cansado', 'cansada', 'noche')),
+    ('triste', ('triste', 'mal día', 'mal dia', 'estresado', 'estresada', 'preocupado', 'preocupada')),
+    ('contento', ('feliz', 'contento', 'contenta', 'genial', 'bien', 'increíble')),
+    ('despedida', ('adiós', 'adios', 'chao', 'hasta luego', 'me voy')),
+)
+# Palabras completas: 'bien' no debe coincidir con 'también'
+INTENT_PATTERNS = tuple(
+    (intent, re.compile(r'\b(?:' + '|'.join(map(re.escape, keywords)) + r')\b'))
+    for intent, keywords in INTENTS
+)
+
+TEMPLATES = {
+    'estado': ("Ahora mismo: hambre {hunger}%, felicidad {happiness}%, energía {energy}% "
+               "e higiene {hygiene}%. {mood}",),
+    'saludo': ("¡Hola! Qué bueno verte por aquí. ¿Qué tal tu día?",
+               "¡Hey! Justo estaba pensando en ti. ¿Qué me cuentas?"),
+    'comida': ("¡Hablar de comida me abre el apetito! ¿Qué fue lo más rico?",
+               "Mmm, eso suena delicioso. ¿Lo preparaste tú?"),
+    'juego': ("¡Me encanta jugar! ¿A qué te gustaría jugar conmigo?",
+              "¡Juguemos un rato! Prometo no hacer trampa... mucho."),
+    'sueño': ("Dormir bien es importantísimo, yo me tomo mis siestas muy en serio. ¿Descansaste?",),
+    'triste': ("Vaya, lo siento. Aquí estoy para escucharte, ¿quieres contarme más?",
+               "Te mando un abrazo virtual. ¿Qué pasó?"),
+    'contento': ("¡Qué alegría! Me encanta cuando estás de buen humor. ¿Qué salió tan bien?",),
+    'despedida': ("¡Hasta pronto! No tardes mucho, que me aburro.",),
+    'pregunta': ("Buena pregunta... déjame pensarlo con calma. ¿Tú qué opinas?",),
+    'otro': ("¡Cuéntame más! Me encanta escucharte.",
+             "Interesante... ¿y cómo te sentiste con eso?",
+             "¡No me digas! ¿Y qué pasó después?"),
+}
+
+MEMORY_TEMPLATES = (
+    "¡Me acuerdo de que me contaste sobre {topic}: {memory}! ",
+    "Eso me recuerda algo tuyo sobre {topic}: {memory}. ",
+)
+
+ALERT_TEMPLATES = {
+    "tengo mucha hambre": "¡Mi pancita ruge! ¿Me das algo de comer?",
+    "me siento muy triste": "Me siento un poco solito... ¿jugamos un rato?",
+    "estoy muy cansado": "Se me cierran los ojitos... necesito una siesta.",
+    "necesito un baño": "Creo que huelo raro... ¿me ayudas con un baño?",
+}
+
+INITIATE_TEMPLATES = (
+    "¡Oye! ¿Te olvidaste de mí? Estoy aquí esperando que me hables.",
+    "Estaba aburrido y pensé en ti. ¿Qué estás haciendo?",
+    "¿Sabías que soy el Tamagotchi más simpático del mundo? Bueno, ahora lo sabes.",
+)
+
+
+def stat_percent(value):
+    return int(value / 100)
+
+
+class LocalResponder:
+    """Respuestas locales sin red: plantillas por intención y recuerdos ya buscados.
+
+    Responde en microsegundos. Sirve cuando no hay cliente de Mistral, cuando
+    la llamada falla y como respuesta provisional mientras llega la remota
+    (ver HedgedReplies). El estado y los recuerdos salen de un PetSnapshot,
+    así que se puede llamar desde cualquier hilo.
+    """
+
+    def __init__(self, seed=None):
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _choice(self, options):
+        with self._lock:
+            return self._rng.choice(options)
+
+    def intent(self, user_message):
+        text = user_message.lower()
+        for intent, pattern in INTENT_PATTERNS:
+            if pattern.search(text):
+                return intent
+        return 'pregunta' if '?' in text else 'otro'
+
+    def mood(self, snapshot):
+        lowest = stat_percent(min(snapshot.hunger, snapshot.happiness, snapshot.energy, snapshot.hygiene))
+        if lowest <= 20:
+            return "¡Necesito que me cuides un poquito!"
+        if lowest >= 60:
+            return "¡Me siento de maravilla!"
+        return "Estoy bien, gracias por preguntar."
+
+    def reply(self, snapshot, user_message):
+        intent = self.intent(user_message)
+        text = self._choice(TEMPLATES[intent]).format(
+            hunger=stat_percent(snapshot.hunger), happiness=stat_percent(snapshot.happiness),
+            energy=stat_percent(snapshot.energy), hygiene=stat_percent(snapshot.hygiene),
+            mood=self.mood(snapshot))
+        if snapshot.relevant_memories and intent not in ('estado', 'despedida'):
+            # El recuerdo más relevante va primero (ver Pet.get_relevant_memories)
+            topic, _, memory = snapshot.relevant_memories[0].partition(': ')
+            text = self._choice(MEMORY_TEMPLATES).format(topic=topic, memory=memory or topic) + text
+        return text
+
+    def alert(self, low_stats):
+        return " ".join(ALERT_TEMPLATES.get(stat, stat.capitalize() + ".") for stat in low_stats)
+
+    def initiate(self, low_stats=()):
+        # low_stats como los arma models.pet.low_stats_for
+        if low_stats:
+            return "Oye... " + self.alert(low_stats)
+        return self._choice(INITIATE_TEMPLATES)
+
+
+local_responder = LocalResponder()
+
+
+class HedgedReplies:
+    """Pide la respuesta a Mistral y, si tarda más de `budget` segundos, muestra la local.
+
+    Sin cliente de Mistral la respuesta local se entrega al momento, y si la
+    llamada falla sustituye al error. Si la remota llega después de mostrar la
+    local, la reemplaza solo si sigue siendo relevante: el canal no tiene una
+    petición más nueva (LLMService ya descarta las canceladas) y no pasaron
+    más de `stale_after` segundos desde que se pidió; si no, se cancela y se
+    queda la local. `counts` dice cuántas veces ocurrió cada caso.
+    """
+
+    BUDGET = 1.5         # segundos de espera antes de mostrar la respuesta local
+    STALE_AFTER = 8.0    # segundos tras los que la remota ya no reemplaza a la local
+
+    def __init__(self, llm, budget=BUDGET, stale_after=STALE_AFTER, metrics=None):
+        self.llm = llm
+        self.budget = budget
+        self.stale_after = stale_after
+        self.metrics = metrics or llm_metrics
+        self._lock = threading.Lock()
+        self.counts = {'offline': 0, 'remote': 0, 'hedged': 0, 'replaced': 0, 'kept_local': 0,
+                       'error_fallback': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _local(self, local_reply, call_type):
+        start = time.perf_counter()
+        text = local_reply()
+        self.metrics.record('local:' + call_type, 0, count_tokens(text), time.perf_counter() - start)
+        return text
+
+    def submit(self, messages, local_reply, callback, channel='chat', on_chunk=None, on_local=None,
+               call_type=None):
+        """Como LLMService.submit, con local_reply() -> texto como respaldo.
+
+        on_local(texto) muestra la respuesta provisional; por defecto se usa
+        callback(texto, None), que basta cuando no hay streaming.
+        """
+        call_type = call_type or channel.split(':')[0]
+        if not self.llm.available:
+            self._count('offline')
+            callback(self._local(local_reply, call_type), None)
+            return None
+
+        on_local = on_local or (lambda text: callback(text, None))
+        state = {'started': False, 'local': None, 'done': False}
+        state_lock = threading.Lock()
+        start = time.monotonic()
+        request = None
+
+        def stale():
+            return time.monotonic() - start > self.stale_after
+
+        def hedge():
+            with state_lock:
+                if state['started'] or state['done'] or (request is not None and request.cancelled.is_set()):
+                    return
+                state['local'] = self._local(local_reply, call_type)
+            self._count('hedged')
+            on_local(state['local'])
+
+        def keep_local():
+            # La remota llegó tarde: se cancela y la local pasa a ser la definitiva
+            with state_lock:
+                if state['done']:
+                    return
+                state['done'] = True
+            self._count('kept_local')
+            if request is not None:
+                request.cancel()
+            callback(state['local'], None)
+
+        def chunk(content):
+            with state_lock:
+                first = not state['started']
+                state['started'] = True
+                late = state['local'] is not None and first and stale()
+            if late:
+                keep_local()
+            elif not state['done']:
+                on_chunk(content)
+
+        def finish(result, error):
+            timer.cancel()
+            with state_lock:
+                if state['done']:
+                    return
+                shown = state['local']
+                late = shown is not None and not state['started'] and stale()
+            if error is not None and not state['started']:
+                with state_lock:
+                    state['done'] = True
+                self._count('error_fallback')
+                callback(shown if shown is not None else self._local(local_reply, call_type), None)
+                return
+            if late:
+                keep_local()
+                return
+            with state_lock:
+                state['done'] = True
+            self._count('remote' if shown is None else 'replaced')
+            callback(result, error)
+
+        timer = threading.Timer(self.budget, hedge)
+        timer.daemon = True
+        request = self.llm.submit(messages, finish, channel=channel, call_type=call_type,
+                                  on_chunk=chunk if on_chunk is not None else None)
+        timer.start()
+        return request
+
+    def cancel(self, channel):
+        # La respuesta local pendiente se descarta sola: hedge() ve la petición cancelada
+        self.llm.cancel(channel)
@@ -1,21 +1,110 @@
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+import functools
 import os
 import random
+import re
 from models.database import PetDatabase
+from models.storage import open_storage
+from models.history import StatsHistory
+from models.events import TIMED_KINDS, EventLog
+from models.llm_service import get_llm_service
+from models.local_responder import local_responder
+from models.prompts import ALERT, CHAT, EVOLUTION, INITIATE, PERSONALITY
+from utils.instrument import timed
 import sqlite3
 
+# Temas fuera del rol de mascota
+FORBIDDEN_TOPICS = ['guerra', 'política', 'historia', 'matemáticas', 'ciencia']
+FORBIDDEN_TOPIC_REPLY = "¡Soy tu mascota virtual! Me encanta jugar y charlar contigo, pero no puedo ayudarte con eso. ¿Qué tal si jugamos o me cuentas sobre tu día?"
+
+
+@dataclass(frozen=True)
+class PetSnapshot:
+    """Copia inmutable del estado que usan los prompts; se puede leer desde cualquier hilo"""
+    name: str
+    pet_id: int
+    hunger: int
+    happiness: int
+    energy: int
+    hygiene: int
+    relevant_memories: tuple = ()
+
+    def stats_block(self):
+        return (f"Mi estado actual es: hambre {int(self.hunger/100)}%, felicidad {int(self.happiness/100)}%, "
+                f"energía {int(self.energy/100)}%, higiene {int(self.hygiene/100)}%")
+
+    def user_interaction_messages(self, user_message):
+        # Solo incluir stats si el usuario pregunta por ellos
+        stats_keywords = ['estado', 'como estas', 'stats', 'estadísticas', 'estadisticas']
+        context = []
+        if any(keyword in user_message.lower() for keyword in stats_keywords):
+            context.append(self.stats_block())
+
+        messages, _, _ = CHAT.messages(
+            ["Contexto de la conversación:", f"- Mensaje del usuario: {user_message}"],
+            memories=self.relevant_memories,
+            context=context,
+        )
+        return messages
+
+    def initiate_messages(self):
+        return INITIATE.messages([self.stats_block()])[0]
+
+
+def low_stats_for(state):
+    # Solo alertar si alguna estadística está por debajo del 20%
+    low_stats = []
+
+    if int(state.hunger / 100) <= 20:
+        low_stats.append("tengo mucha hambre")
+    if int(state.happiness / 100) <= 20:
+        low_stats.append("me siento muy triste")
+    if int(state.energy / 100) <= 20:
+        low_stats.append("estoy muy cansado")
+    if int(state.hygiene / 100) <= 20:
+        low_stats.append("necesito un baño")
+
+    return tuple(low_stats)
+
+
+def alert_messages(low_stats):
+    return ALERT.messages([f"Necesito expresar que: {', '.join(low_stats)}"])[0]
+
+
+def forbidden_topic_reply(user_message):
+    # Verificar si el mensaje pide información o acciones fuera del rol
+    if any(topic in user_message.lower() for topic in FORBIDDEN_TOPICS):
+        return FORBIDDEN_TOPIC_REPLY
+    return None
+
+
+def logged_event(kind):
+    """Registra la acción en pet.events después de aplicarla.
+
+    Solo se registra la acción exterior: si update_stats despierta a la
+    mascota, el wake_up interno se repite al repetir el tick.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if kind in TIMED_KINDS and not args and kwargs.get('now') is None:
+                # Fijar el momento aquí para registrar el mismo que usa la acción
+                kwargs['now'] = datetime.now()
+            self._event_depth += 1
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                self._event_depth -= 1
+            if self.events is not None and self._event_depth == 0:
+                if kind in TIMED_KINDS:
+                    self.events.append(self, kind, args[0] if args else kwargs['now'])
+                else:
+                    self.events.append(self, kind, datetime.now(), args)
+            return result
+        return wrapper
+    return decorate
 
-try:
-    from mistralai import Mistral
-    from dotenv import load_dotenv
-    load_dotenv()
-    api_key = os.getenv("MISTRAL_API_KEY")
-    client = Mistral(api_key=api_key) if api_key else None
-    model = "mistral-large-latest"
-except ImportError:
-    client = None
-    model = None
 
 @dataclass
 class Pet:
@@ -29,16 +118,25 @@ class Pet:
     is_alive: bool = True
     is_sleeping: bool = False
     sleep_start_time: datetime = None
+    sleep_start_energy: int = None  # Energía al empezar la siesta
     db: PetDatabase = None
     life_start_time: datetime = datetime.now()
+    pet_id: int = 1
+    history: StatsHistory = None  # Historial opcional de stats (models/history.py)
+    events: EventLog = None       # Registro opcional de acciones (models/events.py)
+    rng: random.Random = None     # Generador de los deterioros; el módulo random si es None
 
     # Constantes para el manejo del tiempo
     MINUTES_PER_DAY = 24 * 60
     LIFESPAN_DAYS = 5
     SLEEP_DURATION = 5 * 60  # 5 minutos en segundos
-    SLEEP_ENERGY_GAIN_PER_SECOND = 1.67  # Para llegar a 100% en 5 minutos
+    SLEEP_ENERGY_GAIN_PER_SECOND = 8000 / SLEEP_DURATION  # Para llegar a 100% en 5 minutos
     current_state_image = "assets/estados/normal.png"  # Imagen por defecto
 
+    # Memorias que se envían al prompt como máximo, ordenadas por relevancia
+    MEMORY_TOP_K = 5
+    MIN_MEMORY_WORD_LENGTH = 3
+
     # Umbrales para diferentes estados
     CRITICAL_THRESHOLD = 2000  # 25%
     LOW_THRESHOLD = 4000      # 50%
@@ -51,9 +149,13 @@ class Pet:
     BASE_HAPPINESS_DECAY = (3, 8)  # El más lento de todos
 
     def __post_init__(self):
-        self.db = PetDatabase()
+        if self.db is None:
+            self.db = open_storage()
+        if self.rng is None:
+            self.rng = random
+        self._event_depth = 0
         try:
-            stats = self.db.load_stats()
+            stats = self.db.load_stats(self.pet_id)
             if stats:
                 self.hunger = stats['hunger']
                 self.happiness = stats['happiness']
@@ -63,24 +165,32 @@ class Pet:
                 self.last_update = stats['last_update']
                 self.is_alive = stats['is_alive']
                 self.life_start_time = stats['life_start_time']
+                if stats.get('is_sleeping'):
+                    # Retomar la siesta donde quedó
+                    self.is_sleeping = True
+                    self.sleep_start_time = stats['sleep_start_time']
+                    self.sleep_start_energy = stats['sleep_start_energy']
+                    self.current_state_image = "assets/estados/durmiendo.png"
         except sqlite3.OperationalError:
             # Si hay un error al cargar los stats, mantener los valores por defecto
             pass
 
+    @timed('save_stats')
     def save_state(self):
         self.db.save_stats(self)
 
+    @logged_event('add_memory')
     def add_memory(self, category, content):
-        self.db.add_memory(category, content)
+        self.db.add_memory(category, content, self.pet_id)
         self.happiness = min(10000, self.happiness + 500)  # Aumenta felicidad al compartir memorias
         self.save_state()
 
-    def get_relevant_memories(self, context):
-        memories = self.db.get_memories()
-        relevant_memories = []
-
-        # Dividir el contexto en palabras para mejor búsqueda
-        context_words = context.lower().split()
+    @timed('get_relevant_memories')
+    def get_relevant_memories(self, context, limit=None):
+        # Dividir el contexto en palabras para mejor búsqueda; las muy cortas
+        # ("me", "la", ...) coinciden con casi todo y solo meten ruido
+        context_words = [word for word in re.findall(r'\w+', context.lower())
+                         if len(word) >= self.MIN_MEMORY_WORD_LENGTH]
 
         keyword_mapping = {
             'nombre': ['nombre', 'llamo', 'llamas'],
@@ -88,49 +198,59 @@ class Pet:
             'familia': ['familia', 'padres', 'hermanos', 'vives'],
         }
 
-        for memory in memories:
-            category = memory[1].lower()
-            content = memory[2].lower()
-
-            # Buscar coincidencias directas
-            if any(word in content for word in context_words):
-                relevant_memories.append(f"{category}: {memory[2]}")
-                continue
+        # Buscar por categorías y palabras clave
+        categories = [category for category, keywords in keyword_mapping.items()
+                      if any(keyword in context.lower() for keyword in keywords)]
 
-            # Buscar por categorías y palabras clave
-            for category_key, keywords in keyword_mapping.items():
-                if any(keyword in context.lower() for keyword in keywords) and category_key.lower() == category:
-                    relevant_memories.append(f"{category}: {memory[2]}")
-                    break
-
-        return relevant_memories
+        memories = self.db.search_memories(context_words, categories, self.pet_id,
+                                           limit or self.MEMORY_TOP_K)
+        return [f"{memory[1].lower()}: {memory[2]}" for memory in memories]
 
+    @logged_event('chat')
     def chat(self, message):
         # Aumentar felicidad por interacción
         self.happiness = min(10000, self.happiness + 100)
         self.save_state()
+        # Las memorias relevantes se buscan una sola vez, en snapshot(message),
+        # solo cuando el mensaje va a recibir respuesta
 
-        # Buscar memorias relevantes
-        relevant_memories = self.get_relevant_memories(message)
-
-        # ... resto del código de interacción
+    def sleep_remaining(self, now=None):
+        """Segundos que faltan para terminar la siesta (0 si no duerme)"""
+        if not self.is_sleeping:
+            return 0.0
+        elapsed = ((now or datetime.now()) - self.sleep_start_time).total_seconds()
+        return max(0.0, self.SLEEP_DURATION - elapsed)
 
-    def update_stats(self):
-        current_time = datetime.now()
+    def energy_at(self, now=None):
+        """Energía en un momento dado, en O(1) desde el inicio de la siesta.
 
-        # Si está durmiendo, actualizar energía gradualmente
+        La ganancia depende solo del tiempo dormido y de la energía al
+        acostarse, así que no importa cuántas veces ni cada cuánto se llame.
+        """
+        if not self.is_sleeping:
+            return self.energy
+        start_energy = self.energy if self.sleep_start_energy is None else self.sleep_start_energy
+        elapsed = min(self.SLEEP_DURATION, ((now or datetime.now()) - self.sleep_start_time).total_seconds())
+        return min(8000, start_energy + int(elapsed * self.SLEEP_ENERGY_GAIN_PER_SECOND))
+
+    @timed('update_stats')
+    @logged_event('tick')
+    def update_stats(self, now=None):
+        current_time = now or datetime.now()
+
+        # Si está durmiendo, la energía sale de la forma cerrada
         if self.is_sleeping:
-            time_slept = (current_time - self.sleep_start_time).total_seconds()
-            if time_slept >= self.SLEEP_DURATION:
+            if self.sleep_start_energy is None:
+                # Siesta guardada sin energía inicial: se parte de la actual
+                self.sleep_start_energy = self.energy
+            self.energy = self.energy_at(current_time)
+            if self.sleep_remaining(current_time) <= 0:
                 self.wake_up()
                 return
 
-            # Calcular ganancia de energía
-            energy_gain = int(time_slept * self.SLEEP_ENERGY_GAIN_PER_SECOND)
-            self.energy = min(8000, self.energy + energy_gain)
-
             # Actualizar imagen de estado
             self.current_state_image = "assets/estados/durmiendo.png"
+            self.record_history(current_time)
             return
 
         # Actualizar imagen basado en estado
@@ -142,10 +262,10 @@ class Pet:
         minutes_passed = (current_time - self.last_update).total_seconds() / 60
 
         # Deterioro aleatorio dentro de los rangos establecidos
-        hunger_decay = random.uniform(*self.BASE_HUNGER_DECAY)
-        energy_decay = random.uniform(*self.BASE_ENERGY_DECAY)
-        hygiene_decay = random.uniform(*self.BASE_HYGIENE_DECAY)
-        happiness_decay = random.uniform(*self.BASE_HAPPINESS_DECAY)
+        hunger_decay = self.rng.uniform(*self.BASE_HUNGER_DECAY)
+        energy_decay = self.rng.uniform(*self.BASE_ENERGY_DECAY)
+        hygiene_decay = self.rng.uniform(*self.BASE_HYGIENE_DECAY)
+        happiness_decay = self.rng.uniform(*self.BASE_HAPPINESS_DECAY)
 
         # Multiplicadores de deterioro basados en estados críticos
         if self.hunger < self.LOW_THRESHOLD:
@@ -173,6 +293,12 @@ class Pet:
 
         self.last_update = current_time
         self.save_state()
+        self.record_history(current_time)
+
+    def record_history(self, now):
+        # Una muestra por tick; las acciones se reflejan en la muestra siguiente
+        if self.history is not None:
+            self.history.record_pet(self, now)
 
     def check_critical_condition(self):
         # Muere si cualquier stat llega a 0 y se mantiene así por mucho tiempo
@@ -180,6 +306,7 @@ class Pet:
         return (self.hunger <= 0 or self.happiness <= 0 or
                 self.energy <= 0 or self.hygiene <= 0)
 
+    @logged_event('feed')
     def feed(self):
         if self.is_sleeping:
             return "Estoy durmiendo... ¡No me despiertes para comer!"
@@ -203,6 +330,7 @@ class Pet:
         self.save_state()
         return None
 
+    @logged_event('play')
     def play(self):
         if self.is_sleeping:
             return "Estoy durmiendo... ¡No me despiertes para jugar!"
@@ -229,13 +357,15 @@ class Pet:
         self.save_state()
         return None
 
-    def sleep(self):
+    @logged_event('sleep')
+    def sleep(self, now=None):
+        current_time = now or datetime.now()
         if self.is_sleeping:
-            time_slept = (datetime.now() - self.sleep_start_time).total_seconds()
-            remaining = self.SLEEP_DURATION - time_slept
+            remaining = self.sleep_remaining(current_time)
             if remaining > 0:
                 return f"Estoy durmiendo... Me faltan {int(remaining)} segundos para despertar"
             else:
+                self.energy = self.energy_at(current_time)
                 self.wake_up()
                 return "¡Me acabo de despertar! Me siento con energía"
 
@@ -246,18 +376,23 @@ class Pet:
             return "No puedo dormir... tengo demasiada hambre"
 
         self.is_sleeping = True
-        self.sleep_start_time = datetime.now()
+        self.sleep_start_time = current_time
+        self.sleep_start_energy = self.energy
         self.current_state_image = "assets/estados/durmiendo.png"
+        self.save_state()
         return "Me voy a dormir por 5 minutos..."
 
+    @logged_event('wake_up')
     def wake_up(self):
         self.is_sleeping = False
         self.sleep_start_time = None
+        self.sleep_start_energy = None
         self.current_state_image = "assets/estados/normal.png"
         if self.energy > self.GOOD_THRESHOLD:
             self.happiness = min(8000, self.happiness + 200)
         self.save_state()
 
+    @logged_event('clean')
     def clean(self):
         if self.is_sleeping:
             return "Estoy durmiendo... ¡No me despiertes para bañarme!"
@@ -285,153 +420,59 @@ class Pet:
             self.is_alive = False
 
     def get_personality_response(self, user_message):
-        if not client:
-            return "Lo siento, no puedo procesar mensajes en este momento."
+        # Sin Mistral o si falla, responde el LocalResponder en lugar de una disculpa fija
+        if not get_llm_service().available:
+            return local_responder.reply(self.snapshot(user_message), user_message)
         try:
-            chat_response = client.chat.complete(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Eres un Tamagotchi con una personalidad divertida y sarcástica. Responde a los mensajes del usuario de manera graciosa y un poco burlona, pero siempre amigable."
-                    },
-                    {
-                        "role": "user",
-                        "content": user_message
-                    }
-                ]
-            )
-            return chat_response.choices[0].message.content
-        except Exception as e:
-            return f"Error al procesar el mensaje: {str(e)}"
+            return get_llm_service().complete(PERSONALITY.messages([user_message])[0],
+                                              call_type=PERSONALITY.call_type)
+        except Exception:
+            return local_responder.reply(self.snapshot(user_message), user_message)
 
     def get_evolution_response(self, user_message):
         try:
-            chat_response = client.chat.complete(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Eres un Tamagotchi que evoluciona según el cuidado que recibe. Si te cuidan bien, te vuelves más amigable y positivo. Si te descuidan, respondes de manera más distante y triste. Decide cómo evolucionarás basándote en tu estado actual y el mensaje del usuario."
-                    },
-                    {
-                        "role": "user",
-                        "content": user_message
-                    }
-                ]
-            )
-            return chat_response.choices[0].message.content
+            return get_llm_service().complete(EVOLUTION.messages([user_message])[0],
+                                              call_type=EVOLUTION.call_type)
         except Exception as e:
             return f"Error al procesar el mensaje: {str(e)}"
 
-    def get_ai_decision(self):
-        # Calcular porcentajes
-        hunger_percent = int(self.hunger / 100)
-        happiness_percent = int(self.happiness / 100)
-        energy_percent = int(self.energy / 100)
-        hygiene_percent = int(self.hygiene / 100)
-
-        # Solo alertar si alguna estadística está por debajo del 20%
-        low_stats = []
-
-        if hunger_percent <= 20:
-            low_stats.append("tengo mucha hambre")
-        if happiness_percent <= 20:
-            low_stats.append("me siento muy triste")
-        if energy_percent <= 20:
-            low_stats.append("estoy muy cansado")
-        if hygiene_percent <= 20:
-            low_stats.append("necesito un baño")
+    def get_low_stats(self):
+        return low_stats_for(self)
 
+    def get_ai_decision(self):
+        # Llamada bloqueante; la interfaz usa AlertPrefetcher para no esperar la red
+        low_stats = self.get_low_stats()
         if not low_stats:
             return ""
 
-        prompt = f"""
-        Necesito expresar que: {', '.join(low_stats)}
-
-        Instrucciones:
-        - Menciona solo los estados críticos (por debajo del 20%)
-        - Hazlo de forma natural y amigable
-        - Sé breve pero expresivo
-        """
-
+        if not get_llm_service().available:
+            return local_responder.alert(low_stats)
         try:
-            chat_response = client.chat.complete(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """Eres un Tamagotchi que necesita expresar sus necesidades.
-                        Comunica tus necesidades de forma natural y amigable, sin ser repetitivo.
-                        Sé breve pero expresivo."""
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            return chat_response.choices[0].message.content
-        except Exception as e:
-            return ""  # En caso de error, no mostrar mensaje
+            return get_llm_service().complete(alert_messages(low_stats), call_type=ALERT.call_type)
+        except Exception:
+            return local_responder.alert(low_stats)
+
+    def snapshot(self, context=""):
+        # Las memorias relevantes se buscan aquí, en el hilo que llama, y no en el worker
+        return PetSnapshot(
+            name=self.name,
+            pet_id=self.pet_id,
+            hunger=self.hunger,
+            happiness=self.happiness,
+            energy=self.energy,
+            hygiene=self.hygiene,
+            relevant_memories=tuple(self.get_relevant_memories(context)) if context else (),
+        )
 
     def get_user_interaction_response(self, user_message):
-        # Verificar si el mensaje pide información o acciones fuera del rol
-        forbidden_topics = ['guerra', 'política', 'historia', 'matemáticas', 'ciencia']
-        if any(topic in user_message.lower() for topic in forbidden_topics):
-            return "¡Soy tu mascota virtual! Me encanta jugar y charlar contigo, pero no puedo ayudarte con eso. ¿Qué tal si jugamos o me cuentas sobre tu día?"
-
-        # Obtener memorias relevantes
-        relevant_memories = self.get_relevant_memories(user_message)
-        memories_context = ""
-
-        if relevant_memories:
-            memories_context = "\n\nRecuerdos relevantes:\n" + "\n".join(relevant_memories)
-
-        # Solo incluir stats si están bajos o si el usuario pregunta por ellos
-        stats_context = ""
-        stats_keywords = ['estado', 'como estas', 'stats', 'estadísticas', 'estadisticas']
-
-        if any(keyword in user_message.lower() for keyword in stats_keywords):
-            stats_context = f"""
-            Mi estado actual es:
-            - Hambre: {int(self.hunger/100)}%
-            - Felicidad: {int(self.happiness/100)}%
-            - Energía: {int(self.energy/100)}%
-            - Higiene: {int(self.hygiene/100)}%
-            """
-
-        prompt = f"""
-        Contexto de la conversación:
-        - Mensaje del usuario: {user_message}
-        {memories_context}
-        {stats_context}
-
-        Instrucciones:
-        - Responde de manera natural y amigable, como un compañero
-        - No menciones tus estadísticas a menos que te pregunten específicamente por ellas
-        - Mantén un tono conversacional y empático
-        - Si el usuario comparte información sobre su día, muestra interés y haz preguntas relevantes
-        """
+        reply = forbidden_topic_reply(user_message)
+        if reply:
+            return reply
 
+        snapshot = self.snapshot(user_message)
+        if not get_llm_service().available:
+            return local_responder.reply(snapshot, user_message)
         try:
-            chat_response = client.chat.complete(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """Eres un Tamagotchi amigable y empático.
-                        Mantienes conversaciones naturales sin mencionar tus estadísticas
-                        a menos que te pregunten específicamente por ellas.
-                        Cuando el usuario comparte información sobre su día, muestras
-                        verdadero interés y haces preguntas relevantes para mantener la conversación."""
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            return chat_response.choices[0].message.content
-        except Exception as e:
-            return f"Error al procesar el mensaje: {str(e)}"
+            return get_llm_service().complete(snapshot.user_interaction_messages(user_message))
+        except Exception:
+            return local_responder.reply(snapshot, user_message)
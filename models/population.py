@@ -0,0 +1,222 @@
+from datetime import datetime, timedelta
+import random
+
+import numpy as np
+
+from models.pet import Pet
+
+# Referencia para convertir datetimes (sin zona horaria, como en Pet) a enteros
+EPOCH = datetime(1970, 1, 1)
+MICROSECONDS_PER_MINUTE = 60 * 10**6
+MICROSECONDS_PER_DAY = 24 * 60 * 60 * 10**6
+NO_TIME = -1  # Equivale a sleep_start_time = None
+NO_ENERGY = -1  # Equivale a sleep_start_energy = None
+
+# Códigos de current_state_image
+STATE_IMAGES = (
+    "assets/estados/normal.png",
+    "assets/estados/sueño.png",
+    "assets/estados/durmiendo.png",
+)
+STATE_NORMAL, STATE_TIRED, STATE_SLEEPING = range(len(STATE_IMAGES))
+
+
+def to_micros(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(value):
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+def rng_from_random(source=random):
+    """Crea un RandomState de NumPy con el mismo estado que un random.Random"""
+    state = source.getstate()[1]
+    rng = np.random.RandomState()
+    rng.set_state(('MT19937', np.array(state[:624], dtype=np.uint32), state[624]))
+    return rng
+
+
+class PetPopulation:
+    """Muchas mascotas en arreglos paralelos, con las mismas reglas que Pet.update_stats"""
+
+    def __init__(self, size, now=None, seed=None):
+        now = to_micros(now or datetime.now())
+        self.size = size
+        self.hunger = np.full(size, 8000, dtype=np.int64)
+        self.happiness = np.full(size, 8000, dtype=np.int64)
+        self.energy = np.full(size, 8000, dtype=np.int64)
+        self.hygiene = np.full(size, 8000, dtype=np.int64)
+        self.age = np.zeros(size, dtype=np.int64)
+        self.is_alive = np.ones(size, dtype=bool)
+        self.is_sleeping = np.zeros(size, dtype=bool)
+        self.state = np.full(size, STATE_NORMAL, dtype=np.uint8)
+        self.last_update = np.full(size, now, dtype=np.int64)
+        self.life_start = np.full(size, now, dtype=np.int64)
+        self.sleep_start = np.full(size, NO_TIME, dtype=np.int64)
+        self.sleep_energy = np.full(size, NO_ENERGY, dtype=np.int64)  # energía al acostarse
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_pets(cls, pets, seed=None):
+        population = cls(len(pets), seed=seed)
+        for i, pet in enumerate(pets):
+            population.hunger[i] = pet.hunger
+            population.happiness[i] = pet.happiness
+            population.energy[i] = pet.energy
+            population.hygiene[i] = pet.hygiene
+            population.age[i] = pet.age
+            population.is_alive[i] = pet.is_alive
+            population.is_sleeping[i] = pet.is_sleeping
+            population.state[i] = STATE_IMAGES.index(pet.current_state_image)
+            population.last_update[i] = to_micros(pet.last_update)
+            population.life_start[i] = to_micros(pet.life_start_time)
+            population.sleep_start[i] = (to_micros(pet.sleep_start_time)
+                                         if pet.sleep_start_time else NO_TIME)
+            population.sleep_energy[i] = (pet.sleep_start_energy
+                                          if pet.sleep_start_energy is not None else NO_ENERGY)
+        return population
+
+    def write_back(self, pets):
+        # Copiar el estado de los arreglos a las instancias de Pet (sin guardar)
+        for i, pet in enumerate(pets):
+            pet.hunger = int(self.hunger[i])
+            pet.happiness = int(self.happiness[i])
+            pet.energy = int(self.energy[i])
+            pet.hygiene = int(self.hygiene[i])
+            pet.age = int(self.age[i])
+            pet.is_alive = bool(self.is_alive[i])
+            pet.is_sleeping = bool(self.is_sleeping[i])
+            pet.current_state_image = STATE_IMAGES[self.state[i]]
+            pet.last_update = from_micros(self.last_update[i])
+            pet.life_start_time = from_micros(self.life_start[i])
+            pet.sleep_start_time = (from_micros(self.sleep_start[i])
+                                    if self.sleep_start[i] != NO_TIME else None)
+            pet.sleep_start_energy = (int(self.sleep_energy[i])
+                                      if self.sleep_energy[i] != NO_ENERGY else None)
+
+    # Acciones: mismas condiciones y efectos que Pet.feed/play/clean/sleep,
+    # aplicadas a las mascotas de `mask` (arreglo booleano de tamaño size)
+    # que pueden hacerlas. Devuelven cuántas la hicieron.
+
+    def _can_act(self, mask):
+        return (mask & self.is_alive & ~self.is_sleeping
+                & (self.energy >= Pet.CRITICAL_THRESHOLD))
+
+    def feed(self, mask):
+        idx = np.flatnonzero(self._can_act(mask) & (self.hunger < 7900))
+        self.hunger[idx] = np.minimum(8000, self.hunger[idx] + 2000)
+        self.energy[idx] = np.maximum(0, self.energy[idx] - 200)
+        self.hygiene[idx] = np.maximum(0, self.hygiene[idx] - 500)
+        self.happiness[idx] = np.minimum(8000, self.happiness[idx] + 300)
+        return idx.size
+
+    def play(self, mask):
+        idx = np.flatnonzero(self._can_act(mask) & (self.hunger >= Pet.CRITICAL_THRESHOLD)
+                             & (self.happiness < 7900))
+        self.happiness[idx] = np.minimum(8000, self.happiness[idx] + 1500)
+        self.energy[idx] = np.maximum(0, self.energy[idx] - 1000)
+        self.hunger[idx] = np.maximum(0, self.hunger[idx] - 800)
+        self.hygiene[idx] = np.maximum(0, self.hygiene[idx] - 500)
+        return idx.size
+
+    def clean(self, mask):
+        idx = np.flatnonzero(self._can_act(mask) & (self.hygiene < 7900))
+        self.hygiene[idx] = np.minimum(8000, self.hygiene[idx] + 3000)
+        self.energy[idx] = np.maximum(0, self.energy[idx] - 500)
+        self.happiness[idx] = np.minimum(8000, self.happiness[idx] + 300)
+        return idx.size
+
+    def sleep(self, mask, now):
+        # Solo mascotas despiertas; despertar lo hace step() al pasar SLEEP_DURATION
+        idx = np.flatnonzero(mask & self.is_alive & ~self.is_sleeping & (self.energy < 7900)
+                             & (self.hunger >= Pet.CRITICAL_THRESHOLD))
+        self.is_sleeping[idx] = True
+        self.sleep_start[idx] = to_micros(now)
+        self.sleep_energy[idx] = self.energy[idx]
+        self.state[idx] = STATE_SLEEPING
+        return idx.size
+
+    def step(self, now=None, rng=None):
+        """Equivale a llamar update_stats(now) en cada mascota viva, en orden de índice.
+
+        Los números aleatorios se consumen en el mismo orden que el bucle escalar
+        (cuatro por mascota despierta), así que con un rng de rng_from_random()
+        el resultado es idéntico al de Pet.update_stats.
+        """
+        now = to_micros(now or datetime.now())
+        rng = rng if rng is not None else self.rng
+
+        alive = self.is_alive
+        sleeping = alive & self.is_sleeping
+        awake = np.flatnonzero(alive & ~self.is_sleeping)
+
+        if sleeping.any():
+            self._step_sleeping(np.flatnonzero(sleeping), now)
+        if awake.size:
+            self._step_awake(awake, now, rng.random((awake.size, 4)))
+
+    def _step_sleeping(self, idx, now):
+        time_slept = (now - self.sleep_start[idx]) / 10**6
+        done = time_slept >= Pet.SLEEP_DURATION
+
+        # Forma cerrada de Pet.energy_at: energía al acostarse + ganancia por tiempo dormido
+        start_energy = self.sleep_energy[idx]
+        start_energy = np.where(start_energy == NO_ENERGY, self.energy[idx], start_energy)
+        self.sleep_energy[idx] = start_energy
+        gain = np.trunc(np.minimum(time_slept, Pet.SLEEP_DURATION)
+                        * Pet.SLEEP_ENERGY_GAIN_PER_SECOND).astype(np.int64)
+        self.energy[idx] = np.minimum(8000, start_energy + gain)
+        self.state[idx[~done]] = STATE_SLEEPING
+
+        # Terminaron la siesta: equivalente a wake_up()
+        woke = idx[done]
+        self.is_sleeping[woke] = False
+        self.sleep_start[woke] = NO_TIME
+        self.sleep_energy[woke] = NO_ENERGY
+        self.state[woke] = STATE_NORMAL
+        rested = woke[self.energy[woke] > Pet.GOOD_THRESHOLD]
+        self.happiness[rested] = np.minimum(8000, self.happiness[rested] + 200)
+
+    def _step_awake(self, idx, now, draws):
+        hunger = self.hunger[idx]
+        energy = self.energy[idx]
+        hygiene = self.hygiene[idx]
+        happiness = self.happiness[idx]
+
+        self.state[idx] = np.where(energy < Pet.LOW_THRESHOLD, STATE_TIRED, STATE_NORMAL)
+
+        minutes_passed = (now - self.last_update[idx]) / 10**6 / 60
+
+        # Mismo orden de sorteos que update_stats: hambre, energía, higiene, felicidad
+        decays = []
+        for column, (low, high) in enumerate((Pet.BASE_HUNGER_DECAY, Pet.BASE_ENERGY_DECAY,
+                                               Pet.BASE_HYGIENE_DECAY, Pet.BASE_HAPPINESS_DECAY)):
+            decays.append(low + (high - low) * draws[:, column])
+        hunger_decay, energy_decay, hygiene_decay, happiness_decay = decays
+
+        # Multiplicadores aplicados en el mismo orden que el camino escalar
+        hungry = hunger < Pet.LOW_THRESHOLD
+        energy_decay = np.where(hungry, energy_decay * 1.5, energy_decay)
+        happiness_decay = np.where(hungry, happiness_decay * 1.3, happiness_decay)
+
+        tired = energy < Pet.LOW_THRESHOLD
+        hunger_decay = np.where(tired, hunger_decay * 1.3, hunger_decay)
+        happiness_decay = np.where(tired, happiness_decay * 1.3, happiness_decay)
+
+        dirty = hygiene < Pet.LOW_THRESHOLD
+        happiness_decay = np.where(dirty, happiness_decay * 1.2, happiness_decay)
+
+        def decayed(value, decay):
+            return np.maximum(0, value - np.trunc(minutes_passed * decay).astype(np.int64))
+
+        self.hunger[idx] = decayed(hunger, hunger_decay)
+        self.energy[idx] = decayed(energy, energy_decay)
+        self.hygiene[idx] = decayed(hygiene, hygiene_decay)
+        self.happiness[idx] = decayed(happiness, happiness_decay)
+
+        # Tiempo de vida: las que cumplieron LIFESPAN_DAYS mueren sin avanzar last_update
+        age_days = (now - self.life_start[idx]) // MICROSECONDS_PER_DAY
+        expired = age_days >= Pet.LIFESPAN_DAYS
+        self.is_alive[idx[expired]] = False
+        self.last_update[idx[~expired]] = now
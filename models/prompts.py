@@ -0,0 +1,168 @@
+from dataclasses import dataclass
+import math
+import re
+
+from utils.metrics import llm_metrics
+
+# Estimación de tokens sin el tokenizador de Mistral: cada palabra cuenta
+# ~1 token por cada 4 caracteres, cada signo de puntuación 1 token y las
+# tiras de espacios (sangría de las plantillas) igual que las palabras. Suele
+# quedar por encima del valor real, lo que es seguro para el presupuesto.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4  # Tokens de control por mensaje (rol y delimitadores)
+_PIECES = re.compile(r"\w+|[^\w\s]|\s{2,}")
+ELLIPSIS = " …"
+
+
+def compact(text):
+    """Quita la sangría y las líneas vacías de una plantilla entre triples comillas"""
+    return "\n".join(line.strip() for line in text.strip().splitlines() if line.strip())
+
+
+def count_tokens(text):
+    return sum(math.ceil(len(piece) / CHARS_PER_TOKEN) for piece in _PIECES.findall(text))
+
+
+def message_tokens(messages):
+    return sum(count_tokens(message["content"]) + MESSAGE_OVERHEAD for message in messages)
+
+
+def truncate_to_tokens(text, budget):
+    # Corta por palabras enteras; se usa solo como último recurso
+    if count_tokens(text) <= budget:
+        return text
+    budget -= count_tokens(ELLIPSIS)
+    words = text.split()
+    kept = []
+    used = 0
+    for word in words:
+        used += count_tokens(word)
+        if used > budget:
+            break
+        kept.append(word)
+    return " ".join(kept) + ELLIPSIS
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """Prompt de un tipo de llamada: system e instrucciones compactados una sola vez.
+
+    messages() arma el mensaje de usuario con las partes fijas, los recuerdos
+    (ordenados de más a menos relevante) y el contexto opcional, y respeta
+    `budget` tokens en total: primero descarta recuerdos desde el final,
+    luego el contexto opcional y, si aún no cabe, recorta las partes fijas.
+    """
+    call_type: str
+    system: str
+    instructions: str = ""
+    budget: int = 600
+
+    def __post_init__(self):
+        object.__setattr__(self, 'system', compact(self.system))
+        object.__setattr__(self, 'instructions', compact(self.instructions))
+
+    def _messages(self, required, memories, context):
+        lines = list(required)
+        if memories:
+            lines.append("Recuerdos relevantes:")
+            lines.extend(memories)
+        lines.extend(context)
+        if self.instructions:
+            lines.append("Instrucciones:")
+            lines.append(self.instructions)
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": "\n".join(lines)},
+        ]
+
+    def messages(self, required, memories=(), context=()):
+        """Devuelve (mensajes, tokens estimados, elementos recortados)"""
+        memories = list(memories)
+        context = list(context)
+        trimmed = 0
+        messages = self._messages(required, memories, context)
+        tokens = message_tokens(messages)
+        while tokens > self.budget and (memories or context):
+            if memories:
+                memories.pop()
+            else:
+                context.pop()
+            trimmed += 1
+            messages = self._messages(required, memories, context)
+            tokens = message_tokens(messages)
+        if tokens > self.budget:
+            # Lo que sobra sale de la parte fija más larga (normalmente el mensaje del usuario)
+            required = list(required)
+            longest = max(range(len(required)), key=lambda i: len(required[i]))
+            excess = tokens - self.budget
+            required[longest] = truncate_to_tokens(
+                required[longest], max(0, count_tokens(required[longest]) - excess))
+            trimmed += 1
+            messages = self._messages(required, memories, context)
+            tokens = message_tokens(messages)
+        if trimmed:
+            llm_metrics.record_trim(self.call_type, trimmed)
+        return messages, tokens, trimmed
+
+
+CHAT = PromptTemplate(
+    call_type='chat',
+    system="""
+        Eres un Tamagotchi amigable y empático.
+        Mantienes conversaciones naturales sin mencionar tus estadísticas
+        a menos que te pregunten específicamente por ellas.
+        Cuando el usuario comparte información sobre su día, muestras
+        verdadero interés y haces preguntas relevantes para mantener la conversación.
+    """,
+    instructions="""
+        - Responde de manera natural y amigable, como un compañero
+        - No menciones tus estadísticas a menos que te pregunten específicamente por ellas
+        - Mantén un tono conversacional y empático
+        - Si el usuario comparte información sobre su día, muestra interés y haz preguntas relevantes
+    """,
+    budget=600,
+)
+
+ALERT = PromptTemplate(
+    call_type='alert',
+    system="""
+        Eres un Tamagotchi que necesita expresar sus necesidades.
+        Comunica tus necesidades de forma natural y amigable, sin ser repetitivo.
+        Sé breve pero expresivo.
+    """,
+    instructions="""
+        - Menciona solo los estados críticos (por debajo del 20%)
+        - Hazlo de forma natural y amigable
+        - Sé breve pero expresivo
+    """,
+    budget=200,
+)
+
+INITIATE = PromptTemplate(
+    call_type='initiate',
+    system="""
+        Eres un Tamagotchi. Tu personalidad es divertida y un poco sarcástica,
+        pero siempre amigable. Genera un mensaje de 1-2 oraciones para iniciar una conversación.
+    """,
+    budget=200,
+)
+
+PERSONALITY = PromptTemplate(
+    call_type='personality',
+    system="""
+        Eres un Tamagotchi con una personalidad divertida y sarcástica. Responde a los
+        mensajes del usuario de manera graciosa y un poco burlona, pero siempre amigable.
+    """,
+    budget=400,
+)
+
+EVOLUTION = PromptTemplate(
+    call_type='evolution',
+    system="""
+        Eres un Tamagotchi que evoluciona según el cuidado que recibe. Si te cuidan bien,
+        te vuelves más amigable y positivo. Si te descuidan, respondes de manera más
+        distante y triste. Decide cómo evolucionarás basándote en tu estado actual y el
+        mensaje del usuario.
+    """,
+    budget=400,
+)
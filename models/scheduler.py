@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+import math
+
+from models.pet import Pet
+
+# get_ai_decision alerta cuando int(stat / 100) <= 20, es decir stat < 2100
+ALERT_LINE = 2100
+# PetScreen muestra int(stat / 8000 * 100): cada punto porcentual son 80 unidades
+UNITS_PER_PERCENT = 80
+
+
+class StatScheduler:
+    """Calcula cuándo ocurre el próximo evento visible de una mascota.
+
+    En lugar de despertar cada 30 s (o cada segundo durmiendo), se usa el
+    deterioro máximo posible de cada stat para saber cuál es el primer momento
+    en que puede cambiar un porcentaje, cruzarse un umbral, terminar la siesta
+    o agotarse el tiempo de vida. Al usar la tasa máxima el evento nunca llega
+    tarde; si llega temprano basta con reprogramar.
+    """
+
+    # No actualizar más seguido que el antiguo intervalo de 30 s estando despierto:
+    # update_stats trunca el deterioro de cada llamada y se perdería con ticks cortos
+    MIN_AWAKE_DELAY = 30
+    MAX_DELAY = 30 * 60
+
+    def max_decay_rates(self, pet):
+        # Tasas por minuto en el peor caso, con los mismos multiplicadores que update_stats
+        hungry = pet.hunger < Pet.LOW_THRESHOLD
+        tired = pet.energy < Pet.LOW_THRESHOLD
+        dirty = pet.hygiene < Pet.LOW_THRESHOLD
+
+        hunger = Pet.BASE_HUNGER_DECAY[1] * (1.3 if tired else 1)
+        energy = Pet.BASE_ENERGY_DECAY[1] * (1.5 if hungry else 1)
+        hygiene = Pet.BASE_HYGIENE_DECAY[1]
+        happiness = Pet.BASE_HAPPINESS_DECAY[1]
+        happiness *= (1.3 if hungry else 1) * (1.3 if tired else 1) * (1.2 if dirty else 1)
+
+        return {
+            'hunger': hunger,
+            'energy': energy,
+            'hygiene': hygiene,
+            'happiness': happiness,
+        }
+
+    def units_to_next_event(self, value, percent=True):
+        if value <= 0:
+            return None
+
+        # Siguiente cambio de porcentaje mostrado
+        distances = [value % UNITS_PER_PERCENT + 1] if percent else []
+
+        # Cruces de umbrales y llegada a cero
+        for threshold in (Pet.CRITICAL_THRESHOLD, ALERT_LINE, Pet.LOW_THRESHOLD):
+            if value >= threshold:
+                distances.append(value - threshold + 1)
+        distances.append(value)
+
+        return min(distances)
+
+    def seconds_to_lifespan_end(self, pet, now):
+        life_end = pet.life_start_time + timedelta(days=Pet.LIFESPAN_DAYS)
+        return max(0.0, (life_end - now).total_seconds())
+
+    def seconds_to_energy_change(self, pet, now):
+        """Durmiendo: segundos hasta que cambie el porcentaje de energía mostrado"""
+        energy = pet.energy_at(now)
+        if energy >= 8000:
+            return None
+        start_energy = pet.energy if pet.sleep_start_energy is None else pet.sleep_start_energy
+        target = (energy // UNITS_PER_PERCENT + 1) * UNITS_PER_PERCENT
+        elapsed = (now - pet.sleep_start_time).total_seconds()
+        return max(0.0, (target - start_energy) / Pet.SLEEP_ENERGY_GAIN_PER_SECOND - elapsed)
+
+    def next_event(self, pet, now=None, countdown=True, percent=True):
+        """Devuelve (segundos, motivo) hasta el próximo evento, o None si no hay ninguno.
+
+        Con countdown=False no se despierta por cada segundo de la cuenta
+        regresiva de la siesta, solo cuando cambia la energía mostrada. Con
+        percent=False tampoco por cambios de porcentaje: solo umbrales, fin
+        de la siesta y fin de la vida (la ventana oculta en la bandeja).
+        """
+        if not pet.is_alive:
+            return None
+
+        now = now or datetime.now()
+
+        if pet.is_sleeping:
+            # Durmiendo, update_stats no mira la edad: la vida termina en el
+            # primer tick despierto, así que el fin de la siesta ya lo cubre
+            remaining = pet.sleep_remaining(now)
+            candidates = [(remaining, 'sleep_end')]
+            energy_change = self.seconds_to_energy_change(pet, now) if percent else None
+            if energy_change is not None:
+                candidates.append((energy_change, 'energy'))
+            if countdown:
+                # Siguiente cambio del segundo mostrado
+                fraction = remaining - math.floor(remaining)
+                candidates.append((fraction if fraction > 0 else 1.0, 'countdown'))
+            return min(candidates)
+
+        candidates = [(self.seconds_to_lifespan_end(pet, now), 'lifespan')]
+        rates = self.max_decay_rates(pet)
+        for stat, rate in rates.items():
+            units = self.units_to_next_event(getattr(pet, stat), percent)
+            if units is not None:
+                seconds = units / rate * 60
+                candidates.append((max(self.MIN_AWAKE_DELAY, seconds), stat))
+
+        delay, reason = min(candidates)
+        return min(delay, self.MAX_DELAY), reason
@@ -0,0 +1,267 @@
+"""Simulador Monte Carlo del balance de Pet con políticas de cuidado intercambiables.
+
+Cada lote simula muchas vidas completas con PetPopulation (un paso por tick)
+y devuelve histogramas, no arreglos por mascota, así que los procesos solo
+intercambian unos pocos KB. Los lotes usan semillas derivadas de una semilla
+base con SeedSequence: el resultado no depende del número de procesos.
+
+Uso: python -m models.simulation --policy atento --lifetimes 100000 --workers 4
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import os
+import time
+
+import numpy as np
+
+from models.pet import Pet
+from models.population import PetPopulation
+
+START = datetime(2024, 1, 1)
+LIFESPAN_MINUTES = Pet.LIFESPAN_DAYS * Pet.MINUTES_PER_DAY
+# La mascota muere si algún stat se queda en 0 durante este tiempo (ver
+# Pet.check_critical_condition); la aplicación aún no lo aplica
+STARVATION_MINUTES = 120
+CRITICAL_BINS = 100  # Histograma de la fracción de vida en estado crítico, en %
+
+POLICIES = {}
+
+
+def policy(name):
+    """Registra una política: función (population, minute, rng) -> {acción: máscara}.
+
+    Las acciones posibles son feed, play, clean y sleep y se aplican en ese
+    orden. Las políticas deben estar definidas a nivel de módulo para que los
+    procesos del pool puedan usarlas por nombre.
+    """
+    def register(func):
+        POLICIES[name] = func
+        return func
+    return register
+
+
+@policy('abandono')
+def neglect(population, minute, rng):
+    return {}
+
+
+@policy('umbral')
+def threshold(population, minute, rng):
+    # Revisa cada hora y atiende lo que esté por debajo de LOW_THRESHOLD
+    if minute % 60:
+        return {}
+    return {
+        'feed': population.hunger < Pet.LOW_THRESHOLD,
+        'clean': population.hygiene < Pet.LOW_THRESHOLD,
+        'play': population.happiness < Pet.LOW_THRESHOLD,
+        'sleep': population.energy < Pet.LOW_THRESHOLD,
+    }
+
+
+@policy('atento')
+def attentive(population, minute, rng):
+    # Revisa cada 10 minutos y mantiene todo por encima de GOOD_THRESHOLD
+    if minute % 10:
+        return {}
+    return {
+        'feed': population.hunger < Pet.GOOD_THRESHOLD,
+        'clean': population.hygiene < Pet.GOOD_THRESHOLD,
+        'play': population.happiness < Pet.GOOD_THRESHOLD,
+        'sleep': population.energy < Pet.GOOD_THRESHOLD,
+    }
+
+
+@policy('diurno')
+def daytime(population, minute, rng):
+    # Como 'umbral', pero solo entre las 8:00 y las 23:00
+    if not 8 * 60 <= minute % Pet.MINUTES_PER_DAY < 23 * 60:
+        return {}
+    return threshold(population, minute, rng)
+
+
+@policy('azar')
+def random_care(population, minute, rng):
+    # Cada media hora, cada mascota recibe una acción al azar con probabilidad 1/2
+    if minute % 30:
+        return {}
+    choice = rng.integers(0, 8, population.size)
+    return {action: choice == i for i, action in enumerate(('feed', 'play', 'clean', 'sleep'))}
+
+
+def resolve_policy(name):
+    # Nombre registrado o "modulo:funcion" para políticas externas
+    if name in POLICIES:
+        return POLICIES[name]
+    module_name, _, attribute = name.partition(':')
+    if not attribute:
+        raise ValueError(f"Política desconocida: {name!r} (opciones: {', '.join(POLICIES)})")
+    import importlib
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def simulate_batch(policy_name, size, seed, tick_minutes=1, starvation_minutes=STARVATION_MINUTES):
+    """Simula `size` vidas completas y devuelve sus histogramas.
+
+    lifespan: vidas por minuto de muerte (índice LIFESPAN_MINUTES = vida completa)
+    critical: vidas por porcentaje de tiempo con algún stat bajo CRITICAL_THRESHOLD
+    """
+    care = resolve_policy(policy_name)
+    rng = np.random.default_rng(seed)
+    population = PetPopulation(size, now=START, seed=rng)
+    zero_minutes = np.zeros(size, dtype=np.int64)
+    critical_minutes = np.zeros(size, dtype=np.int64)
+    lifespan = np.full(size, LIFESPAN_MINUTES, dtype=np.int64)
+    starved = np.zeros(size, dtype=bool)
+
+    for minute in range(tick_minutes, LIFESPAN_MINUTES + 1, tick_minutes):
+        now = START + timedelta(minutes=minute)
+        for action, mask in care(population, minute, rng).items():
+            if action == 'sleep':
+                population.sleep(mask, now)
+            else:
+                getattr(population, action)(mask)
+        population.step(now)
+
+        alive = population.is_alive
+        stats = (population.hunger, population.happiness, population.energy, population.hygiene)
+        critical = alive & np.logical_or.reduce([stat < Pet.CRITICAL_THRESHOLD for stat in stats])
+        critical_minutes[critical] += tick_minutes
+        at_zero = alive & np.logical_or.reduce([stat <= 0 for stat in stats])
+        zero_minutes = np.where(at_zero, zero_minutes + tick_minutes, 0)
+
+        dead = alive & (zero_minutes >= starvation_minutes)
+        population.is_alive[dead] = False
+        starved |= dead
+        lifespan[dead] = minute
+        if not population.is_alive.any():
+            break
+
+    critical_percent = np.minimum(CRITICAL_BINS - 1, critical_minutes * 100 // lifespan)
+    return {
+        'lifetimes': size,
+        'starved': int(starved.sum()),
+        'lifespan': np.bincount(lifespan, minlength=LIFESPAN_MINUTES + 1),
+        'critical': np.bincount(critical_percent, minlength=CRITICAL_BINS),
+        'critical_minutes': int(critical_minutes.sum()),
+        'lived_minutes': int(lifespan.sum()),
+    }
+
+
+def histogram_percentile(histogram, q):
+    cumulative = np.cumsum(histogram)
+    return int(np.searchsorted(cumulative, q * cumulative[-1]))
+
+
+@dataclass
+class SimulationReport:
+    policy: str
+    lifetimes: int
+    starved: int
+    lifespan: np.ndarray
+    critical: np.ndarray
+    critical_minutes: int
+    lived_minutes: int
+    elapsed: float = 0.0
+    workers: int = 1
+
+    @property
+    def survival_rate(self):
+        return 1 - self.starved / self.lifetimes
+
+    @property
+    def critical_fraction(self):
+        """Fracción del tiempo vivido (de todas las mascotas) en estado crítico"""
+        return self.critical_minutes / self.lived_minutes
+
+    def lifespan_hours(self, q):
+        return histogram_percentile(self.lifespan, q) / 60
+
+    def critical_percent(self, q):
+        return histogram_percentile(self.critical, q)
+
+    def as_dict(self):
+        return {
+            'policy': self.policy,
+            'lifetimes': self.lifetimes,
+            'survival_rate': self.survival_rate,
+            'critical_fraction': self.critical_fraction,
+            'critical_percent_p50': self.critical_percent(0.5),
+            'critical_percent_p95': self.critical_percent(0.95),
+            'lifespan_hours': {f'p{int(q * 100)}': self.lifespan_hours(q)
+                               for q in (0.05, 0.25, 0.5, 0.75, 0.95)},
+            'lifespan_days_histogram': [int(self.lifespan[day * Pet.MINUTES_PER_DAY:
+                                                          (day + 1) * Pet.MINUTES_PER_DAY].sum())
+                                        for day in range(Pet.LIFESPAN_DAYS)]
+                                       + [int(self.lifespan[LIFESPAN_MINUTES])],
+            'elapsed': self.elapsed,
+            'workers': self.workers,
+            'lifetimes_per_sec': self.lifetimes / self.elapsed if self.elapsed else None,
+        }
+
+
+def merge(policy_name, results):
+    return SimulationReport(
+        policy=policy_name,
+        lifetimes=sum(r['lifetimes'] for r in results),
+        starved=sum(r['starved'] for r in results),
+        lifespan=sum(r['lifespan'] for r in results),
+        critical=sum(r['critical'] for r in results),
+        critical_minutes=sum(r['critical_minutes'] for r in results),
+        lived_minutes=sum(r['lived_minutes'] for r in results),
+    )
+
+
+def simulate(policy_name, lifetimes, workers=None, batch_size=10_000, seed=0, tick_minutes=1,
+             starvation_minutes=STARVATION_MINUTES):
+    """Reparte `lifetimes` vidas en lotes entre `workers` procesos y une los resultados"""
+    resolve_policy(policy_name)  # Fallar aquí y no dentro de cada proceso
+    workers = workers or os.cpu_count() or 1
+    sizes = [batch_size] * (lifetimes // batch_size)
+    if lifetimes % batch_size:
+        sizes.append(lifetimes % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(policy_name, size, batch_seed, tick_minutes, starvation_minutes)
+            for size, batch_seed in zip(sizes, seeds)]
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = [simulate_batch(*batch) for batch in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(simulate_batch, *zip(*args)))
+    report = merge(policy_name, results)
+    report.elapsed = time.perf_counter() - start
+    report.workers = workers
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--policy', action='append',
+                        help="política (se puede repetir); por defecto todas las registradas")
+    parser.add_argument('--lifetimes', type=int, default=20_000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--tick', type=int, default=1, help="minutos por paso")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="imprimir los informes en JSON")
+    args = parser.parse_args()
+
+    reports = [simulate(name, args.lifetimes, args.workers, args.batch_size, args.seed, args.tick)
+               for name in args.policy or POLICIES]
+    if args.json:
+        import json
+        print(json.dumps([report.as_dict() for report in reports], indent=2))
+        return
+    for report in reports:
+        print(f"{report.policy:10} supervivencia {report.survival_rate:7.2%}  "
+              f"tiempo crítico {report.critical_fraction:6.1%} "
+              f"(p95 {report.critical_percent(0.95)}%)  vida p5/p50 "
+              f"{report.lifespan_hours(0.05):5.1f}/{report.lifespan_hours(0.5):5.1f} h  "
+              f"{report.lifetimes / report.elapsed:,.0f} vidas/s")
+
+
+if __name__ == '__main__':
+    main()
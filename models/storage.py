@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from models.database import PetDatabase, rank_memories, stats_from_row, stats_row
+
+STORAGE_ENV = 'TAMAGOTCHI_STORAGE'
+BACKENDS = ('sqlite', 'memory', 'log')
+LOG_ENV = 'TAMAGOTCHI_LOG'  # Propia: TAMAGOTCHI_DB nombra el archivo SQLite
+DEFAULT_LOG_PATH = 'pet_data.log'
+
+
+class MemoryStorage:
+    """Almacenamiento en memoria con la misma interfaz que PetDatabase.
+
+    Para simulaciones y pruebas: no toca el disco y no sobrevive al proceso.
+    Cada escritura es una lista de registros que _write aplica de una vez.
+    """
+
+    has_fts = False
+    stats_row = staticmethod(stats_row)
+
+    def __init__(self):
+        self.commits = 0
+        self._lock = threading.Lock()
+        self._stats = {}      # pet_id -> fila de stats_row
+        self._memories = {}   # pet_id -> lista de (id, category, content, created_at)
+        self._next_memory_id = 1
+
+    @property
+    def open_connections(self):
+        return 0
+
+    def _apply(self, record):
+        kind = record[0]
+        if kind == 'stats':
+            row = tuple(record[1])
+            self._stats[row[0]] = row
+            return
+        _, pet_id, category, content, created_at = record
+        memories = self._memories.setdefault(pet_id, [])
+        if kind == 'memory':
+            # Igual que PetDatabase.add_memory: una memoria por categoría
+            for i, memory in enumerate(memories):
+                if memory[1] == category:
+                    memories[i] = (memory[0], category, content, created_at)
+                    return
+        memories.append((self._next_memory_id, category, content, created_at))
+        self._next_memory_id += 1
+
+    def _write(self, records):
+        with self._lock:
+            for record in records:
+                self._apply(record)
+            self.commits += 1
+
+    def save_stats(self, pet):
+        self._write([('stats', self.stats_row(pet))])
+
+    def save_many(self, rows):
+        self.write_batch(rows)
+
+    def load_stats(self, pet_id=1):
+        row = self._stats.get(pet_id)
+        return stats_from_row(row) if row else None
+
+    def load_many(self, pet_ids=None):
+        rows = self._stats if pet_ids is None else {
+            pet_id: self._stats[pet_id] for pet_id in pet_ids if pet_id in self._stats}
+        return {pet_id: stats_from_row(row) for pet_id, row in rows.items()}
+
+    def add_memory(self, category, content, pet_id=1):
+        self._write([('memory', pet_id, category, content, datetime.now().isoformat())])
+
+    def add_memories(self, rows, append=False):
+        """Como PetDatabase.add_memories: append=True no reemplaza por categoría"""
+        self._write([('append' if append else 'memory', *row) for row in rows])
+
+    def write_batch(self, stats_rows=(), memories=()):
+        self._write([('stats', row) for row in stats_rows] +
+                    [('memory', *memory) for memory in memories])
+
+    def get_memories(self, category=None, pet_id=1):
+        memories = self._memories.get(pet_id, ())
+        if category:
+            return [memory for memory in memories if memory[1] == category]
+        return list(memories)
+
+    def search_memories(self, words, categories=(), pet_id=1, limit=5):
+        return rank_memories(self.get_memories(pet_id=pet_id), words, categories, limit)
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class LogStorage(MemoryStorage):
+    """Registro de solo anexado: cada escritura es una línea JSON al final del archivo.
+
+    El estado vive en memoria y se reconstruye al abrir releyendo el registro.
+    Cuando el registro tiene compact_ratio veces más líneas que datos vivos se
+    reescribe como una instantánea (archivo temporal + os.replace). Con
+    fsync=True cada escritura espera a que llegue al disco.
+    """
+
+    def __init__(self, path=None, fsync=False, compact_ratio=4, min_compact_records=1000):
+        super().__init__()
+        self.path = path or os.getenv(LOG_ENV, DEFAULT_LOG_PATH)
+        self.fsync = fsync
+        self.compact_ratio = compact_ratio
+        self.min_compact_records = min_compact_records
+        self.compactions = 0
+        self._records = self._replay()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return 0
+        count = 0
+        end = 0  # Bytes hasta el final de la última línea completa
+        with open(self.path, 'rb') as f:
+            lines = f.readlines()
+        for number, line in enumerate(lines, 1):
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError
+                record = json.loads(line.decode('utf-8'))
+            except ValueError:
+                if number == len(lines):
+                    # Última línea a medio escribir: se perdió con el cierre. Se
+                    # corta para que la próxima escritura no quede pegada a ella
+                    with open(self.path, 'r+b') as f:
+                        f.truncate(end)
+                    break
+                raise ValueError(f"{self.path}: línea {number} dañada")
+            self._apply(record)
+            end += len(line)
+            count += 1
+        return count
+
+    def _live_records(self):
+        return len(self._stats) + sum(len(memories) for memories in self._memories.values())
+
+    def _write(self, records):
+        data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            for record in records:
+                self._apply(record)
+            self._records += len(records)
+            self.commits += 1
+            if (self._records >= self.min_compact_records
+                    and self._records > self.compact_ratio * self._live_records()):
+                self._compact()
+
+    def _compact(self):
+        # Las memorias se escriben como 'append' para conservar duplicados y orden
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for row in self._stats.values():
+                f.write(json.dumps(('stats', row), ensure_ascii=False) + '\n')
+            for pet_id, memories in self._memories.items():
+                for _, category, content, created_at in memories:
+                    f.write(json.dumps(('append', pet_id, category, content, created_at),
+                                       ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._records = self._live_records()
+        self.compactions += 1
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def open_storage(backend=None, path=None):
+    """Crea el almacenamiento indicado, o el de TAMAGOTCHI_STORAGE (sqlite por defecto)"""
+    backend = backend or os.getenv(STORAGE_ENV, 'sqlite')
+    if backend == 'sqlite':
+        return PetDatabase(path)
+    if backend == 'memory':
+        return MemoryStorage()
+    if backend == 'log':
+        return LogStorage(path)
+    raise ValueError(f"Almacenamiento desconocido: {backend!r} (opciones: {', '.join(BACKENDS)})")
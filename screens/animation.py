@@ -0,0 +1,240 @@
+from bisect import bisect_right
+from dataclasses import dataclass
+import math
+import os
+import threading
+import time
+
+from PyQt5.QtCore import QObject, Qt, QTimer
+from PyQt5.QtGui import QImageReader, QPixmap
+
+# Fracción de un núcleo que puede usar el hilo de la interfaz mientras anima;
+# 0 desactiva las animaciones (solo imágenes fijas)
+BUDGET_ENV = "TAMAGOTCHI_ANIMATION_BUDGET"
+DEFAULT_BUDGET = 0.05
+
+
+@dataclass(frozen=True)
+class AnimationSpec:
+    source: str
+    speed: float = 1.0  # 0.5 = a media velocidad
+
+
+# Estados animados; varios pueden compartir los mismos frames con otra velocidad
+ANIMATED_STATES = {
+    "assets/estados/normal.png": AnimationSpec("giphy.gif"),
+    "assets/estados/sueño.png": AnimationSpec("giphy.gif", speed=0.5),
+}
+
+
+def animation_budget():
+    try:
+        return max(0.0, float(os.getenv(BUDGET_ENV, DEFAULT_BUDGET)))
+    except ValueError:
+        return DEFAULT_BUDGET
+
+
+class AnimationFrames:
+    """Frames de una animación ya escalados, con sus tiempos en ms"""
+
+    def __init__(self, images, delays):
+        self.images = images
+        self.delays = delays
+        self.starts = [0]  # Inicio de cada frame dentro del ciclo
+        for delay in delays[:-1]:
+            self.starts.append(self.starts[-1] + delay)
+        self.duration = sum(delays)
+        self._pixmaps = [None] * len(images)
+
+    def __len__(self):
+        return len(self.images)
+
+    def index_at(self, position):
+        return bisect_right(self.starts, position % self.duration) - 1
+
+    def pixmap(self, index):
+        # QPixmap solo en el hilo de la interfaz; se convierte una vez por frame
+        pixmap = self._pixmaps[index]
+        if pixmap is None:
+            pixmap = self._pixmaps[index] = QPixmap.fromImage(self.images[index])
+        return pixmap
+
+
+class FrameCache:
+    """Animaciones decodificadas y escaladas una sola vez, por (ruta, tamaño).
+
+    La decodificación va en un hilo aparte con QImage, como
+    PixmapCache.prewarm; get() devuelve None mientras no esté lista o si
+    falló (failed() los distingue; un fallo no se vuelve a intentar).
+    """
+
+    MIN_DELAY = 20  # ms; los GIF con retardo 0 o muy corto se muestran a 50 fps
+
+    def __init__(self):
+        self._frames = {}
+        self._loading = set()
+        self._failed = set()
+        self._lock = threading.Lock()
+        self.decodes = 0
+
+    def get(self, path, size):
+        key = (path, size)
+        with self._lock:
+            frames = self._frames.get(key)
+            if frames is not None or key in self._loading or key in self._failed:
+                return frames
+            self._loading.add(key)
+        threading.Thread(target=self._load, args=(key,), name='frame-decode', daemon=True).start()
+        return None
+
+    def load(self, path, size):
+        """Decodifica en este hilo (benchmarks y pruebas)"""
+        key = (path, size)
+        if key not in self._frames and not self.failed(path, size):
+            self._load(key)
+        return self._frames.get(key)
+
+    def failed(self, path, size):
+        with self._lock:
+            return (path, size) in self._failed
+
+    def _load(self, key):
+        path, size = key
+        reader = QImageReader(path)
+        images, delays = [], []
+        while reader.canRead():
+            image = reader.read()
+            if image.isNull():
+                break
+            images.append(image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+            delays.append(max(self.MIN_DELAY, reader.nextImageDelay()))
+        with self._lock:
+            self._loading.discard(key)
+            if images:
+                self._frames[key] = AnimationFrames(images, delays)
+                self.decodes += 1
+            else:
+                self._failed.add(key)
+                print(f"No se pudo cargar la animación: {path}")
+
+
+frame_cache = FrameCache()
+
+
+class SpritePlayer(QObject):
+    """Reproduce en un QLabel una animación de FrameCache.
+
+    El frame se elige por el tiempo transcurrido, así que si el bucle de
+    eventos se atrasa se saltan frames en lugar de ir más lento. El
+    temporizador se programa para el próximo cambio de frame. Cada segundo
+    se compara el CPU del hilo de la interfaz con `budget`: si se pasa se
+    muestra uno de cada `stride` frames, y si sobra se vuelve a subir.
+    """
+
+    RETRY_MS = 50          # Mientras se decodifican los frames
+    BUDGET_WINDOW = 1.0    # segundos entre ajustes de stride
+
+    def __init__(self, label, size, budget=None, clock=time.perf_counter, cpu_clock=time.thread_time):
+        super().__init__(label)
+        self.label = label
+        self.size = size
+        self.budget = animation_budget() if budget is None else budget
+        self._clock = clock
+        self._cpu_clock = cpu_clock
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+        self.spec = None
+        self.paused = False
+        self.stride = 1
+        self.shown = 0
+        self.dropped = 0
+        self._start = 0.0
+        self._paused_at = None
+        self._last = None
+        self._window = None  # (reloj, cpu) al empezar la ventana del presupuesto
+
+    @property
+    def enabled(self):
+        return self.budget > 0
+
+    @property
+    def playing(self):
+        return self.spec is not None and not self.paused
+
+    def play(self, spec):
+        if spec == self.spec:
+            return
+        self.spec = spec
+        self._start = self._clock()
+        self._last = None
+        self._paused_at = None
+        self._window = None
+        if not self.paused:
+            self._timer.start(0)
+
+    def stop(self):
+        self.spec = None
+        self._timer.stop()
+
+    def pause(self):
+        if not self.paused:
+            self.paused = True
+            self._paused_at = self._clock()
+            self._timer.stop()
+
+    def resume(self):
+        if self.paused:
+            self.paused = False
+            if self._paused_at is not None:
+                # Seguir desde el mismo frame, sin contar el tiempo oculto
+                self._start += self._clock() - self._paused_at
+                self._paused_at = None
+            self._window = None
+            if self.spec is not None:
+                self._timer.start(0)
+
+    def _tick(self):
+        if not self.playing:
+            return
+        frames = frame_cache.get(self.spec.source, self.size)
+        if frames is None:
+            if frame_cache.failed(self.spec.source, self.size):
+                self.stop()  # Queda la imagen fija que ya se mostró
+            else:
+                self._timer.start(self.RETRY_MS)
+            return
+
+        now = self._clock()
+        position = (now - self._start) * 1000 * self.spec.speed % frames.duration
+        index = frames.index_at(position)
+        index -= index % self.stride
+        if index != self._last:
+            if self._last is not None:
+                self.dropped += (index - self._last) % len(frames) - 1
+            self.label.setPixmap(frames.pixmap(index))
+            self._last = index
+            self.shown += 1
+        self._check_budget(now, len(frames))
+
+        # Próximo frame a mostrar: index + stride, o el primero del ciclo siguiente
+        following = index + self.stride
+        boundary = frames.starts[following] if following < len(frames) else frames.duration
+        delay = (boundary - position) / self.spec.speed
+        self._timer.start(max(1, math.ceil(delay)))
+
+    def _check_budget(self, now, count):
+        cpu = self._cpu_clock()
+        if self._window is None:
+            self._window = (now, cpu)
+            return
+        elapsed = now - self._window[0]
+        if elapsed < self.BUDGET_WINDOW:
+            return
+        usage = (cpu - self._window[1]) / elapsed
+        if usage > self.budget and self.stride < count:
+            self.stride += 1
+        elif usage < self.budget / 2 and self.stride > 1:
+            self.stride -= 1
+        self._window = (now, cpu)
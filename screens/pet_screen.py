@@ -2,7 +2,13 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, QProgressBar,
                            QHBoxLayout, QFrame, QSizePolicy)
 from PyQt5.QtGui import QPixmap, QIcon
 from PyQt5.QtCore import Qt
+from dataclasses import replace
+import time
 from models.pet import Pet
+from screens.animation import ANIMATED_STATES, SpritePlayer, frame_cache
+from screens.pixmap_cache import pixmap_cache, prewarm_states
+from screens.render_model import PetViewState, RenderStats
+from utils.instrument import timed
 
 class StatWidget(QFrame):
     def __init__(self, name, value, icon_path=None):
@@ -16,7 +22,7 @@ class StatWidget(QFrame):
 
         if icon_path:
             icon_label = QLabel()
-            icon_label.setPixmap(QPixmap(icon_path).scaled(16, 16, Qt.KeepAspectRatio))
+            icon_label.setPixmap(pixmap_cache.get(icon_path, 16, 16, Qt.FastTransformation))
             header_layout.addWidget(icon_label)
 
         label = QLabel(name)
@@ -24,6 +30,7 @@ class StatWidget(QFrame):
         header_layout.addWidget(label)
 
         percent_value = int(value / 100)
+        self.percent = percent_value
         self.percent_label = QLabel(f"{percent_value}%")
         self.percent_label.setObjectName("percent-label")
         header_layout.addWidget(self.percent_label)
@@ -41,14 +48,29 @@ class StatWidget(QFrame):
         self.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
 
     def update_value(self, value):
-        percent_value = int(value / 100)
-        self.progress.setValue(percent_value)
-        self.percent_label.setText(f"{percent_value}%")
+        return self.set_percent(int(value / 100))
+
+    def set_percent(self, percent):
+        # Devuelve si hubo que actualizar la barra y la etiqueta
+        if percent == self.percent:
+            return False
+        self.percent = percent
+        self.progress.setValue(percent)
+        self.percent_label.setText(f"{percent}%")
+        return True
 
 class PetScreen(QWidget):
     def __init__(self, pet: Pet):
         super().__init__()
         self.pet = pet
+        self.image_size = 200
+        self._shown_image = None  # (ruta, tamaño) de la imagen mostrada
+        self._view_state = None   # Último PetViewState dibujado
+        self.paused = False       # Ventana oculta: no se dibuja nada
+        self.render_stats = RenderStats()
+
+        # Decodificar en segundo plano las imágenes de todos los estados
+        prewarm_states(self.image_size, self.image_size)
 
         # Crear el layout principal
         main_layout = QVBoxLayout()
@@ -66,6 +88,11 @@ class PetScreen(QWidget):
         self.image_label.setObjectName("pet-image")
         self.image_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.image_label)
+        # Estados animados: la imagen fija se ve hasta que estén los frames
+        self.player = SpritePlayer(self.image_label, self.image_size)
+        if self.player.enabled:
+            for spec in set(ANIMATED_STATES.values()):
+                frame_cache.get(spec.source, self.image_size)
 
         # Stats layout
         stats_layout = QHBoxLayout()
@@ -80,6 +107,12 @@ class PetScreen(QWidget):
         self.health_stat = StatWidget("Vida", self.pet.happiness, "assets/icons/health.png")
         self.hunger_stat = StatWidget("Hambre", self.pet.hunger, "assets/icons/hunger.png")
         self.sleep_stat = StatWidget("Sueño", self.pet.energy, "assets/icons/sleep.png")
+        self.stat_widgets = {
+            'hygiene': self.hygiene_stat,
+            'health': self.health_stat,
+            'hunger': self.hunger_stat,
+            'sleep': self.sleep_stat,
+        }
 
         left_stats.addWidget(self.hygiene_stat)
         left_stats.addWidget(self.health_stat)
@@ -94,38 +127,72 @@ class PetScreen(QWidget):
         main_layout.addWidget(content)
         self.setLayout(main_layout)
 
-        # Inicializar la imagen
-        self.update_image(self.pet.current_state_image)
+        # Primer frame: stats e imagen
+        self.update_stats()
 
+    @timed('update_image')
     def update_image(self, image_path):
+        # No hacer nada si ya se muestra esta imagen a este tamaño
+        shown = (image_path, self.image_size)
+        if shown == self._shown_image:
+            return True
+        spec = ANIMATED_STATES.get(image_path) if self.player.enabled else None
+        if spec is None:
+            self.player.stop()
         try:
-            pixmap = QPixmap(image_path)
+            # Escalar la imagen manteniendo proporción (desde la caché)
+            pixmap = pixmap_cache.get(image_path, self.image_size, self.image_size)
             if not pixmap.isNull():
-                # Escalar la imagen manteniendo proporción
-                scaled_pixmap = pixmap.scaled(200, 200, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.image_label.setPixmap(scaled_pixmap)
-            else:
-                print(f"No se pudo cargar la imagen: {image_path}")
+                self.image_label.setPixmap(pixmap)
+                self._shown_image = shown
+                if spec is not None:
+                    self.player.play(spec)
+                return True
+            print(f"No se pudo cargar la imagen: {image_path}")
         except Exception as e:
             print(f"Error al actualizar la imagen: {e}")
+        return False
 
-    def update_stats(self):
-        # Actualizar stats usando los valores reales (0-8000) y convirtiéndolos a porcentajes
-        hygiene_percent = min(100, int((self.pet.hygiene / 8000) * 100))
-        health_percent = min(100, int((self.pet.happiness / 8000) * 100))
-        hunger_percent = min(100, int((self.pet.hunger / 8000) * 100))
-        sleep_percent = min(100, int((self.pet.energy / 8000) * 100))
+    def pause(self):
+        # Con la ventana en la bandeja nadie ve los widgets ni las imágenes
+        self.paused = True
+        self.player.pause()
+
+    def resume(self):
+        # Un solo frame con el estado actual, comparado con el último dibujado
+        self.paused = False
+        self.update_stats()
+        if self.isVisible():
+            self.player.resume()
 
-        self.hygiene_stat.update_value(hygiene_percent * 100)
-        self.health_stat.update_value(health_percent * 100)
-        self.hunger_stat.update_value(hunger_percent * 100)
-        self.sleep_stat.update_value(sleep_percent * 100)
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.player.pause()
 
-        # Actualizar imagen según el estado actual
-        self.update_image(self.pet.current_state_image)
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.paused:
+            self.player.resume()
+
+    def update_stats(self):
+        if self.paused:
+            self.render_stats.paused_frames += 1
+            return
+        # Comparar con el último frame y tocar solo los widgets que cambiaron
+        started = time.perf_counter()
+        state = PetViewState.from_pet(self.pet)
+        changes = state.changes(self._view_state)
+        for name, value in changes.items():
+            if name != 'image':
+                self.stat_widgets[name].set_percent(value)
+            elif not self.update_image(value):
+                # Reintentar en el próximo frame (la imagen puede aparecer después)
+                state = replace(state, image=None)
+        self._view_state = state
+        self.render_stats.frame(started, len(changes), len(self.stat_widgets) + 1 - len(changes))
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
         # Actualizar tamaño de la imagen al redimensionar
-        if self.image_label.pixmap():
+        if self.image_label.pixmap() and not self.paused:
             self.update_image(self.pet.current_state_image)
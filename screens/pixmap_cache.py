@@ -0,0 +1,103 @@
+from collections import OrderedDict
+import glob
+import os
+import threading
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPixmap
+
+from utils.asset_bundle import BUNDLE_PATH, AssetError, load_bundle
+
+
+class PixmapCache:
+    """Pixmaps ya escalados, por (ruta, ancho, alto, transformación), con límite LRU.
+
+    prewarm() decodifica y escala imágenes en un hilo aparte usando QImage
+    (QPixmap solo puede crearse en el hilo de la interfaz); al pedirlas luego
+    solo queda convertirlas, sin leer el PNG de disco. Con load_bundle() los
+    sprites del paquete de build_assets.py ya vienen escalados y se usan
+    para esa ruta y tamaño en lugar del archivo suelto.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pixmaps = OrderedDict()
+        self._prewarmed = {}  # clave -> QImage escalada en segundo plano
+        self._bundled = {}    # (ruta, ancho, alto) -> QImage del paquete de sprites
+        self.bundle_ms = None
+        self._lock = threading.Lock()
+
+    @property
+    def bundled(self):
+        return bool(self._bundled)
+
+    def load_bundle(self, path=BUNDLE_PATH):
+        """Carga el paquete de sprites si existe; devuelve cuántos sprites trae"""
+        if not os.path.exists(path):
+            return 0
+        try:
+            self._bundled, self.bundle_ms = load_bundle(path)
+        except (OSError, AssetError) as e:
+            # Seguir con los archivos sueltos
+            print(f"No se pudo cargar {path}: {e}")
+            return 0
+        return len(self._bundled)
+
+    @staticmethod
+    def key(path, width, height, transform):
+        return (path, width, height, int(transform))
+
+    def get(self, path, width, height, transform=Qt.SmoothTransformation):
+        key = self.key(path, width, height, transform)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            self.hits += 1
+            return pixmap
+
+        self.misses += 1
+        with self._lock:
+            image = self._prewarmed.pop(key, None)
+        if image is None:
+            image = self._bundled.get((path, width, height))
+        if image is not None:
+            pixmap = QPixmap.fromImage(image)
+        else:
+            pixmap = QPixmap(path)
+            if pixmap.isNull():
+                return pixmap  # No guardar fallos: el archivo puede aparecer después
+            pixmap = pixmap.scaled(width, height, Qt.KeepAspectRatio, transform)
+
+        self._pixmaps[key] = pixmap
+        if len(self._pixmaps) > self.max_entries:
+            self._pixmaps.popitem(last=False)
+        return pixmap
+
+    def prewarm(self, paths, width, height, transform=Qt.SmoothTransformation):
+        def load():
+            for path in paths:
+                key = self.key(path, width, height, transform)
+                if key in self._pixmaps:
+                    continue
+                image = QImage(path)
+                if image.isNull():
+                    continue
+                image = image.scaled(width, height, Qt.KeepAspectRatio, transform)
+                with self._lock:
+                    self._prewarmed[key] = image
+
+        thread = threading.Thread(target=load, name='pixmap-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+
+pixmap_cache = PixmapCache()
+
+
+def prewarm_states(width=200, height=200):
+    # Todos los estados de la mascota al tamaño con que los muestra PetScreen
+    if pixmap_cache.bundled:
+        return None  # Ya decodificados desde el paquete
+    return pixmap_cache.prewarm(sorted(glob.glob('assets/estados/*.png')), width, height)
@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+import time
+
+MAX_STAT = 8000  # Valor de los stats que se muestra como 100%
+
+
+def stat_percent(value):
+    return min(100, int((value / MAX_STAT) * 100))
+
+
+@dataclass(frozen=True)
+class PetViewState:
+    """Lo que muestra PetScreen: porcentajes de cada stat e imagen del estado"""
+    hygiene: int
+    health: int
+    hunger: int
+    sleep: int
+    image: str
+
+    @classmethod
+    def from_pet(cls, pet):
+        # Argumentos posicionales: se llama en cada tick
+        return cls(stat_percent(pet.hygiene), stat_percent(pet.happiness),
+                   stat_percent(pet.hunger), stat_percent(pet.energy), pet.current_state_image)
+
+    def changes(self, previous):
+        """{campo: valor nuevo} de lo que cambió respecto a previous (todo si es None)"""
+        if self == previous:
+            return {}
+        return {name: getattr(self, name) for name in VIEW_FIELDS
+                if previous is None or getattr(self, name) != getattr(previous, name)}
+
+
+VIEW_FIELDS = tuple(PetViewState.__dataclass_fields__)
+
+
+class RenderStats:
+    """Contadores de render: actualizaciones aplicadas, omitidas y tiempo por frame"""
+
+    def __init__(self):
+        self.frames = 0
+        self.repaints = 0   # Widgets actualizados
+        self.skipped = 0    # Widgets que no cambiaron y no se tocaron
+        self.paused_frames = 0  # Frames pedidos con la ventana oculta y no dibujados
+        self.total_ms = 0.0
+        self.max_frame_ms = 0.0
+        self.last_frame_ms = 0.0
+
+    def frame(self, started, repaints, skipped):
+        elapsed = (time.perf_counter() - started) * 1000
+        self.frames += 1
+        self.repaints += repaints
+        self.skipped += skipped
+        self.total_ms += elapsed
+        self.last_frame_ms = elapsed
+        self.max_frame_ms = max(self.max_frame_ms, elapsed)
+
+    def as_dict(self):
+        return {
+            'frames': self.frames,
+            'repaints': self.repaints,
+            'skipped': self.skipped,
+            'paused_frames': self.paused_frames,
+            'avg_frame_ms': self.total_ms / self.frames if self.frames else 0.0,
+            'max_frame_ms': self.max_frame_ms,
+            'last_frame_ms': self.last_frame_ms,
+        }
@@ -0,0 +1,75 @@
+import threading
+
+from PyQt5.QtCore import QObject, QTimer
+
+
+class StreamingLabel(QObject):
+    """Muestra en un QLabel una respuesta que llega por partes desde otro hilo.
+
+    Los tokens se acumulan sin tocar la interfaz; un QTimer en el hilo de la
+    interfaz vuelca el texto como máximo cada `interval` ms, así un stream
+    rápido no inunda el bucle de eventos con redibujados.
+    """
+
+    def __init__(self, label, interval=50):
+        super().__init__(label)
+        self.label = label
+        self.redraws = 0
+        self.chunks = 0
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._parts = []
+        self._dirty = False
+        self._final = None
+        self._provisional = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.flush)
+
+    def begin(self):
+        # Llamar desde el hilo de la interfaz; devuelve el identificador del stream
+        with self._lock:
+            self._generation += 1
+            self._parts = []
+            self._dirty = False
+            self._final = None
+            self._provisional = None
+            generation = self._generation
+        self._timer.start()
+        return generation
+
+    def append(self, generation, chunk):
+        # Seguro desde cualquier hilo; los tokens de un stream anterior se ignoran
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._parts.append(chunk)
+            self._dirty = True
+            self.chunks += 1
+
+    def provisional(self, generation, text):
+        # Seguro desde cualquier hilo; se muestra hasta que llegue el primer token
+        with self._lock:
+            if generation == self._generation and not self._parts and self._final is None:
+                self._provisional = text
+                self._dirty = True
+
+    def finish(self, generation, text):
+        # Seguro desde cualquier hilo; el texto final se muestra en el próximo tick
+        with self._lock:
+            if generation == self._generation:
+                self._final = text
+
+    def flush(self):
+        with self._lock:
+            final, dirty = self._final, self._dirty
+            if final is not None:
+                text = final
+            else:
+                text = "".join(self._parts) or self._provisional or ""
+            self._dirty = False
+        if final is not None:
+            self._timer.stop()
+        if dirty or final is not None:
+            self.label.setText(text)
+            self.redraws += 1
@@ -0,0 +1,300 @@
+"""Servidor sin interfaz: muchas mascotas en un proceso, con HTTP y WebSocket.
+
+HTTP (JSON):
+  GET  /stats                      métricas del servidor
+  GET  /pets                       ids de las mascotas alojadas
+  POST /pets        {"name"}       crea una mascota
+  GET  /pets/<id>                  estado actual
+  POST /pets/<id>/<acción>         feed, play, clean o sleep
+  POST /pets/<id>/chat {"message"} respuesta de la mascota
+
+WebSocket en /ws, mensajes JSON:
+  {"op": "subscribe", "ids": [1, 2]}    -> {"op": "state", "pets": [...]}
+  {"op": "unsubscribe", "ids": [1]}
+  {"op": "action", "id": 1, "action": "feed", "ref": 7}  -> {"op": "result", "ref": 7, ...}
+  {"op": "chat", "id": 1, "message": "hola", "ref": 8}   -> {"op": "reply", "ref": 8, ...}
+Las mascotas suscritas envían {"op": "delta", "id": 1, campo: valor} solo
+cuando cambia algo visible.
+
+Uso: python server.py [--port 8080] [--pets 1000]
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import signal
+import sys
+import time
+
+from models.database import WriteBehindDatabase
+from models.hub import PetHub
+from models.llm_service import get_llm_service
+from models.storage import open_storage
+from utils.instrument import instrumentation
+from utils.websocket import TEXT, ConnectionClosed, accept_key, encode_frame, read_message
+
+MAX_BODY = 64 * 1024
+MAX_WRITE_BUFFER = 256 * 1024  # Un suscriptor que no lee más que esto se desconecta
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large'}
+
+
+def dumps(payload):
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class PetServer:
+    """Frente HTTP/WebSocket de un PetHub con asyncio.start_server"""
+
+    def __init__(self, hub):
+        self.hub = hub
+        self.started = time.monotonic()
+        self.connections = 0
+        self.websockets = 0
+        self.requests = 0
+        self.slow_consumers = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except HTTPError as e:
+                    await self.respond(writer, e.status, {'error': str(e)})
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+                    await self.websocket(reader, writer, headers)
+                    break
+                self.requests += 1
+                try:
+                    status, payload = await self.route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                await self.respond(writer, status, payload)
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ConnectionClosed):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def respond(self, writer, status, payload):
+        data = dumps(payload).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') + data)
+        await writer.drain()
+
+    async def read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, path, _version = line.decode('latin-1').split()
+        except ValueError:
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HTTPError(400, "Content-Length no válido")
+        if length > MAX_BODY:
+            raise HTTPError(413, f"El cuerpo supera {MAX_BODY} bytes")
+        body = await reader.readexactly(length) if length else b''
+        return method, path, headers, body
+
+    async def route(self, method, path, body):
+        parts = [part for part in path.split('?')[0].split('/') if part]
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            raise HTTPError(400, "El cuerpo no es JSON válido")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "El cuerpo debe ser un objeto JSON")
+        if parts == ['stats'] and method == 'GET':
+            return 200, self.stats()
+        if parts[:1] != ['pets']:
+            raise HTTPError(404, f"Ruta desconocida: {path}")
+        if len(parts) == 1:
+            if method == 'GET':
+                return 200, {'ids': list(self.hub.pets)}
+            if method == 'POST':
+                pet = self.hub.create(data.get('name', "Tamagotchi"))
+                return 201, self.hub.state(pet.pet_id)
+            raise HTTPError(405, "Usa GET o POST")
+        try:
+            pet_id = int(parts[1])
+            self.hub.get(pet_id)
+        except (ValueError, KeyError):
+            raise HTTPError(404, f"No existe la mascota {parts[1]}")
+        if len(parts) == 2 and method == 'GET':
+            return 200, self.hub.state(pet_id)
+        if len(parts) == 3 and method == 'POST':
+            if parts[2] == 'chat':
+                return 200, {'reply': await self.hub.chat(pet_id, str(data.get('message', '')))}
+            try:
+                message, delta = self.hub.act(pet_id, parts[2])
+            except ValueError as e:
+                raise HTTPError(400, str(e))
+            return 200, {'message': message, 'delta': delta}
+        raise HTTPError(405, f"{method} {path} no está permitido")
+
+    async def websocket(self, reader, writer, headers):
+        key = headers.get('sec-websocket-key')
+        if not key:
+            await self.respond(writer, 400, {'error': "Falta la cabecera Sec-WebSocket-Key"})
+            return
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n")
+                     .encode('latin-1'))
+        self.websockets += 1
+        subscribed = set()
+
+        def send(payload):
+            if writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                # No lee los deltas: cortar en lugar de acumular memoria
+                self.slow_consumers += 1
+                writer.transport.abort()
+                return
+            writer.write(encode_frame(dumps(payload)))
+
+        def push(delta):
+            send({'op': 'delta', **delta})
+
+        async def answer_chat(ref, pet_id, message):
+            # Corre en su propia tarea, fuera del try de abajo: el error se responde aquí
+            try:
+                reply = await self.hub.chat(pet_id, message)
+            except (ValueError, KeyError, TypeError) as e:
+                send({'op': 'error', 'ref': ref, 'error': str(e)})
+                return
+            send({'op': 'reply', 'ref': ref, 'id': pet_id, 'reply': reply})
+
+        chats = set()
+        try:
+            while True:
+                opcode, payload = await read_message(reader, writer)
+                if opcode != TEXT:
+                    continue
+                message = None  # Para no responder con el ref del mensaje anterior
+                try:
+                    message = json.loads(payload)
+                    if not isinstance(message, dict):
+                        raise ValueError("El mensaje debe ser un objeto JSON")
+                    op = message.get('op')
+                    if op == 'subscribe':
+                        states = []
+                        for pet_id in message.get('ids', ()):
+                            states.append(self.hub.subscribe(pet_id, push))
+                            subscribed.add(pet_id)
+                        send({'op': 'state', 'pets': states})
+                    elif op == 'unsubscribe':
+                        for pet_id in message.get('ids', ()):
+                            self.hub.unsubscribe(pet_id, push)
+                            subscribed.discard(pet_id)
+                    elif op == 'action':
+                        result, delta = self.hub.act(message['id'], message['action'])
+                        send({'op': 'result', 'ref': message.get('ref'), 'id': message['id'],
+                              'message': result, 'delta': delta})
+                    elif op == 'chat':
+                        task = asyncio.create_task(
+                            answer_chat(message.get('ref'), message['id'], str(message.get('message', ''))))
+                        chats.add(task)
+                        task.add_done_callback(chats.discard)
+                    else:
+                        raise ValueError(f"Operación desconocida: {op!r}")
+                except (ValueError, KeyError, TypeError) as e:
+                    send({'op': 'error', 'ref': message.get('ref') if isinstance(message, dict) else None,
+                          'error': str(e)})
+                await writer.drain()
+        finally:
+            self.websockets -= 1
+            for pet_id in subscribed:
+                self.hub.unsubscribe(pet_id, push)
+            for task in chats:
+                task.cancel()
+
+    def stats(self):
+        # ru_maxrss está en KB en Linux
+        rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        stats = self.hub.stats()
+        stats.update(
+            uptime=time.monotonic() - self.started,
+            connections=self.connections,
+            websockets=self.websockets,
+            requests=self.requests,
+            slow_consumers=self.slow_consumers,
+            max_rss_mb=rss_mb,
+        )
+        return stats
+
+
+async def serve(host, port, pets, db, seed=None):
+    hub = PetHub(db, llm=get_llm_service())
+    hub.load_all()
+    # Con seed las mascotas nuevas empiezan con stats al azar (pruebas de carga)
+    rnd = random.Random(seed) if seed is not None else None
+    while len(hub.pets) < pets:
+        pet = hub.create(f"Tamagotchi {len(hub.pets) + 1}")
+        if rnd is not None:
+            pet.hunger, pet.happiness, pet.energy, pet.hygiene = (rnd.randint(2500, 7500) for _ in range(4))
+            pet.save_state()
+            hub.publish(pet)
+    server = PetServer(hub)
+    listener = await asyncio.start_server(server.handle, host, port, backlog=1024)
+    address = listener.sockets[0].getsockname()
+    # Una línea en stdout para quien espere a que el servidor esté listo (load test)
+    print(dumps({'listening': f"{address[0]}:{address[1]}", 'pets': len(hub.pets)}), flush=True)
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+    try:
+        async with listener:
+            await stop.wait()
+    finally:
+        hub.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080, help="0 elige un puerto libre")
+    parser.add_argument('--pets', type=int, default=0, help="crear mascotas hasta llegar a este número")
+    parser.add_argument('--seed', type=int, default=None, help="stats al azar para las mascotas nuevas")
+    args = parser.parse_args()
+
+    # Igual que la ventana: escritura en lote; TAMAGOTCHI_STORAGE elige el almacenamiento
+    db = WriteBehindDatabase(open_storage())
+    db.start()
+    instrumentation.start_profiler()
+    try:
+        asyncio.run(serve(args.host, args.port, args.pets, db, args.seed))
+    finally:
+        db.close()
+        get_llm_service().shutdown()
+        instrumentation.export()  # Solo si TAMAGOTCHI_INSTRUMENT está definido
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""Paquete de sprites ya escalados: un solo archivo que se lee de una vez.
+
+build_assets.py escala cada imagen de SPRITES a los tamaños con que la
+muestra la interfaz, las junta en un atlas PNG por tamaño y escribe todo en
+BUNDLE_PATH:
+
+    MAGIC | versión (u32) | largo del índice (u32) | índice JSON | atlas PNG...
+
+El índice dice dónde está cada atlas dentro del archivo y el rectángulo de
+cada sprite dentro de su atlas, por (ruta original, ancho, alto).
+"""
+import hashlib
+import json
+import os
+import struct
+import time
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QRect, Qt
+from PyQt5.QtGui import QImage, QPainter
+
+BUNDLE_PATH = 'assets/bundle/sprites.bundle'
+MAGIC = b'TAMASPR1'
+VERSION = 1
+HEADER = struct.Struct('<8sII')
+PNG_COMPRESSION = 0  # calidad de QImage.save para PNG: 0 es la máxima compresión
+
+# Ruta -> tamaños (caja cuadrada) con que se muestra; cada uno va al atlas de su tamaño
+SPRITES = {
+    'assets/estados/normal.png': (200,),      # PetScreen
+    'assets/estados/sueño.png': (200,),
+    'assets/estados/durmiendo.png': (200,),
+    'assets/icons/hygiene.png': (16,),        # StatWidget
+    'assets/icons/health.png': (16,),
+    'assets/icons/hunger.png': (16,),
+    'assets/icons/sleep.png': (16,),          # también botón Dormir
+    'assets/icons/feed.png': (16,),           # botones de acción
+    'assets/icons/play.png': (16,),
+    'assets/icons/clean.png': (16,),
+    'assets/icons/pet.png': (32, 64),         # ventana y bandeja
+}
+
+# Imágenes que el código usa pero que no están en el repositorio: se construyen
+# desde otra y el build lo avisa (con --strict, falla)
+FALLBACKS = {
+    'assets/estados/sueño.png': 'assets/estados/durmiendo.png',
+    'assets/icons/pet.png': 'assets/tamagotchi.png',
+}
+
+
+class AssetError(Exception):
+    pass
+
+
+def source_for(path):
+    """Archivo del que sale el sprite: el propio o su respaldo; None si no hay ninguno"""
+    if os.path.exists(path):
+        return path
+    fallback = FALLBACKS.get(path)
+    if fallback and os.path.exists(fallback):
+        return fallback
+    return None
+
+
+def digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def encode_png(image):
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    if not image.save(buffer, 'PNG', PNG_COMPRESSION):
+        raise AssetError("No se pudo codificar el atlas")
+    return bytes(data)
+
+
+def build_bundle(sprites=SPRITES, output=BUNDLE_PATH, strict=False):
+    """Escala, empaqueta y escribe el paquete; devuelve un resumen para el informe"""
+    missing, fallbacks = [], {}
+    for path in sprites:
+        source = source_for(path)
+        if source is None:
+            missing.append(path)
+        elif source != path:
+            fallbacks[path] = source
+    if missing or (strict and fallbacks):
+        problems = [f"falta {path}" for path in missing]
+        problems += [f"{path} usaría {source}" for path, source in fallbacks.items() if strict]
+        raise AssetError("Assets incompletos:\n" + "\n".join(f"- {problem}" for problem in problems))
+
+    # Cada imagen se decodifica una vez aunque vaya a varios tamaños
+    decoded = {}
+    sources = {}
+    by_size = {}
+    for path, sizes in sprites.items():
+        source = source_for(path)
+        if source not in decoded:
+            image = QImage(source)
+            if image.isNull():
+                raise AssetError(f"No se pudo decodificar {source}")
+            decoded[source] = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+            sources[source] = digest(source)
+        for size in sizes:
+            scaled = decoded[source].scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            by_size.setdefault(size, []).append((path, scaled))
+
+    # Un atlas por tamaño, con los sprites en una fila
+    atlases, blobs, index = [], [], {}
+    for size in sorted(by_size):
+        entries = by_size[size]
+        atlas = QImage(sum(image.width() for _, image in entries),
+                       max(image.height() for _, image in entries),
+                       QImage.Format_ARGB32_Premultiplied)
+        atlas.fill(Qt.transparent)
+        painter = QPainter(atlas)
+        x = 0
+        for path, image in entries:
+            painter.drawImage(x, 0, image)
+            index[f"{path}@{size}x{size}"] = [len(atlases), x, 0, image.width(), image.height()]
+            x += image.width()
+        painter.end()
+        blob = encode_png(atlas)
+        atlases.append({'size': size, 'length': len(blob)})
+        blobs.append(blob)
+
+    header = json.dumps({'atlases': atlases, 'sprites': index, 'sources': sources,
+                         'fallbacks': fallbacks}, ensure_ascii=False).encode('utf-8')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    temporary = output + '.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(temporary, output)
+    return {'sprites': len(index), 'atlases': len(atlases), 'bytes': os.path.getsize(output),
+            'source_bytes': sum(os.path.getsize(source) for source in sources),
+            'fallbacks': fallbacks}
+
+
+def read_index(data):
+    magic, version, length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise AssetError("Paquete de sprites de otro formato; vuelve a ejecutar build_assets.py")
+    start = HEADER.size
+    return json.loads(data[start:start + length].decode('utf-8')), start + length
+
+
+def load_bundle(path=BUNDLE_PATH):
+    """Lee el paquete de una vez y devuelve ({(ruta, ancho, alto): QImage}, ms)"""
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        data = f.read()
+    index, offset = read_index(data)
+    atlases = []
+    for atlas in index['atlases']:
+        image = QImage.fromData(data[offset:offset + atlas['length']], 'PNG')
+        if image.isNull():
+            raise AssetError(f"Atlas de {atlas['size']} px dañado en {path}")
+        atlases.append(image)
+        offset += atlas['length']
+    sprites = {}
+    for key, (atlas, x, y, width, height) in index['sprites'].items():
+        sprite_path, _, size = key.rpartition('@')
+        box_width, box_height = (int(value) for value in size.split('x'))
+        sprites[(sprite_path, box_width, box_height)] = atlases[atlas].copy(QRect(x, y, width, height))
+    return sprites, (time.perf_counter() - started) * 1000
+
+
+def stale_sources(path=BUNDLE_PATH, sprites=SPRITES):
+    """Archivos que cambiaron (o sprites nuevos) desde que se construyó el paquete"""
+    with open(path, 'rb') as f:
+        index, _ = read_index(f.read())
+    stale = [source for source, recorded in index['sources'].items()
+             if not os.path.exists(source) or digest(source) != recorded]
+    built = {key.rpartition('@')[0] for key in index['sprites']}
+    stale += [sprite for sprite in sprites if sprite not in built or source_for(sprite) not in index['sources']]
+    return stale
@@ -0,0 +1,267 @@
+"""Instrumentación de las rutas calientes, activada con TAMAGOTCHI_INSTRUMENT.
+
+TAMAGOTCHI_INSTRUMENT=ruta activa los histogramas de latencia y los
+contadores de llamadas; export() los escribe en esa ruta, en texto de
+Prometheus si termina en .prom o .txt y en JSON si no. Sin la variable,
+timed() devuelve la función sin envolver y span() un contexto vacío: el
+costo es nulo o casi nulo. TAMAGOTCHI_PROFILE_HZ=n además muestrea las pilas
+de todos los hilos n veces por segundo y las guarda junto a las métricas
+(ruta + '.folded', formato de flamegraph).
+"""
+from bisect import bisect_left
+from collections import Counter
+from contextlib import nullcontext
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+INSTRUMENT_ENV = "TAMAGOTCHI_INSTRUMENT"
+PROFILE_ENV = "TAMAGOTCHI_PROFILE_HZ"
+PREFIX = "tamagotchi"
+# Límites de los buckets en segundos, de 1 µs (ticks y guardados) a 30 s (Mistral)
+BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+           0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)  # El último es +Inf
+            self.count = 0
+            self.errors = 0
+            self.sum = 0.0
+            self.max = 0.0
+
+    def observe(self, seconds, error=False):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.errors += error
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        # Límite superior del bucket donde cae el cuantil (estimación por exceso)
+        if not self.count:
+            return None
+        for bound, total in self.cumulative():
+            if total >= q * self.count:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'sum_seconds': self.sum,
+            'mean_seconds': self.sum / self.count if self.count else 0.0,
+            'max_seconds': self.max,
+            'p50_seconds': self.quantile(0.5),
+            'p95_seconds': self.quantile(0.95),
+            'p99_seconds': self.quantile(0.99),
+            'buckets': {('+Inf' if bound == float('inf') else repr(bound)): total
+                        for bound, total in self.cumulative()},
+        }
+
+
+class SamplingProfiler:
+    """Muestrea las pilas de todos los hilos desde un hilo aparte.
+
+    Cada muestra cuenta la pila "hilo;archivo:función;..." de cada hilo;
+    export() escribe una línea "pila cuenta" por pila, la entrada de
+    flamegraph.pl o speedscope.
+    """
+
+    def __init__(self, hz, max_depth=48):
+        self.interval = 1.0 / hz
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.stacks[self.fold(names.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+
+    def fold(self, thread_name, frame):
+        parts = []
+        while frame is not None and len(parts) < self.max_depth:
+            code = frame.f_code
+            parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        parts.append(thread_name)
+        return ";".join(reversed(parts))
+
+    def export(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+class Instrumentation:
+    """Histogramas de latencia por ruta ('update_stats', 'llm_complete', ...)"""
+
+    def __init__(self, path=None, profile_hz=0):
+        self.path = path
+        self.enabled = bool(path)
+        self.profile_hz = profile_hz if self.enabled else 0
+        self.profiler = None
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def histogram(self, name):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            return histogram
+
+    def observe(self, name, seconds, error=False):
+        self.histogram(name).observe(seconds, error)
+
+    def timed(self, name):
+        """Decorador; desactivada la instrumentación devuelve la función tal cual"""
+        def decorate(func):
+            if not self.enabled:
+                return func
+            observe = self.histogram(name).observe
+            clock = time.perf_counter
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = clock()
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException:
+                    observe(clock() - start, True)
+                    raise
+                observe(clock() - start)
+                return result
+            return wrapper
+        return decorate
+
+    def span(self, name):
+        """Contexto que mide un bloque; desactivada, un contexto vacío compartido"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def start_profiler(self):
+        if self.profile_hz > 0 and self.profiler is None:
+            self.profiler = SamplingProfiler(self.profile_hz)
+            self.profiler.start()
+        return self.profiler
+
+    def snapshot(self):
+        with self._lock:
+            return {name: histogram.as_dict() for name, histogram in sorted(self._histograms.items())}
+
+    def prometheus(self):
+        lines = [f"# HELP {PREFIX}_call_duration_seconds Latencia de las rutas instrumentadas",
+                 f"# TYPE {PREFIX}_call_duration_seconds histogram"]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            for name, histogram in histograms:
+                for bound, total in histogram.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{PREFIX}_call_duration_seconds_bucket{{path="{name}",le="{le}"}} {total}')
+                lines.append(f'{PREFIX}_call_duration_seconds_sum{{path="{name}"}} {histogram.sum!r}')
+                lines.append(f'{PREFIX}_call_duration_seconds_count{{path="{name}"}} {histogram.count}')
+            lines += [f"# HELP {PREFIX}_call_errors_total Llamadas que terminaron en excepción",
+                      f"# TYPE {PREFIX}_call_errors_total counter"]
+            lines += [f'{PREFIX}_call_errors_total{{path="{name}"}} {histogram.errors}'
+                      for name, histogram in histograms]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None):
+        """Escribe las métricas (y el perfil, si lo hay); devuelve la ruta o None si está desactivada"""
+        path = path or self.path
+        if not path:
+            return None
+        if self.profiler is not None:
+            self.profiler.stop()
+            self.profiler.export(path + '.folded')
+        temporary = path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            if path.endswith(('.prom', '.txt')):
+                f.write(self.prometheus())
+            else:
+                report = {'paths': self.snapshot()}
+                if self.profiler is not None:
+                    report['profile'] = {'samples': self.profiler.samples, 'hz': self.profile_hz,
+                                         'file': path + '.folded'}
+                json.dump(report, f, indent=2, ensure_ascii=False)
+        os.replace(temporary, path)
+        return path
+
+    def reset(self):
+        # Vaciar sin reemplazar: los decoradores guardan su histograma
+        with self._lock:
+            histograms = list(self._histograms.values())
+        for histogram in histograms:
+            histogram.clear()
+
+
+class _Span:
+    __slots__ = ('instrumentation', 'name', 'start')
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.instrumentation.observe(self.name, time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+
+_NULL_SPAN = nullcontext()
+
+
+def _profile_hz():
+    try:
+        return float(os.getenv(PROFILE_ENV, 0))
+    except ValueError:
+        return 0
+
+
+# Se decide al importar: los decoradores ya aplicados no cambian después
+instrumentation = Instrumentation(os.getenv(INSTRUMENT_ENV), _profile_hz())
+timed = instrumentation.timed
+span = instrumentation.span
@@ -0,0 +1,145 @@
+from collections import deque
+import json
+import os
+import threading
+import time
+
+METRICS_ENV = "TAMAGOTCHI_METRICS_FILE"
+
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CallMetrics:
+    """Métricas de las llamadas al LLM por tipo ('chat', 'alert', ...).
+
+    Cuenta llamadas, errores, tokens del prompt y de la respuesta (estimados
+    con models.prompts.count_tokens), recortes por presupuesto, peticiones
+    unidas, reemplazadas o descartadas por la cola y latencias (las últimas
+    `window` de cada tipo, para los percentiles). Los gauges guardan el valor
+    actual y el máximo de medidas como la profundidad de la cola. snapshot()
+    devuelve un dict listo para JSON; export() lo escribe en un archivo.
+    """
+
+    def __init__(self, window=500):
+        self.window = window
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._gauges = {}  # nombre -> [actual, máximo]
+
+    def _entry(self, call_type):
+        entry = self._calls.get(call_type)
+        if entry is None:
+            entry = self._calls[call_type] = {
+                'calls': 0, 'errors': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                'trimmed_prompts': 0, 'trimmed_items': 0,
+                'merged': 0, 'superseded': 0, 'dropped': 0,
+                'latencies': deque(maxlen=self.window),
+            }
+        return entry
+
+    def record(self, call_type, prompt_tokens, completion_tokens=0, latency=None, error=None):
+        with self._lock:
+            entry = self._entry(call_type)
+            entry['calls'] += 1
+            entry['prompt_tokens'] += prompt_tokens
+            entry['completion_tokens'] += completion_tokens
+            if error is not None:
+                entry['errors'] += 1
+            if latency is not None:
+                entry['latencies'].append(latency)
+
+    def record_trim(self, call_type, items):
+        # Un prompt que no cabía en el presupuesto y perdió `items` elementos
+        with self._lock:
+            entry = self._entry(call_type)
+            entry['trimmed_prompts'] += 1
+            entry['trimmed_items'] += items
+
+    def count(self, call_type, name):
+        # name: 'merged', 'superseded' o 'dropped'
+        with self._lock:
+            self._entry(call_type)[name] += 1
+
+    def gauge(self, name, value):
+        with self._lock:
+            current = self._gauges.setdefault(name, [value, value])
+            current[0] = value
+            current[1] = max(current[1], value)
+
+    def gauges(self):
+        with self._lock:
+            return {name: {'value': value, 'max': peak} for name, (value, peak) in self._gauges.items()}
+
+    def snapshot(self):
+        with self._lock:
+            report = {}
+            for call_type, entry in self._calls.items():
+                calls = entry['calls']
+                latencies = list(entry['latencies'])
+                report[call_type] = {
+                    'calls': calls,
+                    'errors': entry['errors'],
+                    'error_rate': entry['errors'] / calls if calls else 0.0,
+                    'prompt_tokens': entry['prompt_tokens'],
+                    'completion_tokens': entry['completion_tokens'],
+                    'avg_prompt_tokens': entry['prompt_tokens'] / calls if calls else 0.0,
+                    'trimmed_prompts': entry['trimmed_prompts'],
+                    'trimmed_items': entry['trimmed_items'],
+                    'merged': entry['merged'],
+                    'superseded': entry['superseded'],
+                    'dropped': entry['dropped'],
+                    'latency_p50': percentile(latencies, 0.5),
+                    'latency_p95': percentile(latencies, 0.95),
+                }
+            return report
+
+    def export(self, path=None):
+        """Escribe snapshot() y gauges() en JSON en `path` o en TAMAGOTCHI_METRICS_FILE, si hay alguno"""
+        path = path or os.getenv(METRICS_ENV)
+        if not path:
+            return None
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'calls': self.snapshot(), 'gauges': self.gauges()}, f, indent=2, ensure_ascii=False)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._gauges.clear()
+
+
+class WakeupStats:
+    """Cuenta los despertares del temporizador de la ventana por modo.
+
+    El modo ('foreground' o 'background') cambia con set_mode(); per_minute()
+    divide los despertares de cada modo por el tiempo pasado en él.
+    """
+
+    def __init__(self, mode='foreground', clock=time.monotonic):
+        self._clock = clock
+        self.mode = mode
+        self._since = clock()
+        self._wakeups = {}
+        self._seconds = {}
+
+    def set_mode(self, mode):
+        now = self._clock()
+        self._seconds[self.mode] = self._seconds.get(self.mode, 0.0) + now - self._since
+        self.mode, self._since = mode, now
+
+    def wake(self):
+        self._wakeups[self.mode] = self._wakeups.get(self.mode, 0) + 1
+
+    def per_minute(self):
+        self.set_mode(self.mode)  # Cerrar el intervalo del modo actual
+        return {mode: {'wakeups': self._wakeups.get(mode, 0), 'seconds': seconds,
+                       'per_minute': self._wakeups.get(mode, 0) / seconds * 60 if seconds else 0.0}
+                for mode, seconds in self._seconds.items()}
+
+
+llm_metrics = CallMetrics()
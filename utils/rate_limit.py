@@ -0,0 +1,64 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Limita a `rate` operaciones por segundo con ráfagas de hasta `capacity`.
+
+    acquire() espera (sin ocupar CPU) hasta que haya una ficha; close()
+    despierta a quien esté esperando, por ejemplo al cerrar la aplicación.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._closed = threading.Event()
+        self.waits = 0          # veces que hubo que esperar una ficha
+        self.waited = 0.0       # segundos de espera acumulados
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Toma una ficha si hay; si no, devuelve los segundos que faltan para la próxima"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Espera una ficha; devuelve False si se cerró mientras esperaba"""
+        start = None
+        while not self._closed.is_set():
+            delay = self.try_acquire()
+            if not delay:
+                if start is not None:
+                    with self._lock:
+                        self.waits += 1
+                        self.waited += self._clock() - start
+                return True
+            start = start if start is not None else self._clock()
+            self._closed.wait(delay)
+        return False
+
+    def refund(self):
+        # Devuelve una ficha que se tomó y no se usó
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    @property
+    def tokens(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def close(self):
+        self._closed.set()
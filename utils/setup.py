@@ -1,5 +1,7 @@
 import os
 
+from utils.asset_bundle import BUNDLE_PATH
+
 def ensure_directories():
     """Asegura que existan todas las carpetas necesarias"""
     directories = [
@@ -16,6 +18,10 @@ def ensure_directories():
 
 def verify_assets():
     """Verifica que existan los archivos necesarios"""
+    if os.path.exists(BUNDLE_PATH):
+        # build_assets.py ya comprobó todas las imágenes al construir el paquete
+        return
+
     required_files = {
         'assets/icons/feed.png': '🍽️',
         'assets/icons/play.png': '🎮',
@@ -38,3 +44,4 @@ def verify_assets():
         for file in missing_files:
             print(f"- {file}")
         print("\nPor favor, asegúrate de tener todos los archivos necesarios en las carpetas correspondientes.")
+        print("Ejecuta python build_assets.py para comprobarlos y empaquetarlos una sola vez.")
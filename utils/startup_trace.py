@@ -0,0 +1,58 @@
+import json
+import os
+import sys
+import time
+
+from PyQt5.QtCore import QEvent, QObject, QTimer
+
+TRACE_ENV = "TAMAGOTCHI_TRACE_STARTUP"
+
+
+class StartupTrace(QObject):
+    """Mide el arranque: imports, apertura de la base de datos y primera pintura.
+
+    Se activa con TAMAGOTCHI_TRACE_STARTUP=1 (imprime el informe y sigue) o
+    =exit (imprime el informe y cierra la aplicación, para benchmarks). El
+    informe es una línea JSON en stderr con los tiempos en milisegundos.
+    """
+
+    def __init__(self, start):
+        super().__init__()
+        self.mode = os.getenv(TRACE_ENV, "")
+        self.start = start
+        self.marks = {}
+        self._last = start
+
+    @property
+    def enabled(self):
+        return bool(self.mode)
+
+    def mark(self, name):
+        # Tiempo desde la marca anterior
+        now = time.perf_counter()
+        self.marks[name] = (now - self._last) * 1000
+        self._last = now
+
+    def watch_first_paint(self, widget, app):
+        if self.enabled:
+            self._app = app
+            widget.installEventFilter(self)
+
+    def eventFilter(self, widget, event):
+        if event.type() == QEvent.Paint:
+            widget.removeEventFilter(self)
+            # Medir cuando termine de procesarse este evento de pintura
+            QTimer.singleShot(0, self._first_paint_done)
+        return False
+
+    def _first_paint_done(self):
+        self.mark('first_paint_ms')
+        self.report()
+        if self.mode == 'exit':
+            self._app.quit()
+
+    def report(self):
+        total = (time.perf_counter() - self.start) * 1000
+        payload = dict(self.marks, total_ms=total,
+                       llm_imported='mistralai' in sys.modules)
+        print("startup-trace " + json.dumps(payload), file=sys.stderr, flush=True)
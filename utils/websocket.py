@@ -0,0 +1,80 @@
+"""WebSocket mínimo (RFC 6455) sobre asyncio, solo lo que usa el servidor.
+
+Texto, binario, ping/pong y cierre; los mensajes fragmentados se unen.
+Sin extensiones ni compresión.
+"""
+import base64
+import hashlib
+import struct
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+TEXT, BINARY, CLOSE, PING, PONG, CONTINUATION = 0x1, 0x2, 0x8, 0x9, 0xA, 0x0
+MAX_MESSAGE = 1 << 20  # bytes; los clientes solo envían órdenes cortas
+
+
+class ConnectionClosed(Exception):
+    pass
+
+
+def accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + GUID).encode()).digest()).decode()
+
+
+def encode_frame(payload, opcode=TEXT, mask=None):
+    """Un frame con FIN; mask (4 bytes) solo para frames de cliente"""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length | (0x80 if mask else 0))
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126 | (0x80 if mask else 0), length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127 | (0x80 if mask else 0), length)
+    if mask:
+        return header + mask + apply_mask(payload, mask)
+    return header + payload
+
+
+def apply_mask(payload, mask):
+    # XOR con la máscara repetida, de una vez con enteros grandes
+    repeated = (mask * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes(repeated, 'big')).to_bytes(len(payload), 'big')
+
+
+async def read_frame(reader):
+    head = await reader.readexactly(2)
+    fin, opcode = head[0] & 0x80, head[0] & 0x0F
+    masked, length = head[1] & 0x80, head[1] & 0x7F
+    if length == 126:
+        length, = struct.unpack('!H', await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack('!Q', await reader.readexactly(8))
+    if length > MAX_MESSAGE:
+        raise ConnectionClosed(f"Mensaje demasiado grande ({length} bytes)")
+    mask = await reader.readexactly(4) if masked else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = apply_mask(payload, mask)
+    return bool(fin), opcode, payload
+
+
+async def read_message(reader, writer):
+    """Devuelve (opcode, payload) del próximo mensaje de datos; responde pings y cierres"""
+    parts = []
+    opcode = None
+    while True:
+        fin, frame_opcode, payload = await read_frame(reader)
+        if frame_opcode == PING:
+            writer.write(encode_frame(payload, PONG))
+            continue
+        if frame_opcode == PONG:
+            continue
+        if frame_opcode == CLOSE:
+            writer.write(encode_frame(payload[:2], CLOSE))
+            raise ConnectionClosed("El cliente cerró la conexión")
+        if frame_opcode != CONTINUATION:
+            opcode = frame_opcode
+        parts.append(payload)
+        if fin:
+            return opcode, b"".join(parts)